@@ -0,0 +1,146 @@
+import json
+import os
+from array import array
+from datetime import datetime
+
+import arcpy
+
+from catalog.WorkspaceCatalog import CATALOG
+
+
+class ChangeFeed:
+    """
+    Change feed of targeted addresses between runs.
+
+    Each run stores the targeted address ids as a sorted array of 64-bit integers. The new snapshot is
+    merged against the previous one in a single linear pass, and the addresses that were newly targeted
+    or released are written to a small JSON change file, so notification and spraying workflows only
+    need to process the delta.
+    """
+
+    def __init__(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses 'proj_dir' and the optional
+          'changefeed_dir', 'changefeed_keep', 'changefeed_include_unchanged' and 'address_id_field' keys.
+        """
+        self.feed_dir = os.path.join(config_dict.get('proj_dir'), config_dict.get('changefeed_dir', 'changefeed'))
+        self.keep = config_dict.get('changefeed_keep', 30)
+        self.id_field = config_dict.get('address_id_field', 'TARGET_FID')
+        self.include_unchanged = config_dict.get('changefeed_include_unchanged', False)
+
+    @staticmethod
+    def diff(old_ids, new_ids):
+        """
+        Compare two sorted id sequences in one linear merge pass.
+
+        Parameters:
+        - old_ids (sequence): Sorted ids from the previous run.
+        - new_ids (sequence): Sorted ids from this run.
+
+        Returns:
+            tuple: (added, removed, unchanged) sorted lists.
+        """
+        added, removed, unchanged = [], [], []
+        i = j = 0
+        while i < len(old_ids) and j < len(new_ids):
+            if old_ids[i] == new_ids[j]:
+                unchanged.append(old_ids[i])
+                i += 1
+                j += 1
+            elif old_ids[i] < new_ids[j]:
+                removed.append(old_ids[i])
+                i += 1
+            else:
+                added.append(new_ids[j])
+                j += 1
+        removed.extend(old_ids[i:])
+        added.extend(new_ids[j:])
+        return added, removed, unchanged
+
+    def read_targeted_ids(self, layer_name, where_clause="Join_Count = 1"):
+        """
+        Read the sorted, de-duplicated ids of the targeted addresses in a layer.
+
+        Falls back to the layer's object ids when the configured id field is missing.
+
+        Parameters:
+        - layer_name (str): The joined address layer, e.g. target_addresses.
+        - where_clause (str): Filter selecting the targeted addresses.
+        """
+        field_names = [name for name, _ in CATALOG.fields(layer_name)]
+        id_field = self.id_field if self.id_field in field_names else "OID@"
+        with arcpy.da.SearchCursor(layer_name, [id_field], where_clause) as cursor:
+            ids = sorted({int(value) for value, in cursor if value is not None})
+        return array("q", ids)
+
+    def snapshots(self):
+        """
+        Returns:
+            list: Paths of the stored snapshots, oldest first.
+        """
+        if not os.path.isdir(self.feed_dir):
+            return []
+        names = sorted(n for n in os.listdir(self.feed_dir) if n.startswith("targets_") and n.endswith(".ids"))
+        return [os.path.join(self.feed_dir, n) for n in names]
+
+    @staticmethod
+    def read_snapshot(path):
+        """
+        Parameters:
+        - path (str): A snapshot file.
+
+        Returns:
+            array: The sorted ids stored in the snapshot.
+        """
+        ids = array("q")
+        with open(path, "rb") as f:
+            ids.frombytes(f.read())
+        return ids
+
+    def publish(self, layer_name, where_clause="Join_Count = 1"):
+        """
+        Snapshot the targeted addresses of this run and write the change file against the previous run.
+
+        Parameters:
+        - layer_name (str): The joined address layer, e.g. target_addresses.
+        - where_clause (str): Filter selecting the targeted addresses.
+
+        Returns:
+            str: The path of the change file.
+        """
+        os.makedirs(self.feed_dir, exist_ok=True)
+        previous = self.snapshots()
+        old_ids = self.read_snapshot(previous[-1]) if previous else array("q")
+        new_ids = self.read_targeted_ids(layer_name, where_clause)
+
+        added, removed, unchanged = self.diff(old_ids, new_ids)
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        snapshot_path = os.path.join(self.feed_dir, f"targets_{stamp}.ids")
+        with open(snapshot_path, "wb") as f:
+            new_ids.tofile(f)
+
+        change_path = os.path.join(self.feed_dir, f"changes_{stamp}.json")
+        changes = {
+            "snapshot": os.path.basename(snapshot_path),
+            "previous": os.path.basename(previous[-1]) if previous else None,
+            "added": added,
+            "removed": removed,
+            "unchanged_count": len(unchanged),
+        }
+        # Unchanged ids are usually most of the set and can be read back from the snapshot, so they are opt-in
+        if self.include_unchanged:
+            changes["unchanged"] = unchanged
+        with open(change_path, "w") as f:
+            json.dump(changes, f)
+
+        # Only a rolling window of snapshots and change files is kept
+        for old in previous[:max(0, len(previous) + 1 - self.keep)]:
+            os.remove(old)
+            old_changes = old.replace("targets_", "changes_").replace(".ids", ".json")
+            if os.path.exists(old_changes):
+                os.remove(old_changes)
+
+        print(f"Change feed: {len(added)} added, {len(removed)} removed, {len(unchanged)} unchanged")
+        return change_path
@@ -0,0 +1,257 @@
+import math
+from collections import defaultdict
+
+import arcpy
+import numpy as np
+
+from catalog.WorkspaceCatalog import CATALOG
+
+
+class ExtentIndex:
+    """
+    Per-layer bounding box index used to prune overlay inputs.
+
+    The bounding box of every feature is computed from the layer's FeatureTable, which the workspace
+    catalog reads once and drops when a stage writes the layer, so the boxes always match the layer's
+    current contents. Before an overlay runs, features whose boxes cannot touch the other inputs are
+    dropped, and the overlay tools only see the features that can interact.
+    """
+
+    def __init__(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration.
+        """
+        self.config_dict = config_dict
+        self._memory = {}
+
+    def feature_boxes(self, layer_name):
+        """
+        Get the object ids and bounding boxes of every feature in a layer.
+
+        Parameters:
+        - layer_name (str): The feature class.
+
+        Returns:
+            tuple: (oids, boxes). oids is an int64 array, boxes an (n, 4) array of xmin, ymin, xmax, ymax.
+        """
+        if layer_name not in self._memory:
+            table = CATALOG.table(layer_name)
+            boxes = table.bounds()
+            has_shape = ~np.isnan(boxes[:, 0])
+            self._memory[layer_name] = (table.ids[has_shape], boxes[has_shape])
+        return self._memory[layer_name]
+
+    @staticmethod
+    def overlaps_any(boxes, others):
+        """
+        Test which boxes overlap at least one of the other boxes.
+
+        The other boxes are bucketed into a uniform grid sized to their typical extent, so each box is only
+        compared against the boxes in the grid cells it covers.
+
+        Parameters:
+        - boxes (numpy.ndarray): (n, 4) boxes to test.
+        - others (numpy.ndarray): (m, 4) boxes to test against.
+
+        Returns:
+            numpy.ndarray: Boolean array with one value per box.
+        """
+        result = np.zeros(len(boxes), dtype=bool)
+        if len(boxes) == 0 or len(others) == 0:
+            return result
+
+        # Cells follow the typical box size, but never get so small that a large box spans too many of them
+        sizes = np.concatenate([np.maximum(b[:, 2] - b[:, 0], b[:, 3] - b[:, 1]) for b in (boxes, others)])
+        span = max(others[:, 2].max() - others[:, 0].min(), others[:, 3].max() - others[:, 1].min())
+        cell = max(float(np.median(sizes)), span / 512) or 1.0
+        ox, oy = others[:, 0].min(), others[:, 1].min()
+
+        buckets = defaultdict(list)
+        c0 = np.floor((others[:, 0] - ox) / cell).astype(np.int64)
+        c1 = np.floor((others[:, 2] - ox) / cell).astype(np.int64)
+        r0 = np.floor((others[:, 1] - oy) / cell).astype(np.int64)
+        r1 = np.floor((others[:, 3] - oy) / cell).astype(np.int64)
+        for i in range(len(others)):
+            for c in range(c0[i], c1[i] + 1):
+                for r in range(r0[i], r1[i] + 1):
+                    buckets[(c, r)].append(i)
+
+        for i, (xmin, ymin, xmax, ymax) in enumerate(boxes):
+            candidates = set()
+            for c in range(math.floor((xmin - ox) / cell), math.floor((xmax - ox) / cell) + 1):
+                for r in range(math.floor((ymin - oy) / cell), math.floor((ymax - oy) / cell) + 1):
+                    candidates.update(buckets.get((c, r), ()))
+            if candidates:
+                o = others[list(candidates)]
+                result[i] = bool(np.any((o[:, 0] <= xmax) & (o[:, 2] >= xmin) & (o[:, 1] <= ymax) & (o[:, 3] >= ymin)))
+        return result
+
+    @staticmethod
+    def overlap_masks(layer_boxes):
+        """
+        Find, for every box of every layer, which other layers it overlaps.
+
+        All layers share one uniform grid, so a single sweep over the grid cells compares each box
+        only with the boxes of other layers in the cells it covers.
+
+        Parameters:
+        - layer_boxes (list): One (n, 4) box array per layer, at most 63 layers.
+
+        Returns:
+            list: One int64 array per layer, with bit j set for each box that overlaps a box of layer j.
+        """
+        lengths = [len(b) for b in layer_boxes]
+        if sum(lengths) == 0:
+            return [np.zeros(0, dtype=np.int64) for _ in layer_boxes]
+        boxes = np.concatenate([b for b in layer_boxes if len(b)])
+        layer = np.repeat(np.arange(len(layer_boxes)), lengths)
+        bits = np.left_shift(1, layer).astype(np.int64)
+        masks = np.zeros(len(boxes), dtype=np.int64)
+
+        sizes = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+        span = max(boxes[:, 2].max() - boxes[:, 0].min(), boxes[:, 3].max() - boxes[:, 1].min())
+        cell = max(float(np.median(sizes)), span / 512) or 1.0
+        ox, oy = boxes[:, 0].min(), boxes[:, 1].min()
+
+        buckets = defaultdict(list)
+        c0 = np.floor((boxes[:, 0] - ox) / cell).astype(np.int64)
+        c1 = np.floor((boxes[:, 2] - ox) / cell).astype(np.int64)
+        r0 = np.floor((boxes[:, 1] - oy) / cell).astype(np.int64)
+        r1 = np.floor((boxes[:, 3] - oy) / cell).astype(np.int64)
+        for i in range(len(boxes)):
+            for c in range(c0[i], c1[i] + 1):
+                for r in range(r0[i], r1[i] + 1):
+                    buckets[(c, r)].append(i)
+
+        for members in buckets.values():
+            idx = np.array(members)
+            if len(np.unique(layer[idx])) < 2:
+                continue
+            b = boxes[idx]
+            overlap = ((b[:, None, 0] <= b[None, :, 2]) & (b[:, None, 2] >= b[None, :, 0])
+                       & (b[:, None, 1] <= b[None, :, 3]) & (b[:, None, 3] >= b[None, :, 1])
+                       & (layer[idx][:, None] != layer[idx][None, :]))
+            masks[idx] |= np.bitwise_or.reduce(np.where(overlap, bits[idx][None, :], 0), axis=1)
+        return np.split(masks, np.cumsum(lengths)[:-1])
+
+    @staticmethod
+    def oid_where(layer_name, oids):
+        """
+        Build a where clause selecting a set of object ids, compressed into id ranges.
+        """
+        field = arcpy.AddFieldDelimiters(layer_name, arcpy.Describe(layer_name).OIDFieldName)
+        if len(oids) == 0:
+            return f"{field} < 0"
+        oids = np.sort(np.asarray(oids))
+        breaks = np.flatnonzero(np.diff(oids) != 1)
+        starts = np.concatenate([[oids[0]], oids[breaks + 1]])
+        ends = np.concatenate([oids[breaks], [oids[-1]]])
+        return " OR ".join(f"({field} = {s})" if s == e else f"({field} >= {s} AND {field} <= {e})"
+                           for s, e in zip(starts.tolist(), ends.tolist()))
+
+    def filtered_layer(self, layer_name, keep, view_name):
+        """
+        Make a feature layer over the kept features, or return the layer itself when nothing was pruned.
+        """
+        oids, _ = self.feature_boxes(layer_name)
+        if keep.all():
+            return layer_name
+        return arcpy.management.MakeFeatureLayer(layer_name, view_name, self.oid_where(layer_name, oids[keep]))[0]
+
+    @staticmethod
+    def report(layer_name, keep):
+        kept = int(keep.sum())
+        total = len(keep)
+        pruned = total - kept
+        percent = 100.0 * pruned / total if total else 0.0
+        print(f"Prefilter {layer_name}: kept {kept} of {total} features, pruned {pruned} ({percent:.1f}%)")
+        return {"layer": layer_name, "total": total, "kept": kept, "pruned": pruned}
+
+    def prefilter_intersect(self, layers):
+        """
+        Prune the inputs of an n-way intersect. A feature can only contribute if its box overlaps the common
+        extent of all layers and at least one box in every other layer.
+
+        Parameters:
+        - layers (list): The layers to intersect.
+
+        Returns:
+            tuple: (filtered layers, pruning statistics).
+        """
+        boxes = {name: self.feature_boxes(name)[1] for name in layers}
+        nonempty = [b for b in boxes.values() if len(b)]
+        if len(nonempty) < len(layers):
+            common = np.array([0.0, 0.0, -1.0, -1.0])
+        else:
+            common = np.array([max(b[:, 0].min() for b in nonempty), max(b[:, 1].min() for b in nonempty),
+                               min(b[:, 2].max() for b in nonempty), min(b[:, 3].max() for b in nonempty)])
+
+        filtered, stats = [], []
+        for name in layers:
+            b = boxes[name]
+            keep = (b[:, 0] <= common[2]) & (b[:, 2] >= common[0]) & (b[:, 1] <= common[3]) & (b[:, 3] >= common[1])
+            for other in layers:
+                if other != name and keep.any():
+                    keep[keep] = self.overlaps_any(b[keep], boxes[other])
+            filtered.append(self.filtered_layer(name, keep, f"{name}_prefiltered"))
+            stats.append(self.report(name, keep))
+        return filtered, stats
+
+    def prefilter_overlay(self, layers, min_layers):
+        """
+        Prune the inputs of an n-way overlay that only keeps areas covered by at least min_layers layers.
+        A feature can only contribute if its box overlaps boxes of at least min_layers - 1 other layers.
+
+        Parameters:
+        - layers (list): The layers to overlay.
+        - min_layers (int): The smallest number of layers an output area must be covered by.
+
+        Returns:
+            tuple: (filtered layers, pruning statistics).
+        """
+        masks = self.overlap_masks([self.feature_boxes(name)[1] for name in layers])
+        filtered, stats = [], []
+        for name, mask in zip(layers, masks):
+            others = sum((mask >> j) & 1 for j in range(len(layers)))
+            keep = np.asarray(others + 1 >= min_layers, dtype=bool).reshape(-1)
+            filtered.append(self.filtered_layer(name, keep, f"{name}_prefiltered"))
+            stats.append(self.report(name, keep))
+        return filtered, stats
+
+    def split_for_erase(self, input_layer, erase_layer):
+        """
+        Split the input of an erase into features that touch the erase layer and features that pass
+        through unchanged.
+
+        Parameters:
+        - input_layer (str): The layer to erase from.
+        - erase_layer (str): The erase layer.
+
+        Returns:
+            tuple: (touching layer, untouched layer or None, pruning statistics).
+        """
+        oids, b = self.feature_boxes(input_layer)
+        touching = self.overlaps_any(b, self.feature_boxes(erase_layer)[1])
+        stats = self.report(input_layer, touching)
+        untouched = None
+        if not touching.all():
+            untouched = arcpy.management.MakeFeatureLayer(
+                input_layer, f"{input_layer}_untouched", self.oid_where(input_layer, oids[~touching]))[0]
+        return self.filtered_layer(input_layer, touching, f"{input_layer}_touching"), untouched, stats
+
+    def prefilter_join(self, target_layer, join_layer):
+        """
+        Drop join features whose boxes touch no target feature. The targets are left alone, so KEEP_ALL
+        joins still return every target.
+
+        Parameters:
+        - target_layer (str): The target features, e.g. Addresses.
+        - join_layer (str): The join features.
+
+        Returns:
+            tuple: (filtered join layer, pruning statistics).
+        """
+        b = self.feature_boxes(join_layer)[1]
+        keep = self.overlaps_any(b, self.feature_boxes(target_layer)[1])
+        return self.filtered_layer(join_layer, keep, f"{join_layer}_prefiltered"), self.report(join_layer, keep)
@@ -0,0 +1,383 @@
+import hashlib
+import os
+
+import arcpy
+import numpy as np
+
+# Geometry types as reported by arcpy.Describe().shapeType
+POINT_TYPES = ("Point", "Multipoint")
+
+# arcpy field type -> NumPy dtype of the column
+FIELD_DTYPES = {
+    "SmallInteger": np.int16,
+    "Integer": np.int32,
+    "BigInteger": np.int64,
+    "Single": np.float32,
+    "Double": np.float64,
+    "String": np.str_,
+    "Date": "datetime64[s]",
+}
+
+
+def ragged_ranges(starts, ends):
+    """
+    Concatenate the integer ranges [starts[i], ends[i]) without a Python loop.
+
+    Returns:
+        numpy.ndarray: The indices of every range, in order.
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    nonempty = lengths > 0
+    steps = np.ones(total, dtype=np.int64)
+    first = np.concatenate([[0], np.cumsum(lengths[nonempty])[:-1]])
+    # Each range restarts at its own start: jump from the previous range's last index
+    prev_end = np.concatenate([[0], ends[nonempty][:-1] - 1])
+    steps[first] = starts[nonempty] - prev_end
+    steps[0] = starts[nonempty][0]
+    return np.cumsum(steps)
+
+
+def offsets_from_lengths(lengths):
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+
+class FeatureTable:
+    """
+    A columnar, in-memory layer: ragged coordinate arrays with part and ring offsets, plus typed
+    attribute columns.
+
+    Geometry is stored the way GeoArrow and the shapefile format do it:
+    - coords: (n, 2) coordinates, float64, or int32 when quantized
+    - ring_offsets: ring i is coords[ring_offsets[i]:ring_offsets[i + 1]]
+    - part_offsets: part j holds rings part_offsets[j] to part_offsets[j + 1]
+    - feature_offsets: feature k holds parts feature_offsets[k] to feature_offsets[k + 1]
+    Points are one part with one ring of one coordinate per point. Polyline parts have one ring.
+
+    Slicing, filtering and concatenation work on whole arrays, without per-feature Python objects,
+    so tables can be handed between stages, to GeometryStore, or to NumPy code directly.
+    """
+
+    def __init__(self, geometry_type, coords, ring_offsets, part_offsets, feature_offsets, ids=None,
+                 columns=None, scale=None, origin=None):
+        """
+        Parameters:
+        - geometry_type (str): "Point", "Multipoint", "Polyline" or "Polygon".
+        - coords (numpy.ndarray): (n, 2) coordinates; int32 grid positions when scale is given.
+        - ring_offsets, part_offsets, feature_offsets (numpy.ndarray): int64 offset arrays as described above.
+        - ids (numpy.ndarray): Object ids, one per feature. Defaults to 0..n-1.
+        - columns (dict): Field name -> 1-D array, one value per feature.
+        - scale (float): Grid size of quantized coordinates, or None.
+        - origin (tuple): (x, y) of grid position (0, 0) for quantized coordinates.
+        """
+        self.geometry_type = geometry_type
+        self.coords = np.asarray(coords).reshape(-1, 2)
+        self.ring_offsets = np.asarray(ring_offsets, dtype=np.int64)
+        self.part_offsets = np.asarray(part_offsets, dtype=np.int64)
+        self.feature_offsets = np.asarray(feature_offsets, dtype=np.int64)
+        count = len(self.feature_offsets) - 1
+        self.ids = np.arange(count, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        self.columns = {name: np.asarray(values) for name, values in (columns or {}).items()}
+        for name, values in self.columns.items():
+            if len(values) != count:
+                raise ValueError(f"Column {name} has {len(values)} values for {count} features")
+        self.scale = scale
+        self.origin = origin
+
+    def __len__(self):
+        return len(self.feature_offsets) - 1
+
+    @property
+    def nbytes(self):
+        """Bytes held by the table's arrays."""
+        arrays = [self.coords, self.ring_offsets, self.part_offsets, self.feature_offsets, self.ids]
+        return sum(a.nbytes for a in arrays + list(self.columns.values()))
+
+    def __repr__(self):
+        return (f"FeatureTable({self.geometry_type}, {len(self)} features, {len(self.coords)} vertices, "
+                f"columns={list(self.columns)}{', quantized' if self.scale else ''})")
+
+    @classmethod
+    def from_feature_class(cls, layer_name, fields=None, where_clause=None, spatial_reference=None):
+        """
+        Read a feature class or layer into a table.
+
+        Parameters:
+        - layer_name (str): The features to read.
+        - fields (list): Attribute fields to load. Defaults to none.
+        - where_clause (str): Optional filter.
+        - spatial_reference (arcpy.SpatialReference): Optional spatial reference to project into.
+
+        Returns:
+            FeatureTable: The table.
+        """
+        describe = arcpy.Describe(layer_name)
+        geometry_type = describe.shapeType
+        fields = list(fields or [])
+        field_types = {f.name: f.type for f in arcpy.ListFields(layer_name)}
+
+        coords, ring_lengths, part_rings, feature_parts, ids = [], [], [], [], []
+        values = {name: [] for name in fields}
+        with arcpy.da.SearchCursor(layer_name, ["OID@", "SHAPE@"] + fields, where_clause,
+                                   spatial_reference=spatial_reference) as cursor:
+            for row in cursor:
+                shape = row[1]
+                parts = 0
+                if shape is not None:
+                    if geometry_type in POINT_TYPES:
+                        points = shape if geometry_type == "Multipoint" else [shape.firstPoint]
+                        for p in points:
+                            coords.append((p.X, p.Y))
+                            ring_lengths.append(1)
+                            part_rings.append(1)
+                            parts += 1
+                    else:
+                        for part in shape:
+                            rings, length = 0, 0
+                            for p in part:
+                                # Polygon rings within a part are separated by None
+                                if p is None:
+                                    ring_lengths.append(length)
+                                    rings += 1
+                                    length = 0
+                                else:
+                                    coords.append((p.X, p.Y))
+                                    length += 1
+                            ring_lengths.append(length)
+                            part_rings.append(rings + 1)
+                            parts += 1
+                feature_parts.append(parts)
+                ids.append(row[0])
+                for name, value in zip(fields, row[2:]):
+                    values[name].append(value)
+
+        columns = {name: cls.typed_column(column, field_types.get(name)) for name, column in values.items()}
+        return cls(geometry_type, np.array(coords, dtype=np.float64).reshape(-1, 2),
+                   offsets_from_lengths(ring_lengths), offsets_from_lengths(part_rings),
+                   offsets_from_lengths(feature_parts), ids, columns)
+
+    @staticmethod
+    def typed_column(values, field_type):
+        """
+        Convert a list of cursor values to a typed array. Integer fields with nulls become float64 with NaN,
+        strings use "" for null.
+        """
+        dtype = FIELD_DTYPES.get(field_type)
+        if dtype is np.str_:
+            return np.array(["" if v is None else v for v in values], dtype=np.str_)
+        if dtype is not None and any(v is None for v in values):
+            if np.issubdtype(np.dtype(dtype), np.integer) or np.issubdtype(np.dtype(dtype), np.floating):
+                return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+            return np.array(values, dtype=dtype)
+        return np.array(values, dtype=dtype) if dtype is not None else np.array(values)
+
+    @property
+    def xy(self):
+        """
+        Returns:
+            numpy.ndarray: (n, 2) float64 coordinates, dequantized if needed.
+        """
+        if self.scale is None:
+            return self.coords
+        return self.coords * self.scale + np.asarray(self.origin)
+
+    def take(self, indices):
+        """
+        Select features by position.
+
+        Parameters:
+        - indices (numpy.ndarray): Integer positions, in the order wanted.
+
+        Returns:
+            FeatureTable: A new table with only those features.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        parts = ragged_ranges(self.feature_offsets[indices], self.feature_offsets[indices + 1])
+        rings = ragged_ranges(self.part_offsets[parts], self.part_offsets[parts + 1])
+        vertices = ragged_ranges(self.ring_offsets[rings], self.ring_offsets[rings + 1])
+        return FeatureTable(
+            self.geometry_type,
+            self.coords[vertices],
+            offsets_from_lengths(self.ring_offsets[rings + 1] - self.ring_offsets[rings]),
+            offsets_from_lengths(self.part_offsets[parts + 1] - self.part_offsets[parts]),
+            offsets_from_lengths(self.feature_offsets[indices + 1] - self.feature_offsets[indices]),
+            self.ids[indices],
+            {name: values[indices] for name, values in self.columns.items()},
+            self.scale, self.origin
+        )
+
+    def __getitem__(self, key):
+        """
+        table[slice], table[boolean mask] or table[integer positions] -> a new FeatureTable.
+        """
+        if isinstance(key, slice):
+            return self.take(np.arange(len(self))[key])
+        key = np.asarray(key)
+        if key.dtype == bool:
+            return self.filter(key)
+        return self.take(key)
+
+    def filter(self, mask):
+        """
+        Keep the features where mask is True.
+
+        Parameters:
+        - mask (numpy.ndarray): Boolean array, one value per feature, e.g. table.columns["Join_Count"] == 1.
+        """
+        return self.take(np.flatnonzero(mask))
+
+    @classmethod
+    def concat(cls, tables):
+        """
+        Stack tables of the same geometry type, columns and quantization into one.
+
+        Parameters:
+        - tables (list): FeatureTable instances.
+
+        Returns:
+            FeatureTable: The combined table.
+        """
+        first = tables[0]
+        for table in tables[1:]:
+            if table.geometry_type != first.geometry_type or set(table.columns) != set(first.columns) \
+                    or table.scale != first.scale or table.origin != first.origin:
+                raise ValueError("Tables must share geometry type, columns and quantization")
+
+        def shifted(name, base_name):
+            pieces, base = [], 0
+            for i, table in enumerate(tables):
+                offsets = getattr(table, name)
+                pieces.append(offsets[(1 if i else 0):] + base)
+                base += len(getattr(table, base_name)) - (1 if base_name.endswith("offsets") else 0)
+            return np.concatenate(pieces)
+
+        return cls(
+            first.geometry_type,
+            np.concatenate([t.coords for t in tables]),
+            shifted("ring_offsets", "coords"),
+            shifted("part_offsets", "ring_offsets"),
+            shifted("feature_offsets", "part_offsets"),
+            np.concatenate([t.ids for t in tables]),
+            {name: np.concatenate([t.columns[name] for t in tables]) for name in first.columns},
+            first.scale, first.origin
+        )
+
+    def quantize(self, resolution, origin=None):
+        """
+        Store coordinates as int32 grid positions, halving their memory.
+
+        Parameters:
+        - resolution (float): Grid size in map units; coordinates move by at most half of it.
+        - origin (tuple): (x, y) of the grid origin. Defaults to the table's lower-left corner.
+
+        Returns:
+            FeatureTable: A quantized copy.
+        """
+        xy = self.xy
+        if origin is None:
+            origin = (float(xy[:, 0].min()), float(xy[:, 1].min())) if len(xy) else (0.0, 0.0)
+        grid = np.rint((xy - np.asarray(origin)) / resolution)
+        if len(grid) and np.abs(grid).max() > np.iinfo(np.int32).max:
+            raise ValueError(f"Resolution {resolution} is too fine for the extent of the table")
+        return FeatureTable(self.geometry_type, grid.astype(np.int32), self.ring_offsets, self.part_offsets,
+                            self.feature_offsets, self.ids, self.columns, float(resolution), origin)
+
+    def bounds(self):
+        """
+        Returns:
+            numpy.ndarray: (features, 4) array of xmin, ymin, xmax, ymax. Features without vertices get NaN.
+        """
+        xy = self.xy
+        first_vertex = self.ring_offsets[self.part_offsets[self.feature_offsets]]
+        starts, ends = first_vertex[:-1], first_vertex[1:]
+        result = np.full((len(self), 4), np.nan)
+        nonempty = ends > starts
+        if nonempty.any():
+            s = starts[nonempty]
+            result[nonempty, 0] = np.minimum.reduceat(xy[:, 0], s)
+            result[nonempty, 1] = np.minimum.reduceat(xy[:, 1], s)
+            result[nonempty, 2] = np.maximum.reduceat(xy[:, 0], s)
+            result[nonempty, 3] = np.maximum.reduceat(xy[:, 1], s)
+        return result
+
+    def checksum(self):
+        """
+        Returns:
+            str: A SHA-1 digest of the object ids and geometry, so any edit to a feature changes it.
+        """
+        digest = hashlib.sha1(f"{self.geometry_type}:{self.scale}:{self.origin}".encode("utf-8"))
+        for array in (self.ids, self.feature_offsets, self.part_offsets, self.ring_offsets, self.coords):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def part_rings(self):
+        """
+        Yield the rings of each part as (n, 2) coordinate array views, e.g. for rasterizing polygons.
+        """
+        xy = self.xy
+        for p in range(len(self.part_offsets) - 1):
+            yield [xy[self.ring_offsets[r]:self.ring_offsets[r + 1]]
+                   for r in range(self.part_offsets[p], self.part_offsets[p + 1])]
+
+    def to_arrays(self):
+        """
+        Returns:
+            tuple: (arrays, meta). arrays can be placed in a GeometryStore; meta is small and picklable.
+        """
+        arrays = {"coords": self.coords, "ring_offsets": self.ring_offsets, "part_offsets": self.part_offsets,
+                  "feature_offsets": self.feature_offsets, "ids": self.ids}
+        arrays.update({f"col:{name}": values for name, values in self.columns.items()})
+        return arrays, {"geometry_type": self.geometry_type, "scale": self.scale, "origin": self.origin}
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """
+        Rebuild a table from to_arrays() output, e.g. the arrays of an attached GeometryStore, without copying.
+        """
+        columns = {key[4:]: values for key, values in arrays.items() if key.startswith("col:")}
+        return cls(meta["geometry_type"], arrays["coords"], arrays["ring_offsets"], arrays["part_offsets"],
+                   arrays["feature_offsets"], arrays["ids"], columns, meta["scale"], meta["origin"])
+
+    def to_feature_class(self, output_layer, spatial_reference):
+        """
+        Write the table to a new feature class.
+
+        Parameters:
+        - output_layer (str): The output feature class.
+        - spatial_reference (arcpy.SpatialReference): The coordinate system of the coordinates.
+
+        Returns:
+            str: The name of the output feature class.
+        """
+        out_path, out_name = os.path.split(output_layer)
+        arcpy.management.CreateFeatureclass(out_path or arcpy.env.workspace, out_name, self.geometry_type.upper(),
+                                            spatial_reference=spatial_reference)
+        field_types = {"i": "LONG", "u": "LONG", "f": "DOUBLE", "U": "TEXT", "M": "DATE", "b": "SHORT"}
+        for name, values in self.columns.items():
+            arcpy.management.AddField(output_layer, name, field_types.get(values.dtype.kind, "TEXT"))
+
+        xy = self.xy
+        names = list(self.columns)
+        with arcpy.da.InsertCursor(output_layer, ["SHAPE@"] + names) as cursor:
+            for k in range(len(self)):
+                parts = []
+                for p in range(self.feature_offsets[k], self.feature_offsets[k + 1]):
+                    part = arcpy.Array()
+                    for i, r in enumerate(range(self.part_offsets[p], self.part_offsets[p + 1])):
+                        if i:
+                            part.add(None)
+                        for x, y in xy[self.ring_offsets[r]:self.ring_offsets[r + 1]].tolist():
+                            part.add(arcpy.Point(x, y))
+                    parts.append(part)
+                if self.geometry_type == "Point":
+                    shape = arcpy.PointGeometry(parts[0][0], spatial_reference) if parts else None
+                elif self.geometry_type == "Multipoint":
+                    shape = arcpy.Multipoint(arcpy.Array([part[0] for part in parts]), spatial_reference)
+                elif self.geometry_type == "Polyline":
+                    shape = arcpy.Polyline(arcpy.Array(parts), spatial_reference)
+                else:
+                    shape = arcpy.Polygon(arcpy.Array(parts), spatial_reference)
+                cursor.insertRow([shape] + [values[k].item() for values in self.columns.values()])
+        return output_layer
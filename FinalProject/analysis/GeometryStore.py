@@ -0,0 +1,138 @@
+import atexit
+import os
+import sys
+import uuid
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Prefix of every segment this module creates, followed by the owner's process id
+SEGMENT_PREFIX = "wnv_geom"
+ALIGNMENT = 64
+
+
+class GeometryStore:
+    """
+    Named NumPy arrays placed in one shared memory segment, for handing geometry to worker processes.
+
+    The parent creates the store from coordinate, offset and attribute arrays and passes the small,
+    picklable manifest to its workers. Workers attach by name and get read-only views of the same
+    memory, so no array is pickled or copied per task.
+
+    The creating process owns the segment and unlinks it on close(), at interpreter exit, or the next
+    time a store is created after a crash. Segment names carry the owner's process id so segments of
+    dead owners can be found. On Windows the segment is freed by the OS once every handle is closed.
+    """
+
+    def __init__(self, shm, manifest, owner):
+        self._shm = shm
+        self.manifest = manifest
+        self.owner = owner
+        self.arrays = {}
+        for key, (dtype, shape, offset) in manifest["arrays"].items():
+            view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            if not owner:
+                view.flags.writeable = False
+            self.arrays[key] = view
+
+    @classmethod
+    def create(cls, arrays):
+        """
+        Copy arrays into a new shared memory segment.
+
+        Parameters:
+        - arrays (dict): Name -> NumPy array. Object arrays are not supported.
+
+        Returns:
+            GeometryStore: The owning store.
+        """
+        cls.cleanup_stale()
+        layout, size = {}, 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise ValueError(f"Array {key} has an object dtype and cannot be shared")
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            layout[key] = (array.dtype.str, array.shape, size)
+            size += array.nbytes
+
+        name = f"{SEGMENT_PREFIX}_{os.getpid()}_{uuid.uuid4().hex[:12]}"
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        store = cls(shm, {"name": shm.name, "arrays": layout}, owner=True)
+        for key, array in arrays.items():
+            store.arrays[key][...] = array
+        atexit.register(store.close)
+        return store
+
+    @classmethod
+    def attach(cls, manifest):
+        """
+        Attach to a store created by another process.
+
+        Parameters:
+        - manifest (dict): The owner's manifest.
+
+        Returns:
+            GeometryStore: A read-only store. close() detaches without unlinking.
+        """
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=manifest["name"], track=False)
+        else:
+            # Pool workers share the owner's resource tracker, so registering the segment again is harmless
+            shm = shared_memory.SharedMemory(name=manifest["name"])
+        return cls(shm, manifest, owner=False)
+
+    def close(self):
+        """
+        Release the views and the segment handle. The owner also unlinks the segment.
+        """
+        if self._shm is None:
+            return
+        self.arrays = {}
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still holds a view; the mapping goes away with it
+            pass
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            atexit.unregister(self.close)
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def cleanup_stale():
+        """
+        Unlink segments left behind by owners that died without closing them. Only needed on POSIX,
+        where segments live in /dev/shm until unlinked.
+
+        Returns:
+            int: The number of segments removed.
+        """
+        shm_dir = "/dev/shm"
+        if os.name != "posix" or not os.path.isdir(shm_dir):
+            return 0
+        removed = 0
+        for entry in os.listdir(shm_dir):
+            if not entry.startswith(f"{SEGMENT_PREFIX}_"):
+                continue
+            try:
+                pid = int(entry[len(SEGMENT_PREFIX) + 1:].split("_")[0])
+                os.kill(pid, 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                os.unlink(os.path.join(shm_dir, entry))
+                removed += 1
+            except PermissionError:
+                # The owner is alive but belongs to another user
+                continue
+        return removed
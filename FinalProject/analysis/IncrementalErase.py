@@ -0,0 +1,259 @@
+import json
+import os
+
+import arcpy
+
+from catalog.WorkspaceCatalog import CATALOG
+
+
+class IncrementalErase:
+    """
+    Keeps erased_intersect and target_addresses up to date as avoid_points change, without re-running
+    the avoid_points buffer, the erase or the spatial join over the whole study area.
+
+    A snapshot of the avoid points used by the last run is kept in the project directory. On update,
+    only the regions around added or removed avoid points are recomputed:
+    - the avoid point buffer layer gains the buffers of added points and loses those of removed ones
+    - added points: their buffers are cut out of the erase features they touch
+    - removed points: the intersect is re-clipped inside their buffers, minus the buffers of the
+      remaining nearby avoid points, and the pieces are merged back into the erase feature of the
+      intersect feature they came from, so no seam is left between trimmed and refilled parts
+    Addresses inside those regions are spatially joined again and their rows updated in place.
+    """
+
+    def __init__(self, config_dict, buff_dist):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses 'proj_dir' and the optional 'erase_snapshot'
+          and 'address_layer' keys.
+        - buff_dist (float): The avoid point buffer distance in map units.
+        """
+        self.snapshot_path = f"{config_dict.get('proj_dir')}{config_dict.get('erase_snapshot', 'erase_snapshot.json')}"
+        self.address_layer = config_dict.get('address_layer', 'Addresses')
+        self.buff_dist = buff_dist
+
+    @staticmethod
+    def read_points(layer_name):
+        """
+        Read point coordinates as a set of rounded (x, y) tuples, so they can be compared between runs.
+
+        Parameters:
+        - layer_name (str): The point feature class.
+        """
+        with arcpy.da.SearchCursor(layer_name, ["SHAPE@XY"]) as cursor:
+            return {(round(x, 3), round(y, 3)) for (x, y), in cursor if x is not None}
+
+    def save_snapshot(self, avoid_layer, intersect_layer):
+        """
+        Record the avoid points and intersect layer used by a full run.
+
+        Parameters:
+        - avoid_layer (str): The avoid point feature class.
+        - intersect_layer (str): The intersect layer the erase was run on.
+        """
+        snapshot = {
+            "intersect_layer": intersect_layer,
+            "buff_dist": self.buff_dist,
+            "points": sorted(self.read_points(avoid_layer)),
+        }
+        with open(self.snapshot_path, "w") as f:
+            json.dump(snapshot, f)
+
+    def load_snapshot(self):
+        """
+        Returns:
+            dict: The last snapshot, or None if there is none or it was taken with another buffer distance.
+        """
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with open(self.snapshot_path) as f:
+            snapshot = json.load(f)
+        if snapshot.get("buff_dist") != self.buff_dist:
+            return None
+        snapshot["points"] = {tuple(p) for p in snapshot["points"]}
+        return snapshot
+
+    def buffer_union(self, points, spatial_ref):
+        """
+        Union of the buffers around a set of points, or None for no points.
+        """
+        union = None
+        for x, y in points:
+            buf = arcpy.PointGeometry(arcpy.Point(x, y), spatial_ref).buffer(self.buff_dist)
+            union = buf if union is None else union.union(buf)
+        return union
+
+    @staticmethod
+    def select_oids(layer_name, geometry):
+        """
+        Return the OIDs of features in a layer that intersect a geometry.
+        """
+        view = arcpy.management.MakeFeatureLayer(layer_name, f"{layer_name}_dirty_view")
+        try:
+            arcpy.management.SelectLayerByLocation(view, "INTERSECT", geometry)
+            with arcpy.da.SearchCursor(view, ["OID@"]) as cursor:
+                return [oid for oid, in cursor]
+        finally:
+            arcpy.management.Delete(view)
+
+    @staticmethod
+    def oid_where(layer_name, oids):
+        field = arcpy.AddFieldDelimiters(layer_name, arcpy.Describe(layer_name).OIDFieldName)
+        return f"{field} IN ({','.join(str(oid) for oid in oids)})"
+
+    def patch_buffers(self, avoid_layer, buffer_layer, added, removed):
+        """
+        Bring the avoid point buffer layer up to date without buffering every point again.
+
+        Parameters:
+        - avoid_layer (str): The current avoid point feature class.
+        - buffer_layer (str): The Buffer output of the last full run, e.g. buf_avoid_points.
+        - added (set): Rounded (x, y) of the avoid points added since the snapshot.
+        - removed (set): Rounded (x, y) of the avoid points removed since the snapshot.
+        """
+        # Buffer features are matched to points by their centroid, which is the buffered point
+        if removed:
+            with arcpy.da.UpdateCursor(buffer_layer, ["SHAPE@TRUECENTROID"]) as cursor:
+                for (x, y), in cursor:
+                    if any(abs(x - rx) <= 0.01 and abs(y - ry) <= 0.01 for rx, ry in removed):
+                        cursor.deleteRow()
+        if added:
+            spatial_ref = CATALOG.spatial_reference(buffer_layer)
+            names = {name for name, _ in CATALOG.fields(buffer_layer)}
+            fields = [name for name in ("ORIG_FID", "BUFF_DIST") if name in names]
+            with arcpy.da.SearchCursor(avoid_layer, ["OID@", "SHAPE@XY"]) as cursor:
+                oids = {(round(x, 3), round(y, 3)): oid for oid, (x, y) in cursor if x is not None}
+            with arcpy.da.InsertCursor(buffer_layer, ["SHAPE@"] + fields) as cursor:
+                for x, y in added:
+                    values = {"ORIG_FID": oids.get((x, y)), "BUFF_DIST": self.buff_dist}
+                    buf = arcpy.PointGeometry(arcpy.Point(x, y), spatial_ref).buffer(self.buff_dist)
+                    cursor.insertRow([buf] + [values[name] for name in fields])
+
+    def update(self, avoid_layer, buffer_layer, erased_layer, target_layer):
+        """
+        Patch the avoid point buffers, the erase result and the targeted addresses for the avoid points
+        added or removed since the snapshot.
+
+        Parameters:
+        - avoid_layer (str): The current avoid point feature class.
+        - buffer_layer (str): The avoid point buffers from the last run, updated in place.
+        - erased_layer (str): The erase result from the last run, updated in place.
+        - target_layer (str): The joined address layer from the last run, updated in place.
+
+        Returns:
+            bool: True if the layers were brought up to date, False if a full run is needed instead.
+        """
+        snapshot = self.load_snapshot()
+        if snapshot is None or not CATALOG.exists(snapshot["intersect_layer"]) \
+                or not CATALOG.exists(buffer_layer) or not CATALOG.exists(erased_layer) \
+                or not CATALOG.exists(target_layer):
+            return False
+
+        current = self.read_points(avoid_layer)
+        added = current - snapshot["points"]
+        removed = snapshot["points"] - current
+        print(f"Incremental erase: {len(added)} avoid points added, {len(removed)} removed")
+        if not added and not removed:
+            return True
+
+        self.patch_buffers(avoid_layer, buffer_layer, added, removed)
+
+        spatial_ref = CATALOG.spatial_reference(erased_layer)
+        added_area = self.buffer_union(added, spatial_ref)
+        removed_area = self.buffer_union(removed, spatial_ref)
+        fields = [name for name, field_type in CATALOG.fields(erased_layer)
+                  if field_type not in ("OID", "Geometry") and not name.lower().startswith("shape_")]
+
+        # Every erase feature touching a changed region loses that region; removed regions are refilled below
+        dirty = added_area if removed_area is None else (removed_area if added_area is None else added_area.union(removed_area))
+        trimmed = self.select_oids(erased_layer, dirty)
+        if trimmed:
+            with arcpy.da.UpdateCursor(erased_layer, ["SHAPE@"], self.oid_where(erased_layer, trimmed)) as cursor:
+                for (shape,) in cursor:
+                    remaining = shape.difference(dirty)
+                    if remaining.area > 0:
+                        cursor.updateRow([remaining])
+                    else:
+                        cursor.deleteRow()
+
+        if removed_area is not None:
+            # Avoid points that can reach into the removed regions still erase there
+            nearby = [p for p in current
+                      if any(abs(p[0] - r[0]) <= 2 * self.buff_dist and abs(p[1] - r[1]) <= 2 * self.buff_dist
+                             for r in removed)]
+            refill = removed_area
+            nearby_area = self.buffer_union(nearby, spatial_ref)
+            if nearby_area is not None:
+                refill = refill.difference(nearby_area)
+
+            intersect_layer = snapshot["intersect_layer"]
+            oids = self.select_oids(intersect_layer, refill) if refill.area > 0 else []
+            if oids:
+                # Erase writes one feature per intersect feature, identified by the intersect attributes
+                patches = {}
+                with arcpy.da.SearchCursor(intersect_layer, ["SHAPE@"] + fields,
+                                           self.oid_where(intersect_layer, oids)) as cursor:
+                    for row in cursor:
+                        piece = row[0].intersect(refill, 4)
+                        if piece.area > 0:
+                            key = tuple(row[1:])
+                            patches[key] = piece if key not in patches else patches[key].union(piece)
+                # Merge each piece into its trimmed feature, so an address on the seam joins one feature, not two.
+                # A feature the piece belongs to was cut at the removed buffer's edge, so it is among the trimmed ones.
+                if trimmed:
+                    with arcpy.da.UpdateCursor(erased_layer, ["SHAPE@"] + fields,
+                                               self.oid_where(erased_layer, trimmed)) as cursor:
+                        for row in cursor:
+                            piece = patches.pop(tuple(row[1:]), None)
+                            if piece is not None:
+                                cursor.updateRow([row[0].union(piece)] + list(row[1:]))
+                with arcpy.da.InsertCursor(erased_layer, ["SHAPE@"] + fields) as cursor:
+                    for key, piece in patches.items():
+                        cursor.insertRow([piece] + list(key))
+
+        self.reevaluate_addresses(erased_layer, target_layer, dirty)
+        self.save_snapshot(avoid_layer, snapshot["intersect_layer"])
+        return True
+
+    def reevaluate_addresses(self, erased_layer, target_layer, dirty):
+        """
+        Spatially join the addresses inside the changed regions again and update their rows, so Join_Count
+        and the joined erase attributes both match a full run.
+
+        Parameters:
+        - erased_layer (str): The patched erase result.
+        - target_layer (str): The joined address layer.
+        - dirty (arcpy.Geometry): The changed regions.
+        """
+        address_oids = self.select_oids(target_layer, dirty)
+        if not address_oids:
+            return
+
+        with arcpy.da.SearchCursor(target_layer, ["TARGET_FID"], self.oid_where(target_layer, address_oids)) as cursor:
+            target_fids = [fid for fid, in cursor]
+        addresses = arcpy.management.MakeFeatureLayer(
+            self.address_layer, f"{self.address_layer}_dirty", self.oid_where(self.address_layer, target_fids))
+        rejoined = r"memory\incremental_rejoin"
+        try:
+            arcpy.analysis.SpatialJoin(addresses, erased_layer, rejoined,
+                                       join_operation="JOIN_ONE_TO_ONE", join_type="KEEP_ALL")
+            # Same inputs as the full run, so the rejoined rows have the target layer's schema
+            rejoined_fields = {f.name for f in arcpy.ListFields(rejoined)}
+            fields = [name for name, field_type in CATALOG.fields(target_layer)
+                      if field_type not in ("OID", "Geometry") and not name.lower().startswith("shape_")
+                      and name != "TARGET_FID" and name in rejoined_fields]
+            with arcpy.da.SearchCursor(rejoined, ["TARGET_FID"] + fields) as cursor:
+                joined = {row[0]: list(row[1:]) for row in cursor}
+        finally:
+            arcpy.management.Delete(addresses)
+            arcpy.management.Delete(rejoined)
+
+        changed = 0
+        with arcpy.da.UpdateCursor(target_layer, ["TARGET_FID"] + fields,
+                                   self.oid_where(target_layer, address_oids)) as cursor:
+            for row in cursor:
+                values = joined.get(row[0])
+                if values is not None and values != list(row[1:]):
+                    cursor.updateRow([row[0]] + values)
+                    changed += 1
+        print(f"Incremental erase: re-joined {len(address_oids)} addresses, {changed} changed")
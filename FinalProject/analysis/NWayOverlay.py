@@ -0,0 +1,102 @@
+import arcpy
+
+from analysis.ExtentIndex import ExtentIndex
+from catalog.WorkspaceCatalog import CATALOG
+
+# Lineage fields added to every output polygon
+MASK_FIELD = "SRC_MASK"
+COUNT_FIELD = "SRC_COUNT"
+LAYERS_FIELD = "SRC_LAYERS"
+
+
+class NWayOverlay:
+    """
+    Overlays any number of polygon layers in one pass and records which layers cover each output polygon.
+
+    All inputs go through a single Union, which splits them at every boundary in one planar sweep, so no
+    pairwise intermediate is written however many layers there are. Only the FID_<input> fields are
+    carried over; they point each polygon back to its source feature in every input (-1 where an input
+    is absent). One cursor pass turns them into layer-level lineage fields:
+    - SRC_MASK: bit i is set when input i covers the polygon
+    - SRC_COUNT: how many inputs cover the polygon
+    - SRC_LAYERS: the covering inputs as ';name;name;', for LIKE queries
+
+    A k-of-n overlap is the query SRC_COUNT >= k, and the full intersect of all inputs is SRC_COUNT = n.
+    With more than two inputs, Union needs an Advanced license, as Intersect does.
+    """
+
+    # SRC_MASK is a 32-bit signed integer field
+    MAX_LAYERS = 31
+
+    def __init__(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses the optional 'overlay_prefilter' key.
+        """
+        self.config_dict = config_dict
+        self.prefilter = config_dict.get('overlay_prefilter')
+
+    @staticmethod
+    def where_clause(min_layers=1, required=()):
+        """
+        Build a where clause selecting output polygons by lineage.
+
+        Parameters:
+        - min_layers (int): Polygons covered by at least this many layers.
+        - required (list): Layers that must cover the polygon.
+
+        Returns:
+            str: The where clause.
+        """
+        clauses = [f"{COUNT_FIELD} >= {int(min_layers)}"]
+        clauses += [f"{LAYERS_FIELD} LIKE '%;{name};%'" for name in required]
+        return " AND ".join(clauses)
+
+    def overlay(self, layers, output_layer, min_layers=1):
+        """
+        Overlay the layers and keep the polygons covered by at least min_layers of them.
+
+        Parameters:
+        - layers (list): The polygon layers, e.g. the buffer outputs.
+        - output_layer (str): The output feature class.
+        - min_layers (int): Polygons covered by fewer layers are dropped; 1 keeps the whole union.
+
+        Returns:
+            dict: The number of layers, the polygons kept and dropped, and the kept polygons by SRC_COUNT.
+        """
+        if len(layers) > self.MAX_LAYERS:
+            raise ValueError(f"At most {self.MAX_LAYERS} layers can be overlaid, got {len(layers)}")
+
+        inputs = layers
+        if self.prefilter and min_layers >= 2:
+            inputs, stats = ExtentIndex(self.config_dict).prefilter_overlay(layers, min_layers)
+            print(f"Overlay prefilter: {stats}")
+
+        arcpy.analysis.Union(inputs, output_layer, "ONLY_FID", gaps="GAPS")
+        CATALOG.invalidate(output_layer)
+
+        # Union writes one FID_<input> field per input, in input order; -1 where the input is absent
+        fid_fields = [f.name for f in arcpy.ListFields(output_layer) if f.name.upper().startswith("FID_")]
+        if len(fid_fields) != len(layers):
+            raise RuntimeError(f"Expected {len(layers)} FID fields in {output_layer}, found {fid_fields}")
+
+        names = [str(name) for name in layers]
+        arcpy.management.AddField(output_layer, MASK_FIELD, "LONG")
+        arcpy.management.AddField(output_layer, COUNT_FIELD, "SHORT")
+        arcpy.management.AddField(output_layer, LAYERS_FIELD, "TEXT", field_length=len(";".join(names)) + 2)
+
+        kept, dropped, by_count = 0, 0, {}
+        with arcpy.da.UpdateCursor(output_layer, fid_fields + [MASK_FIELD, COUNT_FIELD, LAYERS_FIELD]) as cursor:
+            for row in cursor:
+                covering = [i for i, fid in enumerate(row[:len(layers)]) if fid is not None and fid >= 0]
+                if len(covering) < min_layers:
+                    cursor.deleteRow()
+                    dropped += 1
+                    continue
+                mask = sum(1 << i for i in covering)
+                lineage = ";" + ";".join(names[i] for i in covering) + ";"
+                cursor.updateRow(list(row[:len(layers)]) + [mask, len(covering), lineage])
+                kept += 1
+                by_count[len(covering)] = by_count.get(len(covering), 0) + 1
+
+        return {"layers": len(layers), "kept": kept, "dropped": dropped, "by_count": dict(sorted(by_count.items()))}
@@ -0,0 +1,102 @@
+import json
+import os
+
+import arcpy
+
+from catalog.WorkspaceCatalog import CATALOG
+
+
+class PolygonSimplifier:
+    """
+    Thins out polygon vertices before buffering, with a tolerance derived from the buffer distance.
+
+    Point-remove (Douglas-Peucker) simplification moves no boundary more than the tolerance away from
+    the original, and buffering does not grow that distance, so the buffer of a simplified polygon is
+    within the tolerance of the buffer of the original. An address can only change sides if it lies
+    within the tolerance of a buffer edge. Topology errors introduced by the simplification are
+    resolved by the tool, and polygons that would collapse are kept unsimplified.
+
+    Simplified copies are kept in the workspace, one per layer and tolerance, and reused while the
+    source layer's geometry checksum is unchanged.
+    """
+
+    def __init__(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses 'proj_dir' and the optional 'simplify_ratio'
+          and 'simplify_cache' keys.
+        """
+        self.ratio = config_dict.get('simplify_ratio', 0.01)
+        self.manifest_path = f"{config_dict.get('proj_dir')}{config_dict.get('simplify_cache', 'simplify_cache.json')}"
+
+    def tolerance(self, buff_dist):
+        """
+        Returns:
+            float: The simplification tolerance, and error bound, in map units for a buffer distance in map units.
+        """
+        return buff_dist * self.ratio
+
+    @staticmethod
+    def output_name(layer_name, tolerance):
+        return f"{layer_name}_simp_{tolerance:.3f}".replace(".", "_")
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def write_manifest(self, manifest):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def simplified(self, layer_name, buff_dist):
+        """
+        Get a simplified copy of a polygon layer for a buffer distance, building it if the cached copy is missing or stale.
+
+        Parameters:
+        - layer_name (str): The polygon feature class.
+        - buff_dist (float): The buffer distance in map units the copy will be buffered by.
+
+        Returns:
+            str: The name of the simplified feature class, or layer_name itself if it is not a polygon layer.
+        """
+        if arcpy.Describe(layer_name).shapeType != "Polygon":
+            return layer_name
+
+        tolerance = self.tolerance(buff_dist)
+        output_name = self.output_name(layer_name, tolerance)
+        signature = CATALOG.checksum(layer_name)
+        manifest = self.read_manifest()
+        if manifest.get(output_name) == signature and CATALOG.exists(output_name):
+            print(f"Using cached {output_name}")
+            return output_name
+
+        collapsed_name = f"{output_name}_Pnt"
+        arcpy.cartography.SimplifyPolygon(
+            layer_name, output_name, "POINT_REMOVE", tolerance,
+            error_option="RESOLVE_ERRORS", collapsed_point_option="KEEP_COLLAPSED_POINTS"
+        )
+        CATALOG.invalidate(output_name, collapsed_name)
+
+        # Polygons smaller than the tolerance collapse to points; their buffers still count, so keep the originals
+        if CATALOG.exists(collapsed_name):
+            with arcpy.da.SearchCursor(collapsed_name, ["InPoly_FID"]) as cursor:
+                collapsed = sorted({fid for fid, in cursor})
+            if collapsed:
+                oid_field = arcpy.AddFieldDelimiters(layer_name, arcpy.Describe(layer_name).OIDFieldName)
+                originals = arcpy.management.MakeFeatureLayer(
+                    layer_name, f"{output_name}_collapsed", f"{oid_field} IN ({','.join(str(fid) for fid in collapsed)})"
+                )
+                arcpy.management.Append(originals, output_name, "NO_TEST")
+                arcpy.management.Delete(originals)
+                CATALOG.invalidate(output_name)
+            arcpy.management.Delete(collapsed_name)
+            CATALOG.invalidate(collapsed_name)
+
+        manifest[output_name] = signature
+        self.write_manifest(manifest)
+        print(f"Simplified {layer_name} to {output_name} with tolerance {tolerance:.2f} map units")
+        return output_name
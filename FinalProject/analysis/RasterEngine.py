@@ -0,0 +1,267 @@
+import math
+
+import arcpy
+import numpy as np
+from scipy import ndimage
+
+from analysis.FeatureTable import POINT_TYPES
+from catalog.WorkspaceCatalog import CATALOG
+
+
+class RasterEngine:
+    """
+    Screening-level raster stand-in for the buffer, intersect and erase overlays.
+
+    Layers are rasterized onto a regular grid covering the study area. Buffers are thresholds of a
+    Euclidean distance transform, intersect and erase are boolean array operations, and address
+    membership is a direct grid lookup. Results are approximate: every answer is exact to within
+    error_bound() map units of the true vector overlay.
+    """
+
+    def __init__(self, extent, cell_size, spatial_reference=None):
+        """
+        Set up the analysis grid.
+
+        Args:
+            extent (tuple): (xmin, ymin, xmax, ymax) of the study area in map units.
+            cell_size (float): Grid resolution in map units.
+            spatial_reference (arcpy.SpatialReference): Coordinate system of the grid, given to vectorized output.
+        """
+        self.cell_size = float(cell_size)
+        self.spatial_reference = spatial_reference
+        self.xmin, self.ymin, xmax, ymax = extent
+        self.cols = max(1, int(math.ceil((xmax - self.xmin) / self.cell_size)))
+        self.rows = max(1, int(math.ceil((ymax - self.ymin) / self.cell_size)))
+        # Snap the top edge so the grid covers the full extent
+        self.ymax = self.ymin + self.rows * self.cell_size
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    def error_bound(self):
+        """
+        Maximum positional error of a raster result, in map units.
+
+        A source cell is set when the source covers its center or the source's boundary passes through it,
+        so every set cell's center is within half a cell diagonal of the source and every part of the source
+        lies in a set cell. Addresses are looked up by the cell that contains them (another half diagonal),
+        so boundaries are at most one cell diagonal out.
+
+        Returns:
+            float: The error bound.
+        """
+        return self.cell_size * math.sqrt(2)
+
+    def cell_index(self, x, y):
+        """
+        Convert map coordinates to (row, col) grid indexes.
+
+        Args:
+            x (numpy.ndarray): X coordinates.
+            y (numpy.ndarray): Y coordinates.
+
+        Returns:
+            tuple: (rows, cols, inside) arrays. inside is False for coordinates off the grid.
+        """
+        cols = np.floor((np.asarray(x, dtype=float) - self.xmin) / self.cell_size).astype(np.int64)
+        rows = np.floor((self.ymax - np.asarray(y, dtype=float)) / self.cell_size).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.rows) & (cols >= 0) & (cols < self.cols)
+        return rows, cols, inside
+
+    def rasterize_points(self, xy):
+        """
+        Burn points into a boolean grid.
+
+        Args:
+            xy (numpy.ndarray): (n, 2) array of point coordinates.
+
+        Returns:
+            numpy.ndarray: Boolean grid, True in every cell containing a point.
+        """
+        grid = np.zeros(self.shape, dtype=bool)
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        rows, cols, inside = self.cell_index(xy[:, 0], xy[:, 1])
+        grid[rows[inside], cols[inside]] = True
+        return grid
+
+    def rasterize_polygons(self, polygons):
+        """
+        Burn polygons into a boolean grid. A cell is set when its center is inside a polygon (even-odd rule,
+        so holes are respected) or a polygon boundary passes through it, so polygons narrower than a cell,
+        such as thin slivers, are not lost.
+
+        Args:
+            polygons (list): One list of rings per polygon, each ring an (n, 2) coordinate array.
+
+        Returns:
+            numpy.ndarray: Boolean grid.
+        """
+        grid = np.zeros(self.shape, dtype=bool)
+        for rings in polygons:
+            rings = [np.asarray(r, dtype=float).reshape(-1, 2) for r in rings if len(r) >= 3]
+            if not rings:
+                continue
+            allpts = np.vstack(rings)
+            p1 = allpts
+            p2 = np.vstack([np.roll(r, -1, axis=0) for r in rings])
+            self.burn_segments(grid, p1, p2)
+
+            # Work in the window of rows and columns the polygon can touch
+            r0 = max(0, int(math.floor((self.ymax - allpts[:, 1].max()) / self.cell_size)))
+            r1 = min(self.rows, int(math.ceil((self.ymax - allpts[:, 1].min()) / self.cell_size)))
+            c0 = max(0, int(math.floor((allpts[:, 0].min() - self.xmin) / self.cell_size)))
+            c1 = min(self.cols, int(math.ceil((allpts[:, 0].max() - self.xmin) / self.cell_size)))
+            if r0 >= r1 or c0 >= c1:
+                continue
+
+            # Each edge crossing a row's center line flips the parity of every cell center to its right
+            ylo = np.minimum(p1[:, 1], p2[:, 1])
+            yhi = np.maximum(p1[:, 1], p2[:, 1])
+
+            # Rows whose center y lies in [ylo, yhi) for each edge
+            first = np.maximum(np.ceil((self.ymax - yhi) / self.cell_size - 0.5).astype(np.int64), r0)
+            last = np.minimum(np.floor((self.ymax - ylo) / self.cell_size - 0.5).astype(np.int64), r1 - 1)
+            counts = np.where(yhi > ylo, np.clip(last - first + 1, 0, None), 0)
+            edge = np.repeat(np.arange(len(p1)), counts)
+            row_ids = first[edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+            yc = self.ymax - (row_ids + 0.5) * self.cell_size
+            keep = (yc >= ylo[edge]) & (yc < yhi[edge])
+            edge, row_ids, yc = edge[keep], row_ids[keep], yc[keep]
+            x1, y1 = p1[edge, 0], p1[edge, 1]
+            x2, y2 = p2[edge, 0], p2[edge, 1]
+            xc = x1 + (yc - y1) * (x2 - x1) / (y2 - y1)
+            col_ids = np.ceil((xc - self.xmin) / self.cell_size - 0.5).astype(np.int64)
+            col_ids = np.clip(col_ids, c0, c1) - c0
+
+            toggles = np.zeros((r1 - r0, c1 - c0 + 1), dtype=np.int32)
+            np.add.at(toggles, (row_ids - r0, col_ids), 1)
+            inside = (np.cumsum(toggles, axis=1)[:, :-1] % 2).astype(bool)
+            grid[r0:r1, c0:c1] |= inside
+        return grid
+
+    def burn_segments(self, grid, p1, p2):
+        """
+        Set every cell a line segment passes through: the cells of both end points, and the cells on
+        either side of each grid line the segment crosses.
+
+        Args:
+            grid (numpy.ndarray): Boolean grid, updated in place.
+            p1 (numpy.ndarray): (n, 2) start points of the segments.
+            p2 (numpy.ndarray): (n, 2) end points of the segments.
+        """
+        xs, ys = [p1[:, 0], p2[:, 0]], [p1[:, 1], p2[:, 1]]
+        for axis in (0, 1):
+            a1, a2 = p1[:, axis], p2[:, axis]
+            b1, b2 = p1[:, 1 - axis], p2[:, 1 - axis]
+            lo, hi = np.minimum(a1, a2), np.maximum(a1, a2)
+            # Grid line k sits at xmin + k * cell_size for columns, ymax - k * cell_size for rows
+            if axis == 0:
+                first = np.ceil((lo - self.xmin) / self.cell_size).astype(np.int64)
+                last = np.floor((hi - self.xmin) / self.cell_size).astype(np.int64)
+            else:
+                first = np.ceil((self.ymax - hi) / self.cell_size).astype(np.int64)
+                last = np.floor((self.ymax - lo) / self.cell_size).astype(np.int64)
+            limit = self.cols if axis == 0 else self.rows
+            first, last = np.maximum(first, 0), np.minimum(last, limit)
+            counts = np.where(hi > lo, np.clip(last - first + 1, 0, None), 0)
+            if counts.sum() == 0:
+                continue
+            edge = np.repeat(np.arange(len(p1)), counts)
+            lines = first[edge] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            at = self.xmin + lines * self.cell_size if axis == 0 else self.ymax - lines * self.cell_size
+            other = b1[edge] + (at - a1[edge]) * (b2[edge] - b1[edge]) / (a2[edge] - a1[edge])
+            # The cells on both sides of the crossing; the far side is nudged off the grid line
+            for side in (-0.5, 0.5):
+                if axis == 0:
+                    xs.append(at + side * self.cell_size)
+                    ys.append(other)
+                else:
+                    xs.append(other)
+                    ys.append(at - side * self.cell_size)
+        rows, cols, inside = self.cell_index(np.concatenate(xs), np.concatenate(ys))
+        grid[rows[inside], cols[inside]] = True
+
+    def buffer(self, grid, distance):
+        """
+        Buffer a rasterized layer.
+
+        Args:
+            grid (numpy.ndarray): Boolean source grid.
+            distance (float): Buffer distance in map units.
+
+        Returns:
+            numpy.ndarray: Boolean grid of cells within the distance of a source cell.
+        """
+        if not grid.any():
+            return np.zeros(self.shape, dtype=bool)
+        distances = ndimage.distance_transform_edt(~grid, sampling=self.cell_size)
+        return distances <= distance
+
+    @staticmethod
+    def intersect(*grids):
+        """
+        Returns:
+            numpy.ndarray: Cells set in every grid.
+        """
+        return np.logical_and.reduce(grids)
+
+    @staticmethod
+    def erase(grid, erase_grid):
+        """
+        Returns:
+            numpy.ndarray: Cells set in grid but not in erase_grid.
+        """
+        return grid & ~erase_grid
+
+    def lookup(self, xy, grid):
+        """
+        Test which points fall in set cells of a grid.
+
+        Args:
+            xy (numpy.ndarray): (n, 2) array of point coordinates.
+            grid (numpy.ndarray): Boolean grid.
+
+        Returns:
+            numpy.ndarray: Boolean array, one value per point. Points off the grid are False.
+        """
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        rows, cols, inside = self.cell_index(xy[:, 0], xy[:, 1])
+        result = np.zeros(len(xy), dtype=bool)
+        result[inside] = grid[rows[inside], cols[inside]]
+        return result
+
+    def rasterize_layer(self, layer_name):
+        """
+        Read a point or polygon feature class and burn it into a boolean grid.
+
+        Args:
+            layer_name (str): The feature class to rasterize.
+
+        Returns:
+            numpy.ndarray: Boolean grid.
+        """
+        table = CATALOG.table(layer_name)
+        if table.geometry_type in POINT_TYPES:
+            return self.rasterize_points(table.xy)
+        return self.rasterize_polygons(table.part_rings())
+
+    def to_feature_class(self, grid, output_layer):
+        """
+        Vectorize the set cells of a grid into a polygon feature class.
+
+        Args:
+            grid (numpy.ndarray): Boolean grid.
+            output_layer (str): The output feature class.
+
+        Returns:
+            str: The name of the output feature class.
+        """
+        raster = arcpy.NumPyArrayToRaster(grid.astype(np.uint8), arcpy.Point(self.xmin, self.ymin),
+                                          self.cell_size, self.cell_size, 0)
+        arcpy.conversion.RasterToPolygon(raster, output_layer, "NO_SIMPLIFY")
+        # NumPyArrayToRaster output has no coordinate system; the grid is in the source's
+        if self.spatial_reference is not None:
+            arcpy.management.DefineProjection(output_layer, self.spatial_reference)
+        return output_layer
@@ -0,0 +1,207 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+import arcpy
+
+from analysis.FeatureTable import FeatureTable
+from monitoring.MetricsRegistry import REGISTRY
+
+
+class WorkspaceCatalog:
+    """
+    In-memory cache of dataset metadata: existence, feature count, extent, spatial reference and fields,
+    and of the datasets themselves as columnar FeatureTables, so stages can pass layers in memory.
+
+    Every value is read from the geodatabase once and then served from memory. Pipeline stages that
+    write datasets are decorated with writes(), which drops the cached entries of the datasets they
+    wrote, so the next lookup reads them again. Datasets edited outside the pipeline (for example in
+    ArcGIS Pro while a daemon runs) need an explicit invalidate().
+
+    Metadata is small and kept until invalidated. FeatureTables hold whole layers, so they are kept in
+    a least-recently-used cache capped at table_bytes: a long-lived daemon does not accumulate every
+    layer it ever read, and the cache stays within a share of the memory budget.
+    """
+
+    # Share of the memory budget the cached tables may hold
+    BUDGET_SHARE = 0.25
+
+    def __init__(self, table_mb=256):
+        """
+        Parameters:
+        - table_mb (float): Cap on the FeatureTables kept in memory, in MiB; 0 to keep none.
+        """
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._tables = OrderedDict()
+        self._table_total = 0
+        self.table_bytes = int(table_mb * 2 ** 20)
+        self._lookups = REGISTRY.counter("wnv_catalog_lookups_total", "Workspace catalog lookups by result.")
+        self._cached_bytes = REGISTRY.gauge("wnv_catalog_table_bytes", "Bytes of FeatureTables cached by the workspace catalog.")
+
+    def configure(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses the optional 'catalog_table_mb' and 'memory_budget_mb' keys.
+        """
+        table_mb = config_dict.get('catalog_table_mb', 256)
+        if config_dict.get('memory_budget_mb'):
+            table_mb = min(table_mb, self.BUDGET_SHARE * config_dict.get('memory_budget_mb'))
+        with self._lock:
+            self.table_bytes = int(table_mb * 2 ** 20)
+            self._evict()
+
+    @staticmethod
+    def key(name):
+        """
+        Cache key of a dataset: the workspace and the dataset name, so a full path and a bare name match.
+        """
+        workspace = str(arcpy.env.workspace or "")
+        name = str(name)
+        prefix = workspace.rstrip("\\/")
+        if prefix and name.lower().startswith(prefix.lower()) and name[len(prefix):len(prefix) + 1] in ("\\", "/"):
+            name = name[len(prefix) + 1:]
+        return workspace.lower(), name.lower()
+
+    def _get(self, name, prop, read):
+        key = self.key(name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and prop in entry:
+                self._lookups.inc(result="hit")
+                return entry[prop]
+        value = read()
+        with self._lock:
+            self._entries.setdefault(key, {})[prop] = value
+        self._lookups.inc(result="miss")
+        return value
+
+    def exists(self, name):
+        """
+        Returns:
+            bool: Whether the dataset exists, like arcpy.Exists().
+        """
+        return self._get(name, "exists", lambda: bool(arcpy.Exists(name)))
+
+    def count(self, name):
+        """
+        Returns:
+            int: The number of features or rows in the dataset.
+        """
+        return self._get(name, "count", lambda: int(arcpy.management.GetCount(name)[0]))
+
+    def extent(self, name):
+        """
+        Returns:
+            arcpy.Extent: The extent of the dataset.
+        """
+        return self._get(name, "extent", lambda: arcpy.Describe(name).extent)
+
+    def spatial_reference(self, name):
+        """
+        Returns:
+            arcpy.SpatialReference: The spatial reference of the dataset.
+        """
+        return self._get(name, "spatial_reference", lambda: arcpy.Describe(name).spatialReference)
+
+    def fields(self, name):
+        """
+        Returns:
+            list: (field name, field type) tuples in table order.
+        """
+        return self._get(name, "fields", lambda: [(f.name, f.type) for f in arcpy.ListFields(name)])
+
+    def table(self, name, fields=()):
+        """
+        Returns:
+            FeatureTable: The dataset's geometry and the given attribute fields, read once until the dataset
+            is written or the table is evicted to stay under table_bytes.
+        """
+        key = (self.key(name), tuple(fields))
+        with self._lock:
+            cached = self._tables.get(key)
+            if cached is not None:
+                self._tables.move_to_end(key)
+                self._lookups.inc(result="hit")
+                return cached
+        table = FeatureTable.from_feature_class(name, list(fields))
+        self._lookups.inc(result="miss")
+        if table.nbytes <= self.table_bytes:
+            with self._lock:
+                previous = self._tables.pop(key, None)
+                if previous is not None:
+                    self._table_total -= previous.nbytes
+                self._tables[key] = table
+                self._table_total += table.nbytes
+                self._evict()
+        return table
+
+    def _evict(self):
+        """Drop the least recently used tables until the cache fits. Called with the lock held."""
+        while self._tables and self._table_total > self.table_bytes:
+            _, table = self._tables.popitem(last=False)
+            self._table_total -= table.nbytes
+        self._cached_bytes.set(self._table_total)
+
+    def checksum(self, name):
+        """
+        Returns:
+            str: A digest of the dataset's object ids and geometry, see FeatureTable.checksum().
+        """
+        return self._get(name, "checksum", lambda: self.table(name).checksum())
+
+    def invalidate(self, *names):
+        """
+        Drop the cached metadata of the given datasets.
+        """
+        with self._lock:
+            keys = {self.key(name) for name in names if name}
+            for key in keys:
+                self._entries.pop(key, None)
+            for table_key in [k for k in self._tables if k[0] in keys]:
+                self._table_total -= self._tables.pop(table_key).nbytes
+            self._cached_bytes.set(self._table_total)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._entries.clear()
+            self._tables.clear()
+            self._table_total = 0
+            self._cached_bytes.set(0)
+
+    def writes(self, *params):
+        """
+        Decorator for pipeline stages that write datasets.
+
+        After the stage runs, the datasets named by the given parameters and the dataset name the
+        stage returns are invalidated. If the stage fails (returns None or raises), the whole cache
+        is dropped, since it may have written part of an output under a default name.
+
+        Parameters:
+        - params (str): Names of the stage's parameters that hold output dataset names.
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                result = None
+                try:
+                    result = func(*args, **kwargs)
+                    return result
+                finally:
+                    if result is None or result is False:
+                        self.invalidate_all()
+                    else:
+                        self.invalidate(*(bound.arguments.get(p) for p in params))
+                        if isinstance(result, str):
+                            self.invalidate(result)
+            return wrapper
+        return decorator
+
+
+# Shared by every pipeline stage in the process
+CATALOG = WorkspaceCatalog()
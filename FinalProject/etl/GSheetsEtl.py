@@ -1,7 +1,18 @@
 import requests
 from etl.SpatialEtl import SpatialEtl
 import csv
+import functools
+import hashlib
+import itertools
+import os
 import arcpy
+import numpy as np
+from pyproj import Transformer
+from monitoring.MetricsRegistry import REGISTRY
+from etl.GeocodeCache import GeocodeCache
+from etl.GeocoderChain import GeocoderChain, GeocodeError
+from catalog.WorkspaceCatalog import CATALOG
+from monitoring.MemoryBudget import MEMORY
 
 class GSheetsEtl(SpatialEtl):
     """
@@ -17,6 +28,9 @@ class GSheetsEtl(SpatialEtl):
     # A dictionary to hold configuration keys and values
     config_dict = None
 
+    # A GeocodeBudget shared by all region workers, installed by the pool initializer
+    geocode_budget = None
+
     def __init__(self, config_dict):
         """
         Initialize the GSheetsEtl instance with a given configuration dictionary.
@@ -27,73 +41,315 @@ class GSheetsEtl(SpatialEtl):
             - 'proj_dir': Local project directory path for saving and loading files
         """
         super().__init__(config_dict)
+        # Kept between runs when the instance is reused by the daemon
+        self.etag = None
+        self.last_digest = None
+        self.polled_data = None
+        self.journal = None
+        self.geocoder = None
+
+    def poll(self):
+        """
+        Check the published sheet for new or changed responses.
+
+        Sends the last ETag so an unchanged sheet costs a 304, and compares a digest of the
+        body for servers that ignore it. The downloaded body is kept for the next extract().
+
+        Returns:
+        - bool: True if the sheet changed since the last extract.
+        """
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        r = requests.get(self.config_dict.get('remote_url'), headers=headers)
+        if r.status_code == 304:
+            return False
+        r.raise_for_status()
+        r.encoding = "utf-8"
+        self.etag = r.headers.get("ETag")
+        if hashlib.sha1(r.text.encode("utf-8")).hexdigest() == self.last_digest:
+            return False
+        self.polled_data = r.text
+        return True
 
     def extract(self):
         """
         Extract the address data from the published Google Sheets CSV URL.
 
-        Downloads the CSV content from the remote URL and saves it as 'addresses.csv'
+        Downloads the CSV content from the remote URL and streams it to 'addresses.csv'
         in the local project directory.
         """
         print("Extracting addresses from google form spreadsheet")
-        r = requests.get(self.config_dict.get('remote_url'))
-        r.encoding = "utf-8"
-        data = r.text
+        digest = hashlib.sha1()
+        lines, last = 0, "\n"
         with open(f"{self.config_dict.get('proj_dir')}addresses.csv", "w") as output_file:
-            output_file.write(data)
+            if self.polled_data is not None:
+                chunks = [self.polled_data]
+                self.polled_data = None
+            else:
+                # Streamed to disk, so a large sheet is never held in memory
+                r = requests.get(self.config_dict.get('remote_url'), stream=True)
+                r.encoding = "utf-8"
+                chunks = r.iter_content(chunk_size=1 << 16, decode_unicode=True)
+            for data in chunks:
+                if not data:
+                    continue
+                digest.update(data.encode("utf-8"))
+                lines += data.count("\n")
+                last = data[-1]
+                output_file.write(data)
+        self.last_digest = digest.hexdigest()
+        if last != "\n":
+            lines += 1
+
+        REGISTRY.counter("wnv_rows_extracted_total", "Form responses extracted from the sheet.") \
+            .inc(max(0, lines - 1))
 
+    @MEMORY.tracked("transform")
     def transform(self):
         """
         Transform the extracted address data by:
-        - Appending 'Boulder CO' to each street address
-        - Geocoding each address using the U.S. Census Geocoding API
+        - Appending the region's city and state ('region_city_state', e.g. 'Boulder CO') to each street address
+        - Geocoding each address through the GeocoderChain (local table, U.S. Census Geocoding API, fallbacks)
         - Writing the resulting X, Y coordinates and address type to 'new_addresses.csv'
 
+        Progress is journaled to 'geocode_journal.csv' in batches, so a re-run after an
+        interruption skips rows that were already geocoded and only requests the missing ones.
+        Addresses already in the shared 'geocode_cache' (from any region) are not requested again,
+        and requests wait on the shared geocode budget when one is installed. Slow requests are
+        hedged and failing tiers fall back to the next one, see GeocoderChain.
+        'new_addresses.csv' is rebuilt from the journal on every run. When the rows would not fit in the
+        memory budget ('memory_budget_mb'), they are geocoded and written out in chunks.
+
         Any addresses without a successful geocode match are logged with a warning.
         """
         print("Adding City, State and Geocoding addresses...")
 
+        geocoded = REGISTRY.counter("wnv_rows_geocoded_total", "Rows geocoded with a match.")
+        unmatched = REGISTRY.counter("wnv_rows_unmatched_total", "Rows the geocoder returned no match for.")
+        errors = REGISTRY.counter("wnv_geocode_errors_total", "Geocode requests that failed.")
+        cache_hits = REGISTRY.counter("wnv_geocode_cache_hits_total", "Rows served from the geocode journal or the shared cache.")
+
         input_file = f"{self.config_dict.get('proj_dir')}addresses.csv"
         output_file = f"{self.config_dict.get('proj_dir')}new_addresses.csv"
+        journal_file = f"{self.config_dict.get('proj_dir')}{self.config_dict.get('geocode_journal', 'geocode_journal.csv')}"
+        batch_size = self.config_dict.get('geocode_checkpoint_batch', 25)
+        city_state = self.config_dict.get('region_city_state', 'Boulder CO')
+        cache_path = self.config_dict.get('geocode_cache')
+        if cache_path and not os.path.isabs(cache_path):
+            cache_path = f"{self.config_dict.get('proj_dir')}{cache_path}"
+        shared_cache = GeocodeCache(cache_path) if cache_path else None
+        cache_pending = []
+        if self.geocoder is None:
+            self.geocoder = GeocoderChain.from_config(self.config_dict, self.geocode_budget)
 
-        with open(output_file, "w", newline="", encoding="utf-8") as transformed_file:
+        if self.journal is None:
+            self.journal = self.read_journal(journal_file)
+        journal = self.journal
+        if journal:
+            print(f"Resuming geocoding: {len(journal)} rows already in the journal")
+
+        with open(input_file, "r", encoding="utf-8") as partial_file:
+            total_rows = sum(1 for _ in csv.DictReader(partial_file, delimiter=','))
+        # Over the memory budget, rows are read, geocoded and written out chunk by chunk
+        chunk = MEMORY.chunk_size("transform", total_rows)
+
+        pending = []
+        if os.path.exists(journal_file):
+            # Drop a line left half written by a crash, so the next entry starts on a line of its own
+            self.truncate_partial_line(journal_file)
+        new_journal = not os.path.exists(journal_file) or os.path.getsize(journal_file) == 0
+        with open(input_file, "r", encoding="utf-8") as partial_file, \
+                open(journal_file, "a", newline="", encoding="utf-8") as journal_out, \
+                open(output_file, "w", newline="", encoding="utf-8") as transformed_file:
+            writer = csv.writer(journal_out)
+            if new_journal:
+                writer.writerow(["row_id", "status", "X", "Y"])
             transformed_file.write("X,Y,Type\n")
 
-            with open(input_file, "r", encoding="utf-8") as partial_file:
-                csv_dict = csv.DictReader(partial_file, delimiter=',')
+            reader = csv.DictReader(partial_file, delimiter=',')
+            # Identical form responses get an occurrence suffix so each one keeps its own row id
+            seen = {}
+            while True:
+                rows = list(itertools.islice(reader, chunk)) if chunk else list(reader)
+                if not rows:
+                    break
+                row_ids = []
+                for row in rows:
+                    base_id = self.row_id(row)
+                    seen[base_id] = seen.get(base_id, 0) + 1
+                    row_ids.append(f"{base_id}-{seen[base_id]}")
 
-                for row in csv_dict:
-                    address = f"{row['Street Address']} Boulder CO"
-                    print(f"Geocoding: {address}")
+                for row, row_id in zip(rows, row_ids):
+                    if row_id in journal:
+                        cache_hits.inc(source="journal")
+                        continue
 
-                    geocode_url = (
-                        f"https://geocoding.geo.census.gov/geocoder/locations/onelineaddress"
-                        f"?address={address}&benchmark=2020&format=json"
-                    )
+                    address = f"{row['Street Address']} {city_state}"
+                    cached = shared_cache.get(address) if shared_cache else None
+                    if cached:
+                        cache_hits.inc(source="shared")
+                        journal[row_id] = cached
+                        pending.append([row_id, *cached])
+                        continue
+                    print(f"Geocoding: {address}")
 
                     try:
-                        r = requests.get(geocode_url)
-                        r.raise_for_status()
-                        resp_dict = r.json()
-
-                        matches = resp_dict.get('result', {}).get('addressMatches', [])
-                        if matches:
-                            x = matches[0]['coordinates']['x']
-                            y = matches[0]['coordinates']['y']
-                            transformed_file.write(f"{x},{y},Residential\n")
-                        else:
-                            print(f"Warning: No geocode match for {address}")
-                    except requests.RequestException as e:
+                        entry = self.geocoder.geocode(address)
+                    except GeocodeError as e:
+                        # Not journaled, so the row is retried on the next run
                         print(f"Error during geocoding: {e}")
+                        errors.inc()
+                        continue
+
+                    if entry[0] == "matched":
+                        geocoded.inc()
+                    else:
+                        print(f"Warning: No geocode match for {address}")
+                        unmatched.inc()
+
+                    journal[row_id] = entry
+                    pending.append([row_id, *entry])
+                    cache_pending.append((address, *entry))
+                    if len(pending) >= batch_size:
+                        self.flush_journal(journal_out, writer, pending)
+                        if shared_cache:
+                            shared_cache.put_many(cache_pending)
+                        cache_pending.clear()
+
+                self.flush_journal(journal_out, writer, pending)
+                if shared_cache:
+                    shared_cache.put_many(cache_pending)
+                cache_pending.clear()
+
+                # The journal keeps geocoder coordinates; points are reprojected into the workspace CRS on output
+                matched = [journal[row_id] for row_id in row_ids if journal.get(row_id, ("",))[0] == "matched"]
+                xs, ys = self.reproject([float(x) for _, x, _ in matched], [float(y) for _, _, y in matched])
+                for x, y in zip(xs, ys):
+                    transformed_file.write(f"{x},{y},Residential\n")
+                if not chunk:
+                    break
+
+        if shared_cache:
+            shared_cache.close()
 
         print("Transformation complete. Data saved to new_addresses.csv")
 
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_transformer(source_crs, target_crs):
+        """
+        Build a coordinate transformer once per CRS pair and reuse it for every batch and run.
+
+        Parameters:
+        - source_crs (int): EPSG code of the input coordinates.
+        - target_crs (int): EPSG code of the output coordinates.
+        """
+        return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+    def reproject(self, xs, ys):
+        """
+        Reproject geocoded coordinates from the geocoder CRS into the workspace CRS in vectorized batches.
+
+        Parameters:
+        - xs (list): Longitudes from the geocoder.
+        - ys (list): Latitudes from the geocoder.
+
+        Returns:
+            tuple: (x array, y array) in the workspace CRS.
+        """
+        transformer = self.get_transformer(self.config_dict.get('geocoder_crs', 4269),
+                                           self.config_dict.get('workspace_crs', 26953))
+        batch_size = self.config_dict.get('reproject_batch_size', 10000)
+        xs = np.asarray(xs, dtype=float)
+        ys = np.asarray(ys, dtype=float)
+        out_x = np.empty_like(xs)
+        out_y = np.empty_like(ys)
+        for start in range(0, len(xs), batch_size):
+            end = start + batch_size
+            out_x[start:end], out_y[start:end] = transformer.transform(xs[start:end], ys[start:end])
+        return out_x, out_y
+
+    @staticmethod
+    def row_id(row):
+        """
+        Build a stable id for an input row from its contents, so ids survive new form responses
+        being added to the sheet.
+
+        Parameters:
+        - row (dict): A row from the extracted addresses CSV.
+        """
+        return hashlib.sha1("\x1f".join(row.values()).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def read_journal(journal_file):
+        """
+        Read the geocoding journal into a dictionary of row_id -> (status, X, Y).
+
+        A partially written last line (from a crash mid-write) is ignored, even when its fields parse:
+        a line cut mid-coordinate would otherwise be kept with the wrong value.
+
+        Parameters:
+        - journal_file (str): Path to the journal CSV.
+        """
+        journal = {}
+        if not os.path.exists(journal_file):
+            return journal
+        with open(journal_file, "r", newline="", encoding="utf-8") as journal_in:
+            # Every complete entry ends with a newline; only the last line can be cut short
+            for entry in csv.DictReader(line for line in journal_in if line.endswith("\n")):
+                if entry.get("Y") is None or entry["status"] not in ("matched", "unmatched"):
+                    continue
+                journal[entry["row_id"]] = (entry["status"], entry["X"], entry["Y"])
+        return journal
+
+    @staticmethod
+    def truncate_partial_line(path, block_size=4096):
+        """
+        Truncate a file back to its last newline, dropping a partially written last line.
+
+        Parameters:
+        - path (str): Path to the file.
+        - block_size (int): Bytes read at a time while scanning back from the end.
+        """
+        with open(path, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                start = max(0, position - block_size)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b"\n")
+                if newline >= 0:
+                    position = start + newline + 1
+                    break
+                position = start
+            if position < end:
+                f.truncate(position)
+
+    @staticmethod
+    def flush_journal(journal_out, writer, pending):
+        """
+        Write a batch of journal entries and force them to disk.
+
+        Parameters:
+        - journal_out (file): The open journal file.
+        - writer (csv.writer): Writer for the journal file.
+        - pending (list): Entries not yet written. Cleared after the flush.
+        """
+        if not pending:
+            return
+        writer.writerows(pending)
+        journal_out.flush()
+        os.fsync(journal_out.fileno())
+        pending.clear()
+
+    @MEMORY.tracked("load")
     def load(self):
         """
         Load the transformed geocoded data into a GIS.
 
         Creates a point feature class 'avoid_points' from the 'new_addresses.csv' file
-        using the X and Y coordinates.
+        using the X and Y coordinates, stored in the workspace CRS so no on-the-fly
+        projection is needed downstream. When the points would not fit in the memory
+        budget, they are streamed in with an insert cursor, one chunk at a time.
         """
         print("Loading data into GIS...")
 
@@ -103,11 +359,36 @@ class GSheetsEtl(SpatialEtl):
         x_coords = "X"
         y_coords = "Y"
 
-        # Make the XY event layer
-        arcpy.management.XYTableToPoint(in_table, out_feature_class, x_coords, y_coords)
+        with open(in_table, "r", encoding="utf-8") as points_file:
+            total_points = max(0, sum(1 for _ in points_file) - 1)
+        chunk = MEMORY.chunk_size("load", total_points)
+
+        spatial_ref = arcpy.SpatialReference(self.config_dict.get('workspace_crs', 26953))
+        if chunk:
+            # Same schema as XYTableToPoint: X, Y and Type fields
+            arcpy.management.CreateFeatureclass(arcpy.env.workspace, out_feature_class, "POINT",
+                                                spatial_reference=spatial_ref)
+            arcpy.management.AddField(out_feature_class, x_coords, "DOUBLE")
+            arcpy.management.AddField(out_feature_class, y_coords, "DOUBLE")
+            arcpy.management.AddField(out_feature_class, "Type", "TEXT")
+            with open(in_table, "r", encoding="utf-8") as points_file:
+                reader = csv.DictReader(points_file)
+                while True:
+                    rows = list(itertools.islice(reader, chunk))
+                    if not rows:
+                        break
+                    with arcpy.da.InsertCursor(out_feature_class, ["SHAPE@XY", x_coords, y_coords, "Type"]) as cursor:
+                        for row in rows:
+                            x, y = float(row[x_coords]), float(row[y_coords])
+                            cursor.insertRow(((x, y), x, y, row["Type"]))
+        else:
+            # Make the XY event layer
+            arcpy.management.XYTableToPoint(in_table, out_feature_class, x_coords, y_coords,
+                                            coordinate_system=spatial_ref)
 
         # Print the total number of loaded points
-        print(arcpy.GetCount_management(out_feature_class))
+        CATALOG.invalidate(out_feature_class)
+        print(CATALOG.count(out_feature_class))
 
     def process(self):
         """
@@ -0,0 +1,38 @@
+import multiprocessing
+import time
+from contextlib import contextmanager
+
+
+class GeocodeBudget:
+    """
+    A geocoder request budget shared by every region worker process.
+
+    Requests are spaced out to a global rate with a shared "next free slot" time, and a
+    semaphore caps how many requests are in flight at once. The budget is created in the
+    parent process and handed to the workers through the pool initializer.
+    """
+
+    def __init__(self, requests_per_second=5.0, max_in_flight=4):
+        """
+        Parameters:
+        - requests_per_second (float): Requests allowed per second across all workers, 0 for no limit.
+        - max_in_flight (int): Requests allowed to wait on the geocoder at the same time.
+        """
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = multiprocessing.Value("d", 0.0)
+        self._in_flight = multiprocessing.BoundedSemaphore(max_in_flight)
+
+    @contextmanager
+    def slot(self):
+        """
+        Wait for a request slot and hold it while the request runs.
+        """
+        with self._next_slot.get_lock():
+            now = time.time()
+            start = max(now, self._next_slot.value)
+            self._next_slot.value = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+        with self._in_flight:
+            yield
@@ -0,0 +1,44 @@
+import sqlite3
+
+
+class GeocodeCache:
+    """
+    Geocoder results keyed by the full one-line address, shared by every region.
+
+    The cache is a SQLite file so worker processes can read and write it concurrently;
+    an address geocoded for one region is never requested again for another.
+    """
+
+    def __init__(self, db_path):
+        """
+        Parameters:
+        - db_path (str): Path of the SQLite cache file, created if it does not exist.
+        """
+        self.conn = sqlite3.connect(db_path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocodes ("
+            " address TEXT PRIMARY KEY, status TEXT NOT NULL, x TEXT, y TEXT)"
+        )
+        self.conn.commit()
+
+    def get(self, address):
+        """
+        Returns:
+        - tuple: (status, X, Y) for a cached address, or None.
+        """
+        row = self.conn.execute("SELECT status, x, y FROM geocodes WHERE address = ?", (address,)).fetchone()
+        return tuple(row) if row else None
+
+    def put_many(self, entries):
+        """
+        Store a batch of results.
+
+        Parameters:
+        - entries (list): (address, status, X, Y) tuples.
+        """
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO geocodes VALUES (?, ?, ?, ?)", entries)
+
+    def close(self):
+        self.conn.close()
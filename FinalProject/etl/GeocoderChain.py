@@ -0,0 +1,249 @@
+import csv
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from urllib.parse import quote
+
+import requests
+
+from monitoring.MetricsRegistry import REGISTRY
+
+
+class GeocodeError(Exception):
+    """Raised when no tier of the chain could answer, so the row should be retried later."""
+
+
+class RemoteGeocoder:
+    """
+    One remote geocoder tier speaking the Census onelineaddress JSON format.
+
+    Slow requests are hedged: when a request has not answered within the tier's observed
+    p95 latency, a duplicate is sent and whichever response arrives first is used. Hedges
+    are capped at a fraction of all requests so a slow service is not flooded.
+    """
+
+    # Latencies kept per tier for the p95 estimate
+    WINDOW = 200
+    # Samples needed before the observed p95 replaces the configured hedge delay
+    MIN_SAMPLES = 20
+
+    def __init__(self, name, prefix_url, suffix_url, executor, budget=None, timeout=10.0,
+                 hedge_delay=1.0, hedge_ratio=0.1):
+        """
+        Parameters:
+        - name (str): Tier name used in logs and metric labels.
+        - prefix_url (str): URL up to the address, e.g. '...onelineaddress?address='.
+        - suffix_url (str): URL after the address, e.g. '&benchmark=2020&format=json'.
+        - executor (ThreadPoolExecutor): Threads the requests and their hedges run on.
+        - budget (GeocodeBudget): Optional shared request budget; every request and hedge takes a slot.
+        - timeout (float): Seconds before a single request is abandoned.
+        - hedge_delay (float): Seconds to wait before hedging until enough latencies are observed.
+        - hedge_ratio (float): Largest fraction of requests that may be hedged.
+        """
+        self.name = name
+        self.prefix_url = prefix_url
+        self.suffix_url = suffix_url
+        self.executor = executor
+        self.budget = budget
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.hedge_ratio = hedge_ratio
+        self._latencies = deque(maxlen=self.WINDOW)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._hedges = 0
+
+        self._latency = REGISTRY.histogram("wnv_geocode_latency_seconds", "Geocode request latency in seconds.")
+        self._hedged = REGISTRY.counter("wnv_geocode_hedges_total", "Duplicate geocode requests sent for slow responses.")
+        self._hedge_wins = REGISTRY.counter("wnv_geocode_hedge_wins_total", "Hedged requests that answered first.")
+
+    def p95(self):
+        """
+        Returns:
+        - float: The hedge delay in seconds: the observed p95 latency, or the configured delay.
+        """
+        with self._lock:
+            if len(self._latencies) < self.MIN_SAMPLES:
+                return self.hedge_delay
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def _may_hedge(self):
+        with self._lock:
+            if self._hedges + 1 > self.hedge_ratio * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+    def _request(self, address):
+        url = f"{self.prefix_url}{quote(address)}{self.suffix_url}"
+        with self.budget.slot() if self.budget else nullcontext():
+            start = time.perf_counter()
+            try:
+                r = requests.get(url, timeout=self.timeout)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._latency.observe(elapsed, tier=self.name)
+        r.raise_for_status()
+        with self._lock:
+            self._latencies.append(elapsed)
+
+        matches = r.json().get('result', {}).get('addressMatches', [])
+        if matches:
+            return ("matched", matches[0]['coordinates']['x'], matches[0]['coordinates']['y'])
+        return ("unmatched", "", "")
+
+    def geocode(self, address):
+        """
+        Geocode one address, hedging the request if it is slower than the tier's p95.
+
+        Parameters:
+        - address (str): The one-line address.
+
+        Returns:
+        - tuple: ("matched", X, Y) or ("unmatched", "", "").
+
+        Raises:
+        - requests.RequestException: If every request sent for the address failed.
+        """
+        with self._lock:
+            self._requests += 1
+        primary = self.executor.submit(self._request, address)
+        done, _ = wait([primary], timeout=self.p95())
+        if done or not self._may_hedge():
+            return primary.result()
+
+        self._hedged.inc(tier=self.name)
+        hedge = self.executor.submit(self._request, address)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._hedge_wins.inc(tier=self.name)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+class LocalGeocoder:
+    """
+    The first tier: a local table of known addresses, e.g. a county address point export.
+    """
+
+    name = "local"
+
+    def __init__(self, table_path):
+        """
+        Parameters:
+        - table_path (str): CSV with Address, X and Y columns, in the geocoder CRS.
+        """
+        self.lookup = {}
+        with open(table_path, "r", newline="", encoding="utf-8") as table:
+            for row in csv.DictReader(table):
+                self.lookup[self.normalize(row["Address"])] = ("matched", row["X"], row["Y"])
+
+    @staticmethod
+    def normalize(address):
+        return " ".join(address.upper().split())
+
+    def geocode(self, address):
+        """
+        Returns:
+        - tuple: ("matched", X, Y) for a known address, or None to fall through to the next tier.
+        """
+        return self.lookup.get(self.normalize(address))
+
+
+class GeocoderChain:
+    """
+    Geocoders tried in order: local lookup, then the primary remote, then the secondary remote.
+
+    A tier that errors or finds no match passes the address on to the next tier. An address
+    that no tier matched is "unmatched"; if every remote tier errored, GeocodeError is raised
+    so the row is not journaled and is retried on the next run.
+    """
+
+    def __init__(self, tiers, executor):
+        """
+        Parameters:
+        - tiers (list): LocalGeocoder and RemoteGeocoder instances in the order they are tried.
+        - executor (ThreadPoolExecutor): The request threads, shut down by close().
+        """
+        self.tiers = tiers
+        self.executor = executor
+        self._answers = REGISTRY.counter("wnv_geocode_tier_answers_total", "Addresses answered by each geocoder tier.")
+        self._tier_errors = REGISTRY.counter("wnv_geocode_tier_errors_total", "Failed geocode requests per tier.")
+
+    @classmethod
+    def from_config(cls, config_dict, budget=None):
+        """
+        Build the chain from the configuration.
+
+        'local_geocode_table' enables the local tier. 'geocoder_prefix_url' and 'geocoder_suffix_url'
+        are the primary tier, and each entry of 'fallback_geocoders' (name, prefix_url, suffix_url)
+        adds a further tier.
+
+        Parameters:
+        - config_dict (dict): The project configuration.
+        - budget (GeocodeBudget): Optional request budget shared with other processes.
+        """
+        executor = ThreadPoolExecutor(max_workers=config_dict.get('geocode_threads', 8))
+        options = dict(
+            executor=executor,
+            budget=budget,
+            timeout=config_dict.get('geocode_timeout_seconds', 10),
+            hedge_delay=config_dict.get('hedge_delay_seconds', 1.0),
+            hedge_ratio=config_dict.get('hedge_ratio', 0.1),
+        )
+
+        tiers = []
+        local_table = config_dict.get('local_geocode_table')
+        if local_table:
+            if not os.path.isabs(local_table):
+                local_table = f"{config_dict.get('proj_dir')}{local_table}"
+            if os.path.exists(local_table):
+                tiers.append(LocalGeocoder(local_table))
+        tiers.append(RemoteGeocoder(
+            "primary",
+            config_dict.get('geocoder_prefix_url', 'https://geocoding.geo.census.gov/geocoder/locations/onelineaddress?address='),
+            config_dict.get('geocoder_suffix_url', '&benchmark=2020&format=json'),
+            **options
+        ))
+        for fallback in config_dict.get('fallback_geocoders') or []:
+            tiers.append(RemoteGeocoder(fallback['name'], fallback['prefix_url'], fallback['suffix_url'], **options))
+        return cls(tiers, executor)
+
+    def geocode(self, address):
+        """
+        Parameters:
+        - address (str): The one-line address.
+
+        Returns:
+        - tuple: (status, X, Y) with status "matched" or "unmatched".
+
+        Raises:
+        - GeocodeError: If no tier matched and at least one remote tier failed.
+        """
+        errors = []
+        for tier in self.tiers:
+            try:
+                entry = tier.geocode(address)
+            except requests.RequestException as e:
+                self._tier_errors.inc(tier=tier.name)
+                errors.append(f"{tier.name}: {e}")
+                continue
+            if entry and entry[0] == "matched":
+                self._answers.inc(tier=tier.name)
+                return entry
+        if errors:
+            raise GeocodeError("; ".join(errors))
+        return ("unmatched", "", "")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,588 @@
+import math
+import os
+import struct
+
+import numpy as np
+
+# File signature: "fgb", major version 3, "fgb", patch level 0
+MAGIC = b"fgb\x03fgb\x00"
+NODE_SIZE = 16
+NODE_ITEM = struct.Struct("<4dQ")
+
+# GeometryType enum of the FlatGeobuf schema
+GEOMETRY_TYPES = {"Point": 1, "Polyline": 5, "Polygon": 6, "Multipoint": 4}
+# ColumnType enum of the FlatGeobuf schema
+COLUMN_INT, COLUMN_LONG, COLUMN_FLOAT, COLUMN_DOUBLE, COLUMN_STRING, COLUMN_DATETIME = 5, 7, 9, 10, 11, 13
+
+# Table field slots of the FlatGeobuf schema (header.fbs and feature.fbs)
+HEADER_NAME, HEADER_ENVELOPE, HEADER_GEOMETRY_TYPE, HEADER_COLUMNS = 0, 1, 2, 7
+HEADER_FEATURES_COUNT, HEADER_INDEX_NODE_SIZE, HEADER_CRS = 8, 9, 10
+COLUMN_NAME, COLUMN_TYPE = 0, 1
+CRS_ORG, CRS_CODE = 0, 1
+GEOMETRY_ENDS, GEOMETRY_XY, GEOMETRY_TYPE, GEOMETRY_PARTS = 0, 1, 6, 7
+FEATURE_GEOMETRY, FEATURE_PROPERTIES = 0, 1
+
+
+# --- Minimal FlatBuffers encoding -------------------------------------------------------------
+# Only what the FlatGeobuf schema needs: tables of scalars, strings, scalar vectors and table vectors.
+# Buffers are written front to back, so every offset points forward, and are size-prefixed.
+
+class Table:
+    """A FlatBuffers table under construction: slot -> value."""
+
+    def __init__(self, slots):
+        self.slots = slots
+
+
+def scalar(fmt, value):
+    return ("scalar", fmt, value)
+
+
+def string(value):
+    return ("string", value)
+
+
+def vector(fmt, values):
+    return ("vector", fmt, values)
+
+
+def subtable(value):
+    return ("table", value)
+
+
+def subtables(values):
+    return ("tables", values)
+
+
+def _pad(buf, alignment):
+    buf.extend(b"\0" * (-len(buf) % alignment))
+
+
+def _write_child(buf, child):
+    kind = child[0]
+    if kind == "string":
+        _pad(buf, 4)
+        pos = len(buf)
+        data = child[1].encode("utf-8")
+        buf.extend(struct.pack("<I", len(data)) + data + b"\0")
+        return pos
+    if kind == "vector":
+        fmt, values = child[1], child[2]
+        size = struct.calcsize("<" + fmt)
+        # The length sits just before the elements, which are aligned to their own size
+        while (len(buf) + 4) % max(size, 4):
+            buf.append(0)
+        pos = len(buf)
+        buf.extend(struct.pack("<I", len(values)))
+        if isinstance(values, (bytes, bytearray)):
+            buf.extend(values)
+        else:
+            buf.extend(np.asarray(values, dtype="<" + fmt).tobytes())
+        return pos
+    if kind == "table":
+        return _write_table(buf, child[1])
+    if kind == "tables":
+        _pad(buf, 4)
+        pos = len(buf)
+        buf.extend(struct.pack("<I", len(child[1])))
+        slots = []
+        for _ in child[1]:
+            slots.append(len(buf))
+            buf.extend(b"\0\0\0\0")
+        for slot, item in zip(slots, child[1]):
+            target = _write_table(buf, item)
+            struct.pack_into("<I", buf, slot, target - slot)
+        return pos
+    raise ValueError(f"Unknown FlatBuffers value {kind}")
+
+
+def _write_table(buf, tbl):
+    present = {slot: value for slot, value in tbl.slots.items() if value is not None}
+    num_slots = (max(present) + 1) if present else 0
+
+    # Inline layout: the vtable offset, then fields from largest to smallest, each aligned absolutely
+    inline = sorted(present.items(), key=lambda item: -(struct.calcsize("<" + item[1][1]) if item[1][0] == "scalar" else 4))
+    vtable_size = 4 + 2 * num_slots
+    _pad(buf, 2)
+    vtable_pos = len(buf)
+    buf.extend(b"\0" * vtable_size)
+    largest = max([struct.calcsize("<" + v[1]) if v[0] == "scalar" else 4 for _, v in inline] + [4])
+    # The table start must leave every field at its natural alignment
+    while len(buf) % 4 or (largest == 8 and (len(buf) + 4) % 8):
+        buf.append(0)
+    table_pos = len(buf)
+    buf.extend(struct.pack("<i", table_pos - vtable_pos))
+
+    field_offsets, references = {}, []
+    for slot, value in inline:
+        size = struct.calcsize("<" + value[1]) if value[0] == "scalar" else 4
+        _pad(buf, size)
+        field_offsets[slot] = len(buf) - table_pos
+        if value[0] == "scalar":
+            buf.extend(struct.pack("<" + value[1], value[2]))
+        else:
+            references.append((len(buf), value))
+            buf.extend(b"\0\0\0\0")
+    table_size = len(buf) - table_pos
+
+    struct.pack_into("<HH", buf, vtable_pos, vtable_size, table_size)
+    for slot, offset in field_offsets.items():
+        struct.pack_into("<H", buf, vtable_pos + 4 + 2 * slot, offset)
+
+    for slot_pos, value in references:
+        target = _write_child(buf, value)
+        struct.pack_into("<I", buf, slot_pos, target - slot_pos)
+    return table_pos
+
+
+def finish(root):
+    """
+        Encode a root table as a size-prefixed FlatBuffer.
+
+        Returns:
+            bytes: uint32 size, then the buffer.
+        """
+    buf = bytearray(8)
+    root_pos = _write_table(buf, root)
+    struct.pack_into("<I", buf, 4, root_pos - 4)
+    _pad(buf, 8)
+    struct.pack_into("<I", buf, 0, len(buf) - 4)
+    return bytes(buf)
+
+
+class TableReader:
+    """Read-only access to a FlatBuffers table in a buffer."""
+
+    def __init__(self, buf, pos):
+        self.buf = buf
+        self.pos = pos
+        self.vtable = pos - struct.unpack_from("<i", buf, pos)[0]
+        self.vtable_size = struct.unpack_from("<H", buf, self.vtable)[0]
+
+    @classmethod
+    def root(cls, buf):
+        """The root table of a size-prefixed buffer."""
+        return cls(buf, 4 + struct.unpack_from("<I", buf, 4)[0])
+
+    def _field(self, slot):
+        entry = 4 + 2 * slot
+        if entry >= self.vtable_size:
+            return None
+        offset = struct.unpack_from("<H", self.buf, self.vtable + entry)[0]
+        return self.pos + offset if offset else None
+
+    def _target(self, slot):
+        field = self._field(slot)
+        return None if field is None else field + struct.unpack_from("<I", self.buf, field)[0]
+
+    def scalar(self, slot, fmt, default=0):
+        field = self._field(slot)
+        return default if field is None else struct.unpack_from("<" + fmt, self.buf, field)[0]
+
+    def string(self, slot):
+        target = self._target(slot)
+        if target is None:
+            return None
+        length = struct.unpack_from("<I", self.buf, target)[0]
+        return bytes(self.buf[target + 4:target + 4 + length]).decode("utf-8")
+
+    def vector(self, slot, fmt):
+        target = self._target(slot)
+        if target is None:
+            return None
+        length = struct.unpack_from("<I", self.buf, target)[0]
+        return np.frombuffer(self.buf, dtype="<" + fmt, count=length, offset=target + 4)
+
+    def table(self, slot):
+        target = self._target(slot)
+        return None if target is None else TableReader(self.buf, target)
+
+    def tables(self, slot):
+        target = self._target(slot)
+        if target is None:
+            return []
+        length = struct.unpack_from("<I", self.buf, target)[0]
+        items = []
+        for i in range(length):
+            entry = target + 4 + 4 * i
+            items.append(TableReader(self.buf, entry + struct.unpack_from("<I", self.buf, entry)[0]))
+        return items
+
+
+# --- Packed Hilbert R-tree ----------------------------------------------------------------------
+
+def hilbert(x, y):
+    """
+        Position along a 16-bit Hilbert curve of uint32 grid coordinates, vectorized.
+        Same algorithm as the FlatGeobuf reference implementation.
+        """
+    x = np.asarray(x, dtype=np.uint32)
+    y = np.asarray(y, dtype=np.uint32)
+    a = x ^ y
+    b = np.uint32(0xFFFF) ^ a
+    c = np.uint32(0xFFFF) ^ (x | y)
+    d = x & (y ^ np.uint32(0xFFFF))
+
+    A = a | (b >> 1)
+    B = (a >> 1) ^ a
+    C = ((c >> 1) ^ (b & (d >> 1))) ^ c
+    D = ((a & (c >> 1)) ^ (d >> 1)) ^ d
+
+    for shift in (2, 4):
+        a, b, c, d = A, B, C, D
+        A = (a & (a >> shift)) ^ (b & (b >> shift))
+        B = (a & (b >> shift)) ^ (b & ((a ^ b) >> shift))
+        C = C ^ ((a & (c >> shift)) ^ (b & (d >> shift)))
+        D = D ^ ((b & (c >> shift)) ^ ((a ^ b) & (d >> shift)))
+
+    a, b, c, d = A, B, C, D
+    C = C ^ ((a & (c >> 8)) ^ (b & (d >> 8)))
+    D = D ^ ((b & (c >> 8)) ^ ((a ^ b) & (d >> 8)))
+
+    a = C ^ (C >> 1)
+    b = D ^ (D >> 1)
+    i0 = x ^ y
+    i1 = b | (np.uint32(0xFFFF) ^ (i0 | a))
+
+    def spread(v):
+        v = (v | (v << 8)) & np.uint32(0x00FF00FF)
+        v = (v | (v << 4)) & np.uint32(0x0F0F0F0F)
+        v = (v | (v << 2)) & np.uint32(0x33333333)
+        return (v | (v << 1)) & np.uint32(0x55555555)
+
+    return (spread(i1) << 1) | spread(i0)
+
+
+def level_bounds(num_items, node_size=NODE_SIZE):
+    """
+        Node index ranges of each tree level, leaves first. The root is node 0 and the leaves are last.
+
+        Returns:
+            list: (start, end) per level.
+        """
+    counts = [num_items]
+    n = num_items
+    while True:
+        n = math.ceil(n / node_size)
+        counts.append(n)
+        if n == 1:
+            break
+    total = sum(counts)
+    bounds, end = [], total
+    for count in counts:
+        bounds.append((end - count, end))
+        end -= count
+    return bounds
+
+
+def build_tree(boxes, offsets, node_size=NODE_SIZE):
+    """
+        Build a packed R-tree over features already sorted on the Hilbert curve.
+
+        Args:
+            boxes (numpy.ndarray): (n, 4) feature bounding boxes, in file order.
+            offsets (numpy.ndarray): Byte offset of each feature in the feature section.
+
+        Returns:
+            bytes: The index section.
+        """
+    bounds = level_bounds(len(boxes), node_size)
+    nodes = np.zeros(bounds[0][1], dtype=[("box", "<f8", 4), ("offset", "<u8")])
+    leaf_start, leaf_end = bounds[0]
+    nodes["box"][leaf_start:leaf_end] = boxes
+    nodes["offset"][leaf_start:leaf_end] = offsets
+    for (start, end), (parent_start, _) in zip(bounds[:-1], bounds[1:]):
+        children = np.arange(start, end, node_size)
+        groups = nodes["box"][start:end]
+        reduce_at = children - start
+        parents = nodes[parent_start:parent_start + len(children)]
+        parents["offset"] = children
+        parents["box"][:, 0] = np.minimum.reduceat(groups[:, 0], reduce_at)
+        parents["box"][:, 1] = np.minimum.reduceat(groups[:, 1], reduce_at)
+        parents["box"][:, 2] = np.maximum.reduceat(groups[:, 2], reduce_at)
+        parents["box"][:, 3] = np.maximum.reduceat(groups[:, 3], reduce_at)
+    return nodes.tobytes()
+
+
+# --- Writer and reader --------------------------------------------------------------------------
+
+def column_type(values):
+    kind = values.dtype.kind
+    if kind in "iub":
+        return COLUMN_LONG if values.dtype.itemsize > 4 else COLUMN_INT
+    if kind == "f":
+        return COLUMN_FLOAT if values.dtype.itemsize == 4 else COLUMN_DOUBLE
+    if kind == "M":
+        return COLUMN_DATETIME
+    return COLUMN_STRING
+
+
+class FlatGeobufWriter:
+    """
+    Writes a FeatureTable to a FlatGeobuf file with a packed Hilbert R-tree index.
+
+    Features are sorted on a Hilbert curve of their bounding-box centers and indexed by a static
+    R-tree stored right after the header, so readers can fetch only the byte ranges of the features
+    intersecting a bounding box. Polygon and polyline layers are written as MultiPolygon and
+    MultiLineString, one part per ArcGIS part.
+    """
+
+    def __init__(self, node_size=NODE_SIZE):
+        """
+        Parameters:
+        - node_size (int): Children per R-tree node.
+        """
+        self.node_size = node_size
+
+    @staticmethod
+    def encode_geometry(table, xy, k):
+        """
+        Encode feature k of a table as a FlatGeobuf Geometry table. Ends split the xy array into rings
+        (polygons) or parts (multilinestrings) and are omitted when there is only one.
+        """
+        geometry_type = GEOMETRY_TYPES[table.geometry_type]
+        ring_offsets, part_offsets = table.ring_offsets, table.part_offsets
+        parts = range(table.feature_offsets[k], table.feature_offsets[k + 1])
+
+        def linear(first_ring, last_ring):
+            start, end = ring_offsets[first_ring], ring_offsets[last_ring]
+            ends = (ring_offsets[first_ring + 1:last_ring + 1] - start).astype(np.uint32)
+            return Table({GEOMETRY_XY: vector("d", xy[start:end].ravel()),
+                          GEOMETRY_ENDS: vector("I", ends) if len(ends) > 1 else None})
+
+        if geometry_type in (1, 4):
+            start, end = ring_offsets[part_offsets[parts.start]], ring_offsets[part_offsets[parts.stop]]
+            return Table({GEOMETRY_XY: vector("d", xy[start:end].ravel())})
+        if geometry_type == 5:
+            # Polyline parts have one ring each, so ring boundaries are part boundaries
+            return linear(part_offsets[parts.start], part_offsets[parts.stop])
+        polygons = [linear(part_offsets[p], part_offsets[p + 1]) for p in parts]
+        return Table({GEOMETRY_PARTS: subtables(polygons)})
+
+    @staticmethod
+    def encode_properties(columns, k):
+        out = bytearray()
+        for i, (name, values) in enumerate(columns):
+            value = values[k]
+            kind = values.dtype.kind
+            if kind == "f" and np.isnan(value):
+                continue
+            ctype = column_type(values)
+            out += struct.pack("<H", i)
+            if ctype == COLUMN_INT:
+                out += struct.pack("<i", int(value))
+            elif ctype == COLUMN_LONG:
+                out += struct.pack("<q", int(value))
+            elif ctype == COLUMN_FLOAT:
+                out += struct.pack("<f", float(value))
+            elif ctype == COLUMN_DOUBLE:
+                out += struct.pack("<d", float(value))
+            else:
+                text = (np.datetime_as_string(value) if kind == "M" else str(value)).encode("utf-8")
+                out += struct.pack("<I", len(text)) + text
+        return bytes(out)
+
+    def write(self, table, path, name, crs_code=None):
+        """
+        Write a table to a FlatGeobuf file.
+
+        Parameters:
+        - table (FeatureTable): The features. Features without geometry are skipped.
+        - path (str): The output .fgb file.
+        - name (str): The layer name stored in the header.
+        - crs_code (int): EPSG code of the coordinates, or None.
+
+        Returns:
+            int: The number of features written.
+        """
+        xy = table.xy
+        boxes = table.bounds()
+        keep = np.flatnonzero(~np.isnan(boxes[:, 0]))
+        boxes = boxes[keep]
+
+        if len(keep):
+            extent = (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+            width = (extent[2] - extent[0]) or 1.0
+            height = (extent[3] - extent[1]) or 1.0
+            hx = np.floor(65535 * ((boxes[:, 0] + boxes[:, 2]) / 2 - extent[0]) / width)
+            hy = np.floor(65535 * ((boxes[:, 1] + boxes[:, 3]) / 2 - extent[1]) / height)
+            order = np.argsort(-hilbert(hx, hy).astype(np.int64), kind="stable")
+        else:
+            extent, order = (0.0, 0.0, 0.0, 0.0), np.empty(0, dtype=np.int64)
+        keep, boxes = keep[order], boxes[order]
+
+        columns = list(table.columns.items())
+        header = Table({
+            HEADER_NAME: string(name),
+            HEADER_ENVELOPE: vector("d", list(extent)) if len(keep) else None,
+            HEADER_GEOMETRY_TYPE: scalar("B", GEOMETRY_TYPES[table.geometry_type]),
+            HEADER_COLUMNS: subtables([Table({COLUMN_NAME: string(col_name),
+                                                    COLUMN_TYPE: scalar("B", column_type(values))})
+                                          for col_name, values in columns]) if columns else None,
+            HEADER_FEATURES_COUNT: scalar("Q", len(keep)),
+            HEADER_INDEX_NODE_SIZE: scalar("H", self.node_size if len(keep) else 0),
+            HEADER_CRS: subtable(Table({CRS_ORG: string("EPSG"), CRS_CODE: scalar("i", crs_code)}))
+            if crs_code else None,
+        })
+
+        features, offsets, position = [], np.zeros(len(keep), dtype=np.uint64), 0
+        for i, k in enumerate(keep):
+            feature = finish(Table({
+                FEATURE_GEOMETRY: subtable(self.encode_geometry(table, xy, k)),
+                FEATURE_PROPERTIES: vector("B", self.encode_properties(columns, k)) if columns else None,
+            }))
+            features.append(feature)
+            offsets[i] = position
+            position += len(feature)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(finish(header))
+            if len(keep):
+                f.write(build_tree(boxes, offsets, self.node_size))
+            for feature in features:
+                f.write(feature)
+        os.replace(tmp_path, path)
+        return len(keep)
+
+
+class FlatGeobufReader:
+    """
+    Reads FlatGeobuf files, using the packed R-tree to read only the byte ranges a bounding box needs.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+        - path (str): The .fgb file.
+        """
+        self.file = open(path, "rb")
+        self.bytes_read = 0
+        if self.read(0, 8)[:3] != MAGIC[:3]:
+            raise ValueError(f"{path} is not a FlatGeobuf file")
+        header_size = struct.unpack("<I", self.read(8, 4))[0]
+        header = TableReader.root(self.read(8, header_size + 4))
+        self.name = header.string(HEADER_NAME)
+        self.geometry_type = header.scalar(HEADER_GEOMETRY_TYPE, "B")
+        self.features_count = header.scalar(HEADER_FEATURES_COUNT, "Q")
+        self.node_size = header.scalar(HEADER_INDEX_NODE_SIZE, "H", NODE_SIZE)
+        envelope = header.vector(HEADER_ENVELOPE, "d")
+        self.envelope = tuple(envelope.tolist()) if envelope is not None else None
+        crs = header.table(HEADER_CRS)
+        self.crs_code = crs.scalar(CRS_CODE, "i") if crs else None
+        self.columns = [(c.string(COLUMN_NAME), c.scalar(COLUMN_TYPE, "B")) for c in header.tables(HEADER_COLUMNS)]
+
+        self.index_start = 12 + header_size
+        self.levels = level_bounds(self.features_count, self.node_size) \
+            if self.node_size and self.features_count else []
+        index_size = self.levels[0][1] * NODE_ITEM.size if self.levels else 0
+        self.features_start = self.index_start + index_size
+
+    def read(self, offset, length):
+        """Read a byte range. The only file access, so it can be swapped for HTTP range requests."""
+        self.file.seek(offset)
+        self.bytes_read += length
+        return self.file.read(length)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def search(self, xmin, ymin, xmax, ymax):
+        """
+        Yield the features whose bounding boxes intersect a bounding box.
+
+        Only the index nodes on the way down and the matching features are read.
+        """
+        if not self.levels:
+            return
+        leaf_start = self.levels[0][0]
+        # (first node, last node + 1, level) ranges still to visit; the root level is last in self.levels
+        queue = [(0, 1, len(self.levels) - 1)]
+        hits = []
+        while queue:
+            start, end, level = queue.pop()
+            data = self.read(self.index_start + start * NODE_ITEM.size, (end - start) * NODE_ITEM.size)
+            for i, (nx0, ny0, nx1, ny1, offset) in enumerate(NODE_ITEM.iter_unpack(data)):
+                if nx1 < xmin or nx0 > xmax or ny1 < ymin or ny0 > ymax:
+                    continue
+                if start + i >= leaf_start:
+                    hits.append(offset)
+                else:
+                    child_end = min(offset + self.node_size, self.levels[level - 1][1])
+                    queue.append((offset, child_end, level - 1))
+        for offset in sorted(hits):
+            yield self.read_feature(offset)
+
+    def __iter__(self):
+        """Yield every feature in file order."""
+        offset = 0
+        for _ in range(self.features_count):
+            feature = self.read_feature(offset)
+            offset += feature["size"]
+            yield feature
+
+    def read_feature(self, offset):
+        """
+        Read the feature at a byte offset in the feature section.
+
+        Returns:
+            dict: "geometry" (list of parts, each a list of (n, 2) rings or point arrays), "properties" and "size".
+        """
+        size = struct.unpack("<I", self.read(self.features_start + offset, 4))[0]
+        buf = self.read(self.features_start + offset, size + 4)
+        feature = TableReader.root(buf)
+        geometry = feature.table(FEATURE_GEOMETRY)
+        return {
+            "geometry": self.decode_geometry(geometry) if geometry else None,
+            "properties": self.decode_properties(feature.vector(FEATURE_PROPERTIES, "B")),
+            "size": size + 4,
+        }
+
+    def decode_geometry(self, geometry):
+        parts = geometry.tables(GEOMETRY_PARTS)
+        if parts:
+            return [self.decode_geometry(part)[0] for part in parts]
+        xy = geometry.vector(GEOMETRY_XY, "d")
+        xy = xy.reshape(-1, 2) if xy is not None else np.empty((0, 2))
+        ends = geometry.vector(GEOMETRY_ENDS, "I")
+        if ends is None or len(ends) == 0:
+            return [[xy]]
+        starts = np.concatenate([[0], ends[:-1]]).astype(np.int64)
+        rings = [xy[s:e] for s, e in zip(starts, ends.astype(np.int64))]
+        # Ends split rings of a polygon, or the parts of a multilinestring
+        return [rings] if self.geometry_type in (3, 6) else [[ring] for ring in rings]
+
+    def decode_properties(self, data):
+        properties = {}
+        if data is None:
+            return properties
+        data = data.tobytes()
+        pos = 0
+        while pos < len(data):
+            index = struct.unpack_from("<H", data, pos)[0]
+            pos += 2
+            name, ctype = self.columns[index]
+            if ctype in (0, 1, 2):
+                value, pos = data[pos], pos + 1
+            elif ctype in (3, 4):
+                value, pos = struct.unpack_from("<h" if ctype == 3 else "<H", data, pos)[0], pos + 2
+            elif ctype in (COLUMN_INT, 6, COLUMN_FLOAT):
+                fmt = {COLUMN_INT: "<i", 6: "<I", COLUMN_FLOAT: "<f"}[ctype]
+                value, pos = struct.unpack_from(fmt, data, pos)[0], pos + 4
+            elif ctype in (COLUMN_LONG, 8, COLUMN_DOUBLE):
+                fmt = {COLUMN_LONG: "<q", 8: "<Q", COLUMN_DOUBLE: "<d"}[ctype]
+                value, pos = struct.unpack_from(fmt, data, pos)[0], pos + 8
+            else:
+                length = struct.unpack_from("<I", data, pos)[0]
+                value = data[pos + 4:pos + 4 + length]
+                value = value if ctype == 14 else value.decode("utf-8")
+                pos += 4 + length
+            properties[name] = value
+        return properties
@@ -0,0 +1,57 @@
+import os
+
+from analysis.FeatureTable import FIELD_DTYPES, FeatureTable
+from catalog.WorkspaceCatalog import CATALOG
+from export.FlatGeobuf import FlatGeobufWriter
+
+
+class FlatGeobufExporter:
+    """
+    Exports analysis outputs as FlatGeobuf files, one per layer.
+
+    The files carry a packed Hilbert R-tree, so QGIS, GDAL or a web map reading them over HTTP range
+    requests fetch only the index nodes and features of the area on screen instead of the whole layer.
+    """
+
+    def __init__(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses 'proj_dir' and the optional 'flatgeobuf_dir'
+          and 'flatgeobuf_node_size' keys.
+        """
+        self.output_dir = os.path.join(config_dict.get('proj_dir'), config_dict.get('flatgeobuf_dir', 'flatgeobuf'))
+        self.writer = FlatGeobufWriter(config_dict.get('flatgeobuf_node_size', 16))
+
+    def read_layer(self, layer_name, where_clause=None):
+        """
+        Read a layer and its exportable attribute fields into a FeatureTable.
+
+        Parameters:
+        - layer_name (str): The feature class to read.
+        - where_clause (str): Optional filter, e.g. "Join_Count = 1".
+        """
+        fields = [name for name, field_type in CATALOG.fields(layer_name) if field_type in FIELD_DTYPES]
+        if where_clause:
+            return FeatureTable.from_feature_class(layer_name, fields, where_clause)
+        return CATALOG.table(layer_name, fields)
+
+    def export(self, layers):
+        """
+        Write each layer to <flatgeobuf_dir>/<layer>.fgb.
+
+        Parameters:
+        - layers (dict): Layer name -> optional where clause.
+
+        Returns:
+            list: The paths of the written files.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        for name, where_clause in layers.items():
+            table = self.read_layer(name, where_clause)
+            path = os.path.join(self.output_dir, f"{name}.fgb")
+            crs_code = CATALOG.spatial_reference(name).factoryCode or None
+            count = self.writer.write(table, path, name, crs_code)
+            print(f"{name}: wrote {count} features to {path}")
+            paths.append(path)
+        return paths
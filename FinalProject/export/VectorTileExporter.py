@@ -0,0 +1,606 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+
+import arcpy
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+from analysis.GeometryStore import GeometryStore
+from catalog.WorkspaceCatalog import CATALOG
+
+# Half the width of the Web Mercator world in meters
+ORIGIN_SHIFT = 20037508.342789244
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+
+POINT = 1
+POLYGON = 3
+
+
+def zigzag(n):
+    """Zigzag-encode a signed integer for protobuf."""
+    return (n << 1) ^ (n >> 31)
+
+
+def varint(n):
+    """Encode an unsigned integer as a protobuf varint."""
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def pb_field(number, wire_type, payload):
+    """Encode one protobuf field. Length-delimited payloads are given as bytes."""
+    key = varint((number << 3) | wire_type)
+    if wire_type == 2:
+        return key + varint(len(payload)) + payload
+    return key + payload
+
+
+def pb_packed(number, values):
+    """Encode a packed repeated uint32 field."""
+    return pb_field(number, 2, b"".join(varint(v) for v in values))
+
+
+def encode_value(value):
+    """Encode a feature attribute as an MVT Value message."""
+    if isinstance(value, bool):
+        return pb_field(7, 0, varint(int(value)))
+    if isinstance(value, int):
+        return pb_field(6, 0, varint((value << 1) ^ (value >> 63)))
+    if isinstance(value, float):
+        return pb_field(3, 1, struct.pack("<d", value))
+    return pb_field(1, 2, str(value).encode("utf-8"))
+
+
+def ring_area(ring):
+    """Signed area of a ring in tile coordinates (y down). Positive means an exterior ring in MVT."""
+    area = 0
+    for i in range(len(ring)):
+        x1, y1 = ring[i]
+        x2, y2 = ring[(i + 1) % len(ring)]
+        area += x1 * y2 - x2 * y1
+    return area / 2
+
+
+def simplify(points, tolerance):
+    """
+        Douglas-Peucker simplification of a ring or line.
+
+        Args:
+            points (list): (x, y) tuples.
+            tolerance (float): Maximum allowed deviation, in the units of the points.
+
+        Returns:
+            list: The retained points. Both end points are always kept.
+        """
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first]
+        x2, y2 = points[last]
+        dx, dy = x2 - x1, y2 - y1
+        seg_len = math.hypot(dx, dy)
+        max_dist, index = 0, None
+        for i in range(first + 1, last):
+            px, py = points[i]
+            if seg_len == 0:
+                dist = math.hypot(px - x1, py - y1)
+            else:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / seg_len
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def tile_bounds(z, x, y):
+    """Web Mercator bounds (xmin, ymin, xmax, ymax) of an XYZ tile."""
+    size = 2 * ORIGIN_SHIFT / (1 << z)
+    xmin = -ORIGIN_SHIFT + x * size
+    ymax = ORIGIN_SHIFT - y * size
+    return xmin, ymax - size, xmin + size, ymax
+
+
+def tile_range(z, bbox):
+    """Range of XYZ tile columns and rows that a Web Mercator bbox touches."""
+    n = 1 << z
+    size = 2 * ORIGIN_SHIFT / n
+    x0 = max(0, int((bbox[0] + ORIGIN_SHIFT) // size))
+    x1 = min(n - 1, int((bbox[2] + ORIGIN_SHIFT) // size))
+    y0 = max(0, int((ORIGIN_SHIFT - bbox[3]) // size))
+    y1 = min(n - 1, int((ORIGIN_SHIFT - bbox[1]) // size))
+    return x0, x1, y0, y1
+
+
+def feature_bbox(feature):
+    xs = [p[0] for part in feature["parts"] for ring in part for p in ring]
+    ys = [p[1] for part in feature["parts"] for ring in part for p in ring]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def encode_geometry(geom_type, parts):
+    """
+        Encode tile-space geometry as MVT command integers.
+
+        Args:
+            geom_type (int): POINT or POLYGON.
+            parts (list): For points a list of [[(x, y)]]; for polygons a list of rings per polygon.
+
+        Returns:
+            list: The command and parameter integers.
+        """
+    cmds = []
+    cx = cy = 0
+    if geom_type == POINT:
+        points = [ring[0] for ring in parts]
+        cmds.append((1 & 7) | (len(points) << 3))
+        for x, y in points:
+            cmds += [zigzag(x - cx), zigzag(y - cy)]
+            cx, cy = x, y
+        return cmds
+
+    for polygon in parts:
+        for ring in polygon:
+            x, y = ring[0]
+            cmds += [(1 & 7) | (1 << 3), zigzag(x - cx), zigzag(y - cy)]
+            cx, cy = x, y
+            cmds.append((2 & 7) | ((len(ring) - 1) << 3))
+            for x, y in ring[1:]:
+                cmds += [zigzag(x - cx), zigzag(y - cy)]
+                cx, cy = x, y
+            cmds.append((7 & 7) | (1 << 3))
+    return cmds
+
+
+def polygon_parts(geom):
+    """Yield the polygons of a Polygon, MultiPolygon or GeometryCollection, skipping lines and points."""
+    if geom.geom_type == "Polygon":
+        if not geom.is_empty:
+            yield geom
+    elif hasattr(geom, "geoms"):
+        for part in geom.geoms:
+            yield from polygon_parts(part)
+
+
+def to_tile_polygons(polygon, bounds):
+    """
+        Clip a Web Mercator polygon to a tile (plus buffer) and snap it to integer tile coordinates.
+
+        The polygon is clipped as a whole, not ring by ring, so a hole crossing the buffer edge becomes a
+        notch in the exterior instead of a ring lying on top of the clipped exterior. Snapping to the
+        integer grid with set_precision keeps the result valid, as MVT requires.
+
+        Args:
+            polygon (list): Rings of one polygon in Web Mercator, the exterior first.
+            bounds (tuple): The tile bounds in Web Mercator.
+
+        Returns:
+            list: Valid polygons, each a list of integer rings with the exterior first, oriented for MVT.
+        """
+    xmin, ymin, xmax, ymax = bounds
+    scale = TILE_EXTENT / (xmax - xmin)
+    rings = [[((x - xmin) * scale, (ymax - y) * scale) for x, y in ring] for ring in polygon if len(ring) >= 3]
+    if not rings:
+        return []
+    geom = Polygon(rings[0], rings[1:])
+    if not geom.is_valid:
+        # Simplifying rings independently can make them cross
+        geom = shapely.make_valid(geom)
+    geom = shapely.clip_by_rect(geom, -TILE_BUFFER, -TILE_BUFFER, TILE_EXTENT + TILE_BUFFER, TILE_EXTENT + TILE_BUFFER)
+    geom = shapely.set_precision(geom, 1.0)
+
+    result = []
+    for part in polygon_parts(geom):
+        tile_rings = []
+        for i, ring in enumerate([part.exterior, *part.interiors]):
+            coords = [(int(round(x)), int(round(y))) for x, y in ring.coords[:-1]]
+            if len(coords) < 3:
+                continue
+            # Exterior rings have positive area in tile coordinates, holes negative
+            if (i == 0) != (ring_area(coords) > 0):
+                coords.reverse()
+            tile_rings.append(coords)
+        # Check what is actually encoded: integer rings in MVT orientation
+        if tile_rings and Polygon(tile_rings[0], tile_rings[1:]).is_valid:
+            result.append(tile_rings)
+    return result
+
+
+def encode_tile_feature(feature, simplified, bounds):
+    """
+        Build the tile geometry for one feature, or None if nothing of it falls in the tile.
+
+        Args:
+            feature (dict): The source feature.
+            simplified (list): The feature's parts, simplified for the current zoom.
+            bounds (tuple): The tile bounds in Web Mercator.
+
+        Returns:
+            list: The feature's geometry commands, or None.
+        """
+    xmin, ymin, xmax, ymax = bounds
+    if feature["type"] == POINT:
+        scale = TILE_EXTENT / (xmax - xmin)
+        points = []
+        for part in simplified:
+            x, y = part[0][0]
+            if xmin <= x < xmax and ymin < y <= ymax:
+                points.append([(int(round((x - xmin) * scale)), int(round((ymax - y) * scale)))])
+        return encode_geometry(POINT, points) if points else None
+
+    polygons = [tile_polygon for polygon in simplified for tile_polygon in to_tile_polygons(polygon, bounds)]
+    return encode_geometry(POLYGON, polygons) if polygons else None
+
+
+def encode_layer(name, tile_features):
+    """
+        Encode an MVT Layer message (as a Tile.layers field) from (feature, geometry) pairs.
+
+        Returns:
+            bytes: Field 3 of the Tile message. Tiles are built by concatenating layer fields.
+        """
+    keys, key_index = [], {}
+    values, value_index = [], {}
+    features = b""
+    for feature, geometry in tile_features:
+        tags = []
+        for k, v in feature["properties"].items():
+            if v is None:
+                continue
+            if k not in key_index:
+                key_index[k] = len(keys)
+                keys.append(k)
+            vkey = (type(v).__name__, v)
+            if vkey not in value_index:
+                value_index[vkey] = len(values)
+                values.append(v)
+            tags += [key_index[k], value_index[vkey]]
+        body = pb_field(1, 0, varint(feature["id"]))
+        if tags:
+            body += pb_packed(2, tags)
+        body += pb_field(3, 0, varint(feature["type"])) + pb_packed(4, geometry)
+        features += pb_field(2, 2, body)
+
+    layer = pb_field(15, 0, varint(2)) + pb_field(1, 2, name.encode("utf-8")) + features
+    layer += b"".join(pb_field(3, 2, k.encode("utf-8")) for k in keys)
+    layer += b"".join(pb_field(4, 2, encode_value(v)) for v in values)
+    layer += pb_field(5, 0, varint(TILE_EXTENT))
+    return pb_field(3, 2, layer)
+
+
+def pack_features(features):
+    """
+        Flatten features into coordinate, offset and attribute arrays for a GeometryStore.
+
+        Rings index into coords, parts into rings and features into parts. Properties are stored
+        as one JSON document per feature in a byte array.
+
+        Args:
+            features (list): Features returned by read_layer().
+
+        Returns:
+            dict: Array name -> NumPy array.
+        """
+    coords, ring_offsets, part_offsets, feature_offsets = [], [0], [0], [0]
+    props, prop_offsets = [], [0]
+    for feature in features:
+        for part in feature["parts"]:
+            for ring in part:
+                coords.extend(ring)
+                ring_offsets.append(len(coords))
+            part_offsets.append(len(ring_offsets) - 1)
+        feature_offsets.append(len(part_offsets) - 1)
+        encoded = json.dumps(feature["properties"]).encode("utf-8")
+        props.append(encoded)
+        prop_offsets.append(prop_offsets[-1] + len(encoded))
+    return {
+        "coords": np.array(coords, dtype=np.float64).reshape(-1, 2),
+        "ring_offsets": np.array(ring_offsets, dtype=np.int64),
+        "part_offsets": np.array(part_offsets, dtype=np.int64),
+        "feature_offsets": np.array(feature_offsets, dtype=np.int64),
+        "ids": np.array([f["id"] for f in features], dtype=np.int64),
+        "types": np.array([f["type"] for f in features], dtype=np.int8),
+        "bbox": np.array([f["bbox"] for f in features], dtype=np.float64).reshape(-1, 4),
+        "props": np.frombuffer(b"".join(props), dtype=np.uint8),
+        "prop_offsets": np.array(prop_offsets, dtype=np.int64),
+    }
+
+
+def unpack_feature(arrays, i):
+    """
+        Rebuild feature i from the arrays written by pack_features().
+
+        Returns:
+            dict: The feature, as returned by read_layer().
+        """
+    coords, rings, parts = arrays["coords"], arrays["ring_offsets"], arrays["part_offsets"]
+    feature_parts = []
+    for p in range(arrays["feature_offsets"][i], arrays["feature_offsets"][i + 1]):
+        feature_parts.append([list(map(tuple, coords[rings[r]:rings[r + 1]].tolist()))
+                              for r in range(parts[p], parts[p + 1])])
+    start, end = arrays["prop_offsets"][i], arrays["prop_offsets"][i + 1]
+    return {
+        "id": int(arrays["ids"][i]),
+        "type": int(arrays["types"][i]),
+        "parts": feature_parts,
+        "properties": json.loads(arrays["props"][start:end].tobytes().decode("utf-8")),
+        "bbox": tuple(arrays["bbox"][i].tolist()),
+    }
+
+
+# The store a worker process is attached to, kept between tasks of the same layer
+_attached = None
+
+
+def attached_store(manifest):
+    global _attached
+    if _attached is None or _attached.manifest["name"] != manifest["name"]:
+        if _attached is not None:
+            _attached.close()
+        _attached = GeometryStore.attach(manifest)
+    return _attached
+
+
+def tile_layer_chunk(task):
+    """
+        Worker task: encode one layer for a block of tile columns at one zoom.
+
+        Features are read from the layer's shared GeometryStore, so only their indices travel with the task.
+
+        Args:
+            task (tuple): (layer name, store manifest, feature indices, zoom, first column, last column, simplify factor).
+
+        Returns:
+            list: (z, x, y, layer bytes) tuples for every non-empty tile.
+        """
+    name, manifest, indices, z, col0, col1, factor = task
+    tolerance = factor * 2 * ORIGIN_SHIFT / (1 << z) / TILE_EXTENT
+    arrays = attached_store(manifest).arrays
+
+    per_tile = {}
+    for feature in (unpack_feature(arrays, i) for i in indices):
+        if feature["type"] == POINT:
+            simplified = feature["parts"]
+        else:
+            simplified = [[simplify(ring, tolerance) for ring in polygon] for polygon in feature["parts"]]
+        x0, x1, y0, y1 = tile_range(z, feature["bbox"])
+        for x in range(max(x0, col0), min(x1, col1) + 1):
+            for y in range(y0, y1 + 1):
+                geometry = encode_tile_feature(feature, simplified, tile_bounds(z, x, y))
+                if geometry:
+                    per_tile.setdefault((x, y), []).append((feature, geometry))
+
+    return [(z, x, y, encode_layer(name, tile_features)) for (x, y), tile_features in per_tile.items()]
+
+
+class VectorTileExporter:
+    """
+    Builds a Mapbox vector tile pyramid of analysis outputs in an MBTiles (SQLite) file.
+
+    Each layer is simplified per zoom, clipped per tile and encoded in parallel worker processes.
+    Encoded layers are cached per tile in the MBTiles file together with a content hash, so a layer
+    whose features did not change since the last run is reused instead of being re-tiled.
+    """
+
+    def __init__(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses 'proj_dir' and the optional
+          'tile_file', 'tile_min_zoom', 'tile_max_zoom', 'tile_simplify_factor' and 'tile_workers' keys.
+        """
+        self.config_dict = config_dict
+        self.mbtiles_path = f"{config_dict.get('proj_dir')}{config_dict.get('tile_file', 'WestNileOutbreak.mbtiles')}"
+        self.min_zoom = config_dict.get('tile_min_zoom', 10)
+        self.max_zoom = config_dict.get('tile_max_zoom', 16)
+        self.simplify_factor = config_dict.get('tile_simplify_factor', 1.0)
+        self.workers = config_dict.get('tile_workers') or os.cpu_count()
+
+    def read_layer(self, layer_name, where_clause=None):
+        """
+        Read a feature class into plain Python features in Web Mercator.
+
+        Parameters:
+        - layer_name (str): The feature class to read.
+        - where_clause (str): Optional filter, e.g. "Join_Count = 1".
+        """
+        web_mercator = arcpy.SpatialReference(3857)
+        fields = [name for name, field_type in CATALOG.fields(layer_name)
+                  if field_type in ("String", "Integer", "SmallInteger", "Double", "Single", "Date")]
+        features = []
+        with arcpy.da.SearchCursor(layer_name, ["OID@", "SHAPE@"] + fields, where_clause,
+                                   spatial_reference=web_mercator) as cursor:
+            for row in cursor:
+                oid, shape, attrs = row[0], row[1], row[2:]
+                if shape is None:
+                    continue
+                if shape.type in ("point", "multipoint"):
+                    geom_type = POINT
+                    parts = [[[(p.X, p.Y)]] for p in (shape if shape.type == "multipoint" else [shape.firstPoint])]
+                else:
+                    geom_type = POLYGON
+                    parts = []
+                    for part in shape:
+                        # Rings within a part are separated by None; the first is the exterior
+                        rings, ring = [], []
+                        for p in part:
+                            if p is None:
+                                rings.append(ring)
+                                ring = []
+                            else:
+                                ring.append((p.X, p.Y))
+                        rings.append(ring)
+                        parts.append([r for r in rings if len(r) >= 3])
+                properties = {k: (str(v) if hasattr(v, "isoformat") else v) for k, v in zip(fields, attrs)}
+                feature = {"id": oid, "type": geom_type, "parts": parts, "properties": properties}
+                feature["bbox"] = feature_bbox(feature)
+                features.append(feature)
+        return features
+
+    def content_hash(self, features):
+        """
+        Hash a layer's features together with the tiling settings that affect its tiles.
+
+        Parameters:
+        - features (list): Features returned by read_layer().
+        """
+        h = hashlib.sha256()
+        h.update(repr((self.min_zoom, self.max_zoom, self.simplify_factor)).encode("utf-8"))
+        for feature in features:
+            h.update(repr((feature["id"], feature["parts"], sorted(feature["properties"].items()))).encode("utf-8"))
+        return h.hexdigest()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.mbtiles_path)
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+            CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row);
+            CREATE TABLE IF NOT EXISTS layer_hashes (layer TEXT PRIMARY KEY, hash TEXT, bounds TEXT, fields TEXT);
+            CREATE TABLE IF NOT EXISTS layer_tiles (layer TEXT, z INTEGER, x INTEGER, y INTEGER, data BLOB);
+            CREATE INDEX IF NOT EXISTS layer_tiles_index ON layer_tiles (layer);
+            """
+        )
+        return conn
+
+    def tile_layer(self, name, features, executor):
+        """
+        Encode every tile of one layer, farming blocks of tile columns out to worker processes.
+
+        The features are placed in shared memory once per layer; tasks carry only feature indices.
+
+        Returns:
+            list: (z, x, y, layer bytes) tuples.
+        """
+        if not features:
+            return []
+        tiles = []
+        with GeometryStore.create(pack_features(features)) as store:
+            boxes = store.arrays["bbox"]
+            bbox = (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+            tasks = []
+            for z in range(self.min_zoom, self.max_zoom + 1):
+                x0, x1, _, _ = tile_range(z, bbox)
+                step = max(1, math.ceil((x1 - x0 + 1) / self.workers))
+                for col0 in range(x0, x1 + 1, step):
+                    col1 = col0 + step - 1
+                    size = 2 * ORIGIN_SHIFT / (1 << z)
+                    left, right = -ORIGIN_SHIFT + col0 * size, -ORIGIN_SHIFT + (col1 + 1) * size
+                    indices = np.flatnonzero((boxes[:, 2] >= left) & (boxes[:, 0] <= right)).astype(np.int32)
+                    if len(indices):
+                        tasks.append((name, store.manifest, indices, z, col0, col1, self.simplify_factor))
+
+            for result in executor.map(tile_layer_chunk, tasks):
+                tiles.extend(result)
+            del boxes
+        return tiles
+
+    def export(self, layers):
+        """
+        Export layers to the MBTiles file, re-tiling only layers whose content changed.
+
+        Parameters:
+        - layers (dict): Layer name -> optional where clause.
+
+        Returns:
+            str: The path of the MBTiles file.
+        """
+        print(f"Exporting vector tiles to {self.mbtiles_path}")
+        with closing(self._connect()) as conn, ProcessPoolExecutor(max_workers=self.workers) as executor:
+            cached = {row[0]: row[1] for row in conn.execute("SELECT layer, hash FROM layer_hashes")}
+
+            for name, where_clause in layers.items():
+                features = self.read_layer(name, where_clause)
+                digest = self.content_hash(features)
+                if cached.get(name) == digest:
+                    print(f"{name}: unchanged, reusing cached tiles")
+                    continue
+
+                tiles = self.tile_layer(name, features, executor)
+                bounds = None
+                if features:
+                    bounds = [min(f["bbox"][0] for f in features), min(f["bbox"][1] for f in features),
+                              max(f["bbox"][2] for f in features), max(f["bbox"][3] for f in features)]
+                fields = {k: ("Number" if isinstance(v, (int, float)) else "String")
+                          for f in features[:1] for k, v in f["properties"].items()}
+                conn.execute("DELETE FROM layer_tiles WHERE layer = ?", (name,))
+                conn.executemany("INSERT INTO layer_tiles VALUES (?, ?, ?, ?, ?)",
+                                 [(name, z, x, y, data) for z, x, y, data in tiles])
+                conn.execute("INSERT OR REPLACE INTO layer_hashes VALUES (?, ?, ?, ?)",
+                             (name, digest, json.dumps(bounds), json.dumps(fields)))
+                conn.commit()
+                print(f"{name}: encoded {len(tiles)} tiles from {len(features)} features")
+
+            # Layers removed from the export are dropped from the cache
+            names = list(layers)
+            conn.execute(f"DELETE FROM layer_tiles WHERE layer NOT IN ({','.join('?' * len(names))})", names)
+            conn.execute(f"DELETE FROM layer_hashes WHERE layer NOT IN ({','.join('?' * len(names))})", names)
+
+            self._write_tiles(conn, names)
+            conn.commit()
+        return self.mbtiles_path
+
+    def _write_tiles(self, conn, names):
+        """Assemble the MBTiles tiles and metadata tables from the per-layer cache."""
+        order = {name: i for i, name in enumerate(names)}
+        assembled = {}
+        for layer, z, x, y, data in conn.execute("SELECT layer, z, x, y, data FROM layer_tiles"):
+            assembled.setdefault((z, x, y), []).append((order[layer], data))
+
+        conn.execute("DELETE FROM tiles")
+        conn.executemany(
+            "INSERT INTO tiles VALUES (?, ?, ?, ?)",
+            # MBTiles rows use the TMS scheme, flipped from XYZ
+            [(z, x, (1 << z) - 1 - y, gzip.compress(b"".join(d for _, d in sorted(parts))))
+             for (z, x, y), parts in assembled.items()]
+        )
+
+        vector_layers, all_bounds = [], []
+        for layer, bounds, fields in conn.execute("SELECT layer, bounds, fields FROM layer_hashes"):
+            vector_layers.append({"id": layer, "fields": json.loads(fields),
+                                  "minzoom": self.min_zoom, "maxzoom": self.max_zoom})
+            if json.loads(bounds):
+                all_bounds.append(json.loads(bounds))
+
+        metadata = {
+            "name": "WestNileOutbreak",
+            "format": "pbf",
+            "type": "overlay",
+            "minzoom": str(self.min_zoom),
+            "maxzoom": str(self.max_zoom),
+            "json": json.dumps({"vector_layers": vector_layers}),
+        }
+        if all_bounds:
+            west, south = self.to_lon_lat(min(b[0] for b in all_bounds), min(b[1] for b in all_bounds))
+            east, north = self.to_lon_lat(max(b[2] for b in all_bounds), max(b[3] for b in all_bounds))
+            metadata["bounds"] = f"{west},{south},{east},{north}"
+            metadata["center"] = f"{(west + east) / 2},{(south + north) / 2},{self.min_zoom}"
+        conn.execute("DELETE FROM metadata")
+        conn.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+
+    @staticmethod
+    def to_lon_lat(mx, my):
+        """Convert Web Mercator meters to longitude/latitude degrees."""
+        lon = mx / ORIGIN_SHIFT * 180
+        lat = math.degrees(2 * math.atan(math.exp(my / ORIGIN_SHIFT * math.pi)) - math.pi / 2)
+        return lon, lat
@@ -3,24 +3,40 @@ import arcpy
 import arcpy.mp
 import logging
 from etl.GSheetsEtl import GSheetsEtl
-
-
-def setup():
+from export.VectorTileExporter import VectorTileExporter
+from export.FlatGeobufExporter import FlatGeobufExporter
+from analysis.RasterEngine import RasterEngine
+from analysis.IncrementalErase import IncrementalErase
+from analysis.ChangeFeed import ChangeFeed
+from analysis.ExtentIndex import ExtentIndex
+from analysis.PolygonSimplifier import PolygonSimplifier
+from analysis.NWayOverlay import NWayOverlay
+from monitoring.MetricsRegistry import REGISTRY
+from catalog.WorkspaceCatalog import CATALOG
+from monitoring.MemoryBudget import MEMORY
+import numpy as np
+import os
+
+DEFAULT_WORKSPACE = r"C:\Users\Spencer\Desktop\FRCCSpring2025\ProgrammingGIS\Labs\Lab1\WestNileOutbreak\WestNileOutbreak.gdb"
+DEFAULT_BUFFER_LAYERS = ["Mosquito_Larval_Sites", "Wetlands", "Lakes_and_Reservoirs", "OSMP_Properties"]
+DEFAULT_INTERSECT_LAYERS = ["Mosquito_Larval_Sites", "Wetlands"]
+
+
+def setup(config_path='config/wnvoutbreak.yaml'):
     """
        Sets up the ArcGIS Pro project environment and initializes configuration settings.
 
        Configures environment variables, logging, map spatial reference, and loads the YAML configuration file.
 
+       Args:
+           config_path (str): The YAML configuration file to load.
+
        Returns:
            dict: A dictionary containing configuration values loaded from the YAML file, or None if an error occurs.
        """
     logging.debug("Entering setup()")
     try:
-        arcpy.env.parallelProcessingFactor = "100%"
-        arcpy.env.workspace = r"C:\Users\Spencer\Desktop\FRCCSpring2025\ProgrammingGIS\Labs\Lab1\WestNileOutbreak\WestNileOutbreak.gdb"
-        arcpy.env.overwriteOutput = True
-
-        with open('config/wnvoutbreak.yaml') as f:
+        with open(config_path) as f:
             config_dict = yaml.load(f, Loader=yaml.FullLoader)
 
         logging.basicConfig(
@@ -29,35 +45,77 @@ def setup():
             level=logging.DEBUG
         )
 
-        proj_path = r"C:\Users\Spencer\Desktop\FRCCSpring2025\ProgrammingGIS\Labs\Lab1\WestNileOutbreak"
-        aprx = arcpy.mp.ArcGISProject(rf"{proj_path}\WestNileOutbreak.aprx")
+        if not configure_region(config_dict):
+            return None
+        return config_dict
+
+    except Exception as e:
+        logging.error(f"Error in setup(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting setup()")
+
+
+def configure_region(region_config):
+    """
+       Points the arcpy environment and the project map at one region's workspace.
+
+       Args:
+           region_config (dict): The configuration of the region, with its workspace and project directory.
+
+       Returns:
+           bool: True if the environment was configured, or None if an error occurs.
+       """
+    logging.debug(f"Entering configure_region() with region={region_config.get('region_name')}")
+    try:
+        arcpy.env.parallelProcessingFactor = region_config.get('parallel_processing_factor', "100%")
+        arcpy.env.workspace = region_config.get('workspace', DEFAULT_WORKSPACE)
+        arcpy.env.overwriteOutput = True
+        MEMORY.configure(region_config)
+        CATALOG.configure(region_config)
+
+        aprx = arcpy.mp.ArcGISProject(f"{region_config.get('proj_dir')}{region_config.get('project_file', 'WestNileOutbreak.aprx')}")
         map_doc = aprx.listMaps()[0]
 
-        spatial_ref = arcpy.SpatialReference(26953)
+        spatial_ref = arcpy.SpatialReference(region_config.get('workspace_crs', 26953))
         map_doc.defaultCamera.spatialReference = spatial_ref
         aprx.save()
 
-        logging.info("Set map document spatial reference to NAD 1983 StatePlane Colorado North (US Feet).")
-
-        return config_dict
+        logging.info(f"Set map document spatial reference to {spatial_ref.name}.")
+        return True
 
     except Exception as e:
-        logging.error(f"Error in setup(): {e}")
+        logging.error(f"Error in configure_region(): {e}")
         return None
     finally:
-        logging.debug("Exiting setup()")
+        logging.debug("Exiting configure_region()")
+
+
+def open_project():
+    """
+       Opens the ArcGIS Pro project of the configured region.
 
+       Returns:
+           arcpy.mp.ArcGISProject: The project.
+       """
+    return arcpy.mp.ArcGISProject(f"{config_dict.get('proj_dir')}{config_dict.get('project_file', 'WestNileOutbreak.aprx')}")
 
-def etl():
+
+@REGISTRY.timed("etl")
+def etl(etl_instance=None):
     """
         Runs the ETL (Extract, Transform, Load) process using the GSheetsEtl class.
 
         Instantiates the ETL process with the global config_dict and executes its process method.
+
+        Args:
+            etl_instance (GSheetsEtl): An ETL instance to reuse, so its caches stay warm. Defaults to a new instance.
         """
     logging.debug("Entering etl()")
     try:
         logging.info("Start ETL process...")
-        etl_instance = GSheetsEtl(config_dict)
+        if etl_instance is None:
+            etl_instance = GSheetsEtl(config_dict)
         etl_instance.process()
     except Exception as e:
         logging.error(f"Error in etl(): {e}")
@@ -65,52 +123,195 @@ def etl():
         logging.debug("Exiting etl()")
 
 
-def buffer(layer_name, buff_dist):
+def feet_to_map_units(feet, layer_name):
+    """
+        Converts a distance in feet to the linear units of a layer's spatial reference.
+
+        Args:
+            feet (float): The distance in feet.
+            layer_name (str): The layer whose units to convert to.
+
+        Returns:
+            float: The distance in map units.
+        """
+    return feet * 0.3048 / CATALOG.spatial_reference(layer_name).metersPerUnit
+
+
+@REGISTRY.timed("simplify")
+def simplify_inputs(layers, buff_dist):
+    """
+        Simplifies polygon layers with a tolerance derived from the buffer distance, before they are buffered.
+
+        The buffers of the simplified layers are within the tolerance (buff_dist * simplify_ratio) of the
+        buffers of the originals. Simplified copies are cached per tolerance.
+
+        Args:
+            layers (list): The names of the layers to be buffered.
+            buff_dist (float): The buffer distance in map units.
+
+        Returns:
+            dict: Layer name -> name of the layer to buffer instead. Layers that failed or are not polygons map to themselves.
+        """
+    logging.debug(f"Entering simplify_inputs() with layers={layers}, buff_dist={buff_dist}")
+    simplifier = PolygonSimplifier(config_dict)
+    sources = {}
+    for layer in layers:
+        try:
+            sources[layer] = simplifier.simplified(layer, buff_dist)
+        except Exception as e:
+            logging.error(f"Error in simplify_inputs() on {layer}: {e}")
+            sources[layer] = layer
+    logging.info(f"Simplification tolerance {simplifier.tolerance(buff_dist):.2f} map units: {sources}")
+    logging.debug("Exiting simplify_inputs()")
+    return sources
+
+
+def feature_count(layer):
+    """
+        Counts the features of a dataset, through the catalog, or of a feature layer.
+
+        Args:
+            layer (str or arcpy layer): A dataset name or a feature layer.
+
+        Returns:
+            int: The number of features.
+        """
+    if isinstance(layer, str):
+        return CATALOG.count(layer)
+    return int(arcpy.management.GetCount(layer)[0])
+
+
+def oid_chunks(layer, chunk_size):
+    """
+        Splits a layer into object id ranges of at most chunk_size features each.
+
+        Args:
+            layer (str or arcpy layer): The dataset or feature layer to split.
+            chunk_size (int): Features per chunk.
+
+        Returns:
+            list: One where clause per chunk.
+        """
+    oid_field = arcpy.Describe(layer).OIDFieldName
+    delimited = arcpy.AddFieldDelimiters(layer, oid_field)
+    starts = []
+    with arcpy.da.SearchCursor(layer, ["OID@"], sql_clause=(None, f"ORDER BY {oid_field}")) as cursor:
+        for i, (oid,) in enumerate(cursor):
+            if i % chunk_size == 0:
+                starts.append(oid)
+    return [f"{delimited} >= {start}" + (f" AND {delimited} < {end}" if end is not None else "")
+            for start, end in zip(starts, starts[1:] + [None])]
+
+
+def run_chunked(stage, layer, output_layer, tool):
+    """
+        Runs a geoprocessing step on a whole layer, or on object id chunks of it when the layer would not
+        fit in the memory budget.
+
+        Only for steps that treat each feature of the layer independently (an overlay input, join
+        targets), so the appended chunk outputs hold the same features as a single run. Fields the
+        tool names after its input, such as Intersect's FID_<input>, are named after the chunk layer.
+
+        Args:
+            stage (str): The memory budget stage, e.g. "join".
+            layer (str or arcpy layer): The layer to split.
+            output_layer (str): The output feature class.
+            tool (callable): tool(input layer, output feature class) runs the step.
+
+        Returns:
+            None
+        """
+    chunk = MEMORY.chunk_size(stage, feature_count(layer))
+    if not chunk:
+        tool(layer, output_layer)
+        return
+
+    # Never named after the dataset itself, so deleting the chunk layer cannot resolve to the source data
+    name = f"{os.path.basename(str(layer))}_chunk"
+    chunk_output = f"{output_layer}_chunk"
+    for i, where_clause in enumerate(oid_chunks(layer, chunk)):
+        chunk_layer = arcpy.management.MakeFeatureLayer(layer, name, where_clause)[0]
+        try:
+            if i == 0:
+                tool(chunk_layer, output_layer)
+            else:
+                tool(chunk_layer, chunk_output)
+                arcpy.management.Append(chunk_output, output_layer, "NO_TEST")
+        finally:
+            arcpy.management.Delete(chunk_layer)
+    if arcpy.Exists(chunk_output):
+        arcpy.management.Delete(chunk_output)
+    CATALOG.invalidate(chunk_output)
+
+
+@REGISTRY.timed("buffer")
+@CATALOG.writes("output_layer")
+def buffer(layer_name, buff_dist, output_layer=None):
     """
         Creates a buffer around the specified layer.
 
         Args:
             layer_name (str): The name of the input feature layer to buffer.
             buff_dist (str): The buffer distance (e.g. "1500 feet").
+            output_layer (str): Optional output name. Defaults to "buf_<layer_name>".
 
         Returns:
-            None
+            str: The name of the buffer output layer, or None if an error occurs.
         """
     logging.debug(f"Entering buffer() with layer_name={layer_name}, buff_dist={buff_dist}")
     try:
-        output_buffer_layer_name = f"buf_{layer_name}"
+        output_buffer_layer_name = output_layer or f"buf_{layer_name}"
         logging.info(f"Buffering {layer_name} to generate {output_buffer_layer_name}")
         arcpy.analysis.Buffer(layer_name, output_buffer_layer_name, buff_dist)
+        return output_buffer_layer_name
     except Exception as e:
         logging.error(f"Error in buffer(): {e}")
+        return None
     finally:
         logging.debug("Exiting buffer()")
 
 
-def intersect():
+@REGISTRY.timed("intersect")
+@MEMORY.tracked("intersect")
+@CATALOG.writes("output_layer")
+def intersect(output_layer=None, buffer_layers=None):
     """
         Performs an intersection analysis between buffer layers.
 
-        Asks the user for an output layer name, intersects specified buffer layers, and verifies the output.
+        Asks the user for an output layer name (unless one is given), intersects specified buffer layers,
+        and verifies the output.
+
+        Args:
+            output_layer (str): Optional output name. The user is prompted when not given.
+            buffer_layers (list): Optional buffer layers to intersect. Defaults to the buffers of the configured intersect_layers.
 
         Returns:
             str: The name of the intersect output layer, or None if an error occurs.
         """
     logging.debug("Entering intersect()")
     try:
-        output_layer = input("Enter a name for the intersect output layer: ").strip().replace(" ", "_")[:50]
-        buffer_layers = ["buf_Mosquito_Larval_Sites", "buf_Wetlands"]
+        if not output_layer:
+            output_layer = input("Enter a name for the intersect output layer: ").strip().replace(" ", "_")[:50]
+        if not buffer_layers:
+            buffer_layers = [f"buf_{layer}" for layer in config_dict.get('intersect_layers', DEFAULT_INTERSECT_LAYERS)]
         logging.info(f"Performing intersect on: {buffer_layers}")
 
-        existing_layers = [layer for layer in buffer_layers if arcpy.Exists(layer)]
+        existing_layers = [layer for layer in buffer_layers if CATALOG.exists(layer)]
         if not existing_layers:
             logging.error("No buffer layers exist! Cannot perform intersection.")
             return None
 
-        arcpy.analysis.Intersect(existing_layers, output_layer, "ALL")
+        if config_dict.get('overlay_prefilter'):
+            existing_layers, stats = ExtentIndex(config_dict).prefilter_intersect(existing_layers)
+            logging.info(f"Intersect prefilter: {stats}")
+
+        # Over the memory budget, the largest input is intersected in chunks
+        largest = max(range(len(existing_layers)), key=lambda i: feature_count(existing_layers[i]))
+        run_chunked("intersect", existing_layers[largest], output_layer, lambda chunk, out: arcpy.analysis.Intersect(
+            existing_layers[:largest] + [chunk] + existing_layers[largest + 1:], out, "ALL"))
         logging.info(f"Intersect operation successful! Output saved as {output_layer}")
 
-        if arcpy.Exists(output_layer):
+        if CATALOG.exists(output_layer):
             logging.info(f"Verified: {output_layer} exists.")
             return output_layer
         else:
@@ -124,6 +325,60 @@ def intersect():
         logging.debug("Exiting intersect()")
 
 
+@REGISTRY.timed("overlay")
+@MEMORY.tracked("overlay")
+@CATALOG.writes("output_layer")
+def overlay(output_layer=None, buffer_layers=None, min_layers=None):
+    """
+        Overlays all buffer layers in a single pass, keeping the areas covered by at least min_layers of them.
+
+        Unlike intersect(), any number of layers is overlaid without pairwise intermediates, and every
+        output polygon records which buffer layers cover it (SRC_MASK, SRC_COUNT and SRC_LAYERS), so
+        "k of n" overlap queries can be run on the output.
+
+        Args:
+            output_layer (str): Optional output name. The user is prompted when not given.
+            buffer_layers (list): Optional buffer layers to overlay. Defaults to the buffers of the configured buffer_layers.
+            min_layers (int): Optional smallest number of covering layers. Defaults to the configured overlay_min_layers,
+                or all layers.
+
+        Returns:
+            str: The name of the overlay output layer, or None if an error occurs.
+        """
+    logging.debug("Entering overlay()")
+    try:
+        if not output_layer:
+            output_layer = input("Enter a name for the overlay output layer: ").strip().replace(" ", "_")[:50]
+        if not buffer_layers:
+            buffer_layers = [f"buf_{layer}" for layer in config_dict.get('buffer_layers', DEFAULT_BUFFER_LAYERS)]
+
+        existing_layers = [layer for layer in buffer_layers if CATALOG.exists(layer)]
+        if not existing_layers:
+            logging.error("No buffer layers exist! Cannot perform overlay.")
+            return None
+
+        min_layers = min_layers or config_dict.get('overlay_min_layers') or len(existing_layers)
+        logging.info(f"Performing {min_layers}-of-{len(existing_layers)} overlay on: {existing_layers}")
+        stats = NWayOverlay(config_dict).overlay(existing_layers, output_layer, min(min_layers, len(existing_layers)))
+        logging.info(f"Overlay operation successful! Output saved as {output_layer}: {stats}")
+
+        if CATALOG.exists(output_layer):
+            logging.info(f"Verified: {output_layer} exists.")
+            return output_layer
+        else:
+            logging.error(f"{output_layer} was not created.")
+            return None
+
+    except Exception as e:
+        logging.error(f"Error in overlay(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting overlay()")
+
+
+@REGISTRY.timed("erase")
+@MEMORY.tracked("erase")
+@CATALOG.writes("output_layer")
 def erase_analysis(input_layer, erase_layer, output_layer):
     """
         Erases areas of the input layer using the erase layer.
@@ -138,14 +393,24 @@ def erase_analysis(input_layer, erase_layer, output_layer):
         """
     logging.debug(f"Entering erase_analysis() with input_layer={input_layer}, erase_layer={erase_layer}, output_layer={output_layer}")
     try:
-        if not arcpy.Exists(input_layer) or not arcpy.Exists(erase_layer):
+        if not CATALOG.exists(input_layer) or not CATALOG.exists(erase_layer):
             logging.error("Input or erase layer does not exist. Cannot perform erase.")
             return None
 
-        arcpy.analysis.Erase(in_features=input_layer, erase_features=erase_layer, out_feature_class=output_layer)
+        if config_dict.get('overlay_prefilter'):
+            # Only features near the erase layer go through the overlay; the rest are copied across unchanged
+            touching, untouched, stats = ExtentIndex(config_dict).split_for_erase(input_layer, erase_layer)
+            logging.info(f"Erase prefilter: {stats}")
+            run_chunked("erase", touching, output_layer, lambda chunk, out: arcpy.analysis.Erase(
+                in_features=chunk, erase_features=erase_layer, out_feature_class=out))
+            if untouched:
+                arcpy.management.Append(untouched, output_layer, "NO_TEST")
+        else:
+            run_chunked("erase", input_layer, output_layer, lambda chunk, out: arcpy.analysis.Erase(
+                in_features=chunk, erase_features=erase_layer, out_feature_class=out))
         logging.info(f"Erase operation successful! Output saved as {output_layer}")
 
-        if arcpy.Exists(output_layer):
+        if CATALOG.exists(output_layer):
             logging.info(f"Verified: {output_layer} exists.")
             return output_layer
         else:
@@ -159,6 +424,7 @@ def erase_analysis(input_layer, erase_layer, output_layer):
         logging.debug("Exiting erase_analysis()")
 
 
+@CATALOG.writes()
 def spatial_join(address_layer, intersect_layer):
     """
         Performs a spatial join between the address and intersect layers.
@@ -172,7 +438,7 @@ def spatial_join(address_layer, intersect_layer):
         """
     logging.debug(f"Entering spatial_join() with address_layer={address_layer}, intersect_layer={intersect_layer}")
     try:
-        if not intersect_layer or not arcpy.Exists(intersect_layer):
+        if not intersect_layer or not CATALOG.exists(intersect_layer):
             logging.error(f"No valid intersect layer provided ({intersect_layer}). Skipping spatial join.")
             return None
 
@@ -187,7 +453,7 @@ def spatial_join(address_layer, intersect_layer):
 
         logging.info(f"Spatial join successful! Output saved as {output_joined_layer}")
 
-        if arcpy.Exists(output_joined_layer):
+        if CATALOG.exists(output_joined_layer):
             logging.info(f"Verified: {output_joined_layer} exists.")
             return output_joined_layer
         else:
@@ -201,46 +467,70 @@ def spatial_join(address_layer, intersect_layer):
         logging.debug("Exiting spatial_join()")
 
 
-def spatial_join_and_filter(address_layer, analysis_layer, output_layer):
+@REGISTRY.timed("join")
+@MEMORY.tracked("join")
+@CATALOG.writes("output_layer")
+def spatial_join_and_filter(address_layer, analysis_layer, output_layer, pushdown=False):
     """
         Performs a spatial join between address and analysis layers, adds the result to the map,
         and applies a definition query to filter for relevant records.
 
+        With pushdown, candidate addresses are first selected through the analysis layer's spatial index
+        and only matching addresses are written, so no definition query is needed and the output size
+        follows the number of targeted addresses rather than the whole city.
+
         Args:
             address_layer (str): The name of the address feature layer.
             analysis_layer (str): The name of the analysis feature layer.
             output_layer (str): The name of the resulting joined output feature class.
+            pushdown (bool): Only join and write addresses that fall in the analysis layer.
 
         Returns:
             str: The name of the output layer, or None if an error occurs.
         """
-    logging.debug(f"Entering spatial_join_and_filter() with address_layer={address_layer}, analysis_layer={analysis_layer}, output_layer={output_layer}")
+    logging.debug(f"Entering spatial_join_and_filter() with address_layer={address_layer}, analysis_layer={analysis_layer}, output_layer={output_layer}, pushdown={pushdown}")
     try:
-        if not arcpy.Exists(address_layer) or not arcpy.Exists(analysis_layer):
+        if not CATALOG.exists(address_layer) or not CATALOG.exists(analysis_layer):
             logging.error(f"One or both layers don't exist: {address_layer}, {analysis_layer}")
             return None
 
-        arcpy.analysis.SpatialJoin(
-            target_features=address_layer,
-            join_features=analysis_layer,
-            out_feature_class=output_layer,
-            join_operation="JOIN_ONE_TO_ONE",
-            join_type="KEEP_ALL"
-        )
+        if config_dict.get('overlay_prefilter'):
+            analysis_layer, stats = ExtentIndex(config_dict).prefilter_join(address_layer, analysis_layer)
+            logging.info(f"Join prefilter: {stats}")
+
+        def join(targets, out):
+            if pushdown:
+                targets = arcpy.management.MakeFeatureLayer(targets, f"{address_layer}_candidates")
+                arcpy.management.SelectLayerByLocation(targets, "INTERSECT", analysis_layer)
+                logging.info(f"Pushdown selected {arcpy.management.GetCount(targets)} candidate addresses")
+
+            arcpy.analysis.SpatialJoin(
+                target_features=targets,
+                join_features=analysis_layer,
+                out_feature_class=out,
+                join_operation="JOIN_ONE_TO_ONE",
+                join_type="KEEP_COMMON" if pushdown else "KEEP_ALL"
+            )
+
+            if pushdown:
+                arcpy.management.Delete(targets)
+
+        # Over the memory budget, the addresses are joined in chunks
+        run_chunked("join", address_layer, output_layer, join)
         logging.info(f"Spatial Join completed. Output: {output_layer}")
 
-        proj_path = r"C:\Users\Spencer\Desktop\FRCCSpring2025\ProgrammingGIS\Labs\Lab1\WestNileOutbreak"
-        aprx = arcpy.mp.ArcGISProject(rf"{proj_path}\WestNileOutbreak.aprx")
+        aprx = open_project()
         map_doc = aprx.listMaps()[0]
 
         full_output_path = f"{arcpy.env.workspace}\\{output_layer}"
         map_doc.addDataFromPath(full_output_path)
 
-        for lyr in map_doc.listLayers():
-            if lyr.name == output_layer:
-                lyr.definitionQuery = "Join_Count = 1"
-                logging.info(f"Definition query applied to {output_layer}: Join_Count = 1")
-                break
+        if not pushdown:
+            for lyr in map_doc.listLayers():
+                if lyr.name == output_layer:
+                    lyr.definitionQuery = "Join_Count = 1"
+                    logging.info(f"Definition query applied to {output_layer}: Join_Count = 1")
+                    break
 
         aprx.save()
         return output_layer
@@ -252,6 +542,185 @@ def spatial_join_and_filter(address_layer, analysis_layer, output_layer):
         logging.debug("Exiting spatial_join_and_filter()")
 
 
+@REGISTRY.timed("raster_analysis")
+@CATALOG.writes("output_layer", "erased_layer")
+def raster_analysis(address_layer, buff_dist, output_layer, erased_layer=None):
+    """
+        Runs buffer, intersect and erase on a raster grid instead of as vector overlays.
+
+        Intended for screening-level runs: the result is approximate, within the error bound that is logged.
+        Addresses get a Join_Count of 1 when they fall inside the erased intersect, matching spatial_join_and_filter().
+
+        Args:
+            address_layer (str): The name of the address feature layer.
+            buff_dist (float): The buffer distance in map units.
+            output_layer (str): The name of the resulting address feature class.
+            erased_layer (str): Optional name for a vectorized copy of the erased intersect.
+
+        Returns:
+            str: The name of the output layer, or None if an error occurs.
+        """
+    logging.debug(f"Entering raster_analysis() with address_layer={address_layer}, buff_dist={buff_dist}")
+    try:
+        extent = CATALOG.extent(address_layer)
+        engine = RasterEngine(
+            (extent.XMin - buff_dist, extent.YMin - buff_dist, extent.XMax + buff_dist, extent.YMax + buff_dist),
+            config_dict.get('raster_cell_size', 25),
+            CATALOG.spatial_reference(address_layer)
+        )
+        logging.info(f"Raster grid {engine.shape} at {engine.cell_size} map units, error bound {engine.error_bound():.1f} map units")
+
+        intersect_layers = config_dict.get('intersect_layers', DEFAULT_INTERSECT_LAYERS)
+        overlap = engine.buffer(engine.rasterize_layer(intersect_layers[0]), buff_dist)
+        for layer in intersect_layers[1:]:
+            overlap = engine.intersect(overlap, engine.buffer(engine.rasterize_layer(layer), buff_dist))
+        avoid = engine.buffer(engine.rasterize_layer("avoid_points"), buff_dist)
+        erased = engine.erase(overlap, avoid)
+
+        xy = arcpy.da.FeatureClassToNumPyArray(address_layer, ["OID@", "SHAPE@X", "SHAPE@Y"], null_value=np.nan)
+        targeted = engine.lookup(np.column_stack([xy["SHAPE@X"], xy["SHAPE@Y"]]), erased)
+        join_counts = dict(zip(xy["OID@"].tolist(), targeted.astype(int).tolist()))
+
+        # Copied row by row rather than with CopyFeatures, which renumbers object ids: TARGET_FID keeps the
+        # source address id, as in a spatial join, so the change feed sees the same ids in every analysis mode
+        arcpy.management.CreateFeatureclass(arcpy.env.workspace, output_layer, "POINT", template=address_layer,
+                                            spatial_reference=CATALOG.spatial_reference(address_layer))
+        arcpy.management.AddField(output_layer, "Join_Count", "LONG")
+        arcpy.management.AddField(output_layer, "TARGET_FID", "LONG")
+        fields = [f.name for f in arcpy.ListFields(address_layer) if f.editable and f.type not in ("OID", "Geometry")]
+        with arcpy.da.SearchCursor(address_layer, ["OID@", "SHAPE@"] + fields) as source, \
+                arcpy.da.InsertCursor(output_layer, ["TARGET_FID", "Join_Count", "SHAPE@"] + fields) as cursor:
+            for row in source:
+                cursor.insertRow([row[0], join_counts.get(row[0], 0)] + list(row[1:]))
+        logging.info(f"Raster analysis targeted {int(targeted.sum())} of {len(targeted)} addresses. Output: {output_layer}")
+
+        if erased_layer:
+            engine.to_feature_class(erased, erased_layer)
+            logging.info(f"Vectorized raster erase result as {erased_layer}")
+
+        return output_layer
+
+    except Exception as e:
+        logging.error(f"Error in raster_analysis(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting raster_analysis()")
+
+
+@REGISTRY.timed("incremental_erase")
+@CATALOG.writes("buffer_layer", "erased_layer", "target_layer")
+def incremental_erase(avoid_layer, buffer_layer, erased_layer, target_layer, buff_dist):
+    """
+        Updates the avoid point buffers, the erase result and the targeted addresses for avoid points
+        added or removed since the last run.
+
+        Only the regions around the changed avoid points are recomputed, so the cost follows the size of the change.
+
+        Args:
+            avoid_layer (str): The name of the avoid point feature class.
+            buffer_layer (str): The avoid point buffers of the last run, patched in place.
+            erased_layer (str): The erase output of the last run, patched in place.
+            target_layer (str): The joined address output of the last run, patched in place.
+            buff_dist (float): The avoid point buffer distance in map units.
+
+        Returns:
+            bool: True if the outputs were updated, False if a full run is needed.
+        """
+    logging.debug(f"Entering incremental_erase() with avoid_layer={avoid_layer}, erased_layer={erased_layer}")
+    try:
+        if config_dict.get('join_pushdown'):
+            # A pushed-down join only holds targeted addresses, so newly targeted ones could not be patched in
+            logging.info("Incremental erase is not available with join_pushdown, running the full analysis")
+            return False
+
+        updated = IncrementalErase(config_dict, buff_dist).update(avoid_layer, buffer_layer, erased_layer, target_layer)
+        if updated:
+            logging.info(f"Incrementally updated {buffer_layer}, {erased_layer} and {target_layer}")
+        else:
+            logging.info("No usable erase snapshot, running the full analysis")
+        return updated
+    except Exception as e:
+        logging.error(f"Error in incremental_erase(): {e}")
+        return False
+    finally:
+        logging.debug("Exiting incremental_erase()")
+
+
+def save_erase_snapshot(avoid_layer, intersect_layer, buff_dist):
+    """
+        Records the avoid points and intersect layer of a full run for later incremental updates.
+
+        Args:
+            avoid_layer (str): The name of the avoid point feature class.
+            intersect_layer (str): The intersect layer the erase was run on.
+            buff_dist (float): The avoid point buffer distance in map units.
+
+        Returns:
+            None
+        """
+    logging.debug("Entering save_erase_snapshot()")
+    try:
+        IncrementalErase(config_dict, buff_dist).save_snapshot(avoid_layer, intersect_layer)
+        logging.info(f"Saved erase snapshot for {intersect_layer}")
+    except Exception as e:
+        logging.error(f"Error in save_erase_snapshot(): {e}")
+    finally:
+        logging.debug("Exiting save_erase_snapshot()")
+
+
+def publish_change_feed(target_layer, where_clause="Join_Count = 1"):
+    """
+        Writes the addresses newly targeted or released since the previous run to the change feed.
+
+        Args:
+            target_layer (str): The name of the joined address layer.
+            where_clause (str): Filter selecting the targeted addresses, or None if every address is targeted.
+
+        Returns:
+            str: The path of the change file, or None if an error occurs.
+        """
+    logging.debug(f"Entering publish_change_feed() with target_layer={target_layer}")
+    try:
+        if not CATALOG.exists(target_layer):
+            logging.error(f"{target_layer} does not exist. Cannot publish change feed.")
+            return None
+
+        change_path = ChangeFeed(config_dict).publish(target_layer, where_clause)
+        logging.info(f"Change feed written to {change_path}")
+        return change_path
+    except Exception as e:
+        logging.error(f"Error in publish_change_feed(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting publish_change_feed()")
+
+
+def record_metrics(layers):
+    """
+        Records the feature count of each layer and writes the run's metrics in Prometheus text format.
+
+        Args:
+            layers (list): The layer names to report feature counts for.
+
+        Returns:
+            None
+        """
+    logging.debug("Entering record_metrics()")
+    try:
+        feature_count = REGISTRY.gauge("wnv_layer_feature_count", "Number of features in each pipeline layer.")
+        for layer_name in layers:
+            if CATALOG.exists(layer_name):
+                feature_count.set(CATALOG.count(layer_name), layer=layer_name)
+
+        metrics_path = f"{config_dict.get('proj_dir')}{config_dict.get('metrics_file', 'wnv_metrics.prom')}"
+        REGISTRY.write_textfile(metrics_path)
+        logging.info(f"Metrics written to {metrics_path}")
+    except Exception as e:
+        logging.error(f"Error in record_metrics(): {e}")
+    finally:
+        logging.debug("Exiting record_metrics()")
+
+
 def add_layer_to_map(layer_name):
     """
        Adds a specified feature layer to the current ArcGIS Pro map document.
@@ -264,15 +733,19 @@ def add_layer_to_map(layer_name):
        """
     logging.debug(f"Entering add_layer_to_map() with layer_name={layer_name}")
     try:
-        proj_path = r"C:\Users\Spencer\Desktop\FRCCSpring2025\ProgrammingGIS\Labs\Lab1\WestNileOutbreak"
-        aprx = arcpy.mp.ArcGISProject(rf"{proj_path}\WestNileOutbreak.aprx")
+        aprx = open_project()
         map_doc = aprx.listMaps()[0]
         full_layer_path = f"{arcpy.env.workspace}\\{layer_name}"
 
-        if not arcpy.Exists(full_layer_path):
+        if not CATALOG.exists(full_layer_path):
             logging.error(f"{full_layer_path} does not exist, skipping.")
             return
 
+        # Repeated runs in the same project update the existing layer instead of stacking copies
+        if any(lyr.name == layer_name for lyr in map_doc.listLayers()):
+            logging.info(f"{layer_name} is already in the map, skipping.")
+            return
+
         map_doc.addDataFromPath(full_layer_path)
         aprx.save()
         logging.info(f"Successfully added {layer_name} to the ArcGIS Pro map!")
@@ -283,6 +756,37 @@ def add_layer_to_map(layer_name):
         logging.debug("Exiting add_layer_to_map()")
 
 
+def apply_definition_query(layer_name, query):
+    """
+      Applies a definition query to a feature layer in the map.
+
+      Args:
+          layer_name (str): The name of the feature layer to filter.
+          query (str): The definition query, e.g. "Join_Count = 1".
+
+      Returns:
+          None
+      """
+    logging.debug(f"Entering apply_definition_query() with layer_name={layer_name}, query={query}")
+    try:
+        aprx = open_project()
+        map_doc = aprx.listMaps()[0]
+
+        for lyr in map_doc.listLayers():
+            if lyr.name == layer_name:
+                lyr.definitionQuery = query
+                aprx.save()
+                logging.info(f"Definition query applied to {layer_name}: {query}")
+                return
+
+        logging.error(f"Layer {layer_name} not found in the map.")
+
+    except Exception as e:
+        logging.error(f"Error in apply_definition_query(): {e}")
+    finally:
+        logging.debug("Exiting apply_definition_query()")
+
+
 def apply_simple_renderer(layer_name):
     """
       Applies a simple renderer with a custom symbology to a feature layer in the map.
@@ -295,8 +799,7 @@ def apply_simple_renderer(layer_name):
       """
     logging.debug(f"Entering apply_simple_renderer() with layer_name={layer_name}")
     try:
-        proj_path = r"C:\Users\Spencer\Desktop\FRCCSpring2025\ProgrammingGIS\Labs\Lab1\WestNileOutbreak"
-        aprx = arcpy.mp.ArcGISProject(rf"{proj_path}\WestNileOutbreak.aprx")
+        aprx = open_project()
         map_doc = aprx.listMaps()[0]
 
         target_layer = None
@@ -326,21 +829,26 @@ def apply_simple_renderer(layer_name):
         logging.debug("Exiting apply_simple_renderer()")
 
 
-def exportMap():
+@REGISTRY.timed("export_map")
+def exportMap(subtitle=None):
     """
         Exports the current ArcGIS Pro map layout to a PDF file with a user-provided subtitle.
 
         Prompts the user for a subtitle, updates the layout title, and exports the map as a PDF.
 
+        Args:
+            subtitle (str): The subtitle to use instead of prompting, e.g. when running unattended.
+
         Returns:
             None
         """
     logging.debug("Entering exportMap()")
     try:
-        aprx = arcpy.mp.ArcGISProject(f"{config_dict.get('proj_dir')}WestNileOutbreak.aprx")
+        aprx = open_project()
         lyt = aprx.listLayouts()[0]
 
-        subtitle = input("Enter the subtitle for the map: ").strip()
+        if subtitle is None:
+            subtitle = input("Enter the subtitle for the map: ").strip()
         for el in lyt.listElements():
             if "Title" in el.name:
                 el.text = el.text + f" {subtitle}"
@@ -355,22 +863,98 @@ def exportMap():
         logging.debug("Exiting exportMap()")
 
 
-if __name__ == '__main__':
-    logging.debug("Entering main script block")
-    config_dict = setup()
-    if config_dict:
-        logging.info("Starting West Nile Virus Simulation")
-        logging.info(config_dict)
+@REGISTRY.timed("export_vector_tiles")
+def export_vector_tiles(layers):
+    """
+        Exports analysis outputs as a vector tile pyramid (MBTiles) that field crews can pan and zoom.
+
+        Layers whose content has not changed since the last export reuse their existing tiles.
+
+        Args:
+            layers (dict): Layer name -> optional where clause used to filter the exported features.
+
+        Returns:
+            str: The path of the MBTiles file, or None if an error occurs.
+        """
+    logging.debug(f"Entering export_vector_tiles() with layers={list(layers)}")
+    try:
+        existing_layers = {name: where for name, where in layers.items() if CATALOG.exists(name)}
+        mbtiles_path = VectorTileExporter(config_dict).export(existing_layers)
+        logging.info(f"Vector tiles exported successfully as {mbtiles_path}")
+        return mbtiles_path
+    except Exception as e:
+        logging.error(f"Error in export_vector_tiles(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting export_vector_tiles()")
 
-        etl()
 
-        buffer_layer_list = ["Mosquito_Larval_Sites", "Wetlands", "Lakes_and_Reservoirs", "OSMP_Properties"]
+@REGISTRY.timed("export_flatgeobuf")
+def export_flatgeobuf(layers):
+    """
+        Exports analysis outputs as FlatGeobuf files with a spatial index, for clients that read by bounding box.
+
+        Args:
+            layers (dict): Layer name -> optional where clause used to filter the exported features.
+
+        Returns:
+            list: The paths of the FlatGeobuf files, or None if an error occurs.
+        """
+    logging.debug(f"Entering export_flatgeobuf() with layers={list(layers)}")
+    try:
+        existing_layers = {name: where for name, where in layers.items() if CATALOG.exists(name)}
+        paths = FlatGeobufExporter(config_dict).export(existing_layers)
+        logging.info(f"FlatGeobuf files exported successfully: {paths}")
+        return paths
+    except Exception as e:
+        logging.error(f"Error in export_flatgeobuf(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting export_flatgeobuf()")
+
+
+def run_pipeline(etl_instance=None, subtitle=None):
+    """
+        Runs the ETL, the analysis and every export once, using the global config_dict.
+
+        Args:
+            etl_instance (GSheetsEtl): An ETL instance to reuse, or None to create a new one.
+            subtitle (str): The map subtitle, or None to prompt for it.
+
+        Returns:
+            None
+        """
+    logging.debug("Entering run_pipeline()")
+    etl(etl_instance)
+
+    address_layer = config_dict.get('address_layer', 'Addresses')
+    buffer_layer_list = config_dict.get('buffer_layers', DEFAULT_BUFFER_LAYERS)
+    buff_map_units = feet_to_map_units(1500, address_layer)
+    # A pushed-down join only writes targeted addresses, so its output needs no filter
+    pushdown = bool(config_dict.get('join_pushdown')) and config_dict.get('analysis_mode') != 'raster'
+    target_filter = None if pushdown else "Join_Count = 1"
+
+    if config_dict.get('analysis_mode') == 'raster':
+        erased_name = "erased_intersect" if config_dict.get('raster_vectorize') else None
+        if raster_analysis(address_layer, buff_map_units, "target_addresses", erased_name):
+            if erased_name:
+                add_layer_to_map(erased_name)
+                apply_simple_renderer(erased_name)
+            add_layer_to_map("target_addresses")
+            apply_definition_query("target_addresses", "Join_Count = 1")
+    elif not (config_dict.get('incremental_erase')
+              and incremental_erase("avoid_points", "buf_avoid_points", "erased_intersect",
+                                    "target_addresses", buff_map_units)):
+        sources = simplify_inputs(buffer_layer_list, buff_map_units) if config_dict.get('simplify_inputs') else {}
         for layer in buffer_layer_list:
-            buffer(layer, "1500 feet")
+            buffer(sources.get(layer, layer), "1500 feet", f"buf_{layer}")
 
         buffer("avoid_points", "1500 feet")
 
-        intersect_layer = intersect()
+        if config_dict.get('overlay_mode') == 'nway':
+            intersect_layer = overlay(config_dict.get('intersect_output'))
+        else:
+            intersect_layer = intersect(config_dict.get('intersect_output'))
         if intersect_layer:
             add_layer_to_map(intersect_layer)
 
@@ -379,13 +963,39 @@ if __name__ == '__main__':
                 add_layer_to_map(erased_layer)
                 apply_simple_renderer("erased_intersect")
 
-                target_layer = spatial_join_and_filter("Addresses", erased_layer, "target_addresses")
+                save_erase_snapshot("avoid_points", intersect_layer, buff_map_units)
+
+                target_layer = spatial_join_and_filter(address_layer, erased_layer, "target_addresses", pushdown=pushdown)
                 if target_layer:
                     add_layer_to_map(target_layer)
 
-        exportMap()
+    publish_change_feed("target_addresses", target_filter)
 
-    logging.debug("Exiting main script block")
+    exportMap(subtitle)
 
+    buffer_outputs = [f"buf_{layer}" for layer in buffer_layer_list + ["avoid_points"]]
+    export_vector_tiles({
+        "erased_intersect": None,
+        "target_addresses": target_filter,
+        **{layer: None for layer in buffer_outputs},
+    })
+    export_flatgeobuf({"erased_intersect": None, "target_addresses": target_filter})
 
+    record_metrics(["avoid_points", address_layer] + buffer_outputs + ["erased_intersect", "target_addresses"])
+    logging.debug("Exiting run_pipeline()")
 
+
+if __name__ == '__main__':
+    logging.debug("Entering main script block")
+    config_dict = setup()
+    if config_dict:
+        logging.info("Starting West Nile Virus Simulation")
+        logging.info(config_dict)
+
+        if config_dict.get('metrics_port'):
+            REGISTRY.serve(config_dict.get('metrics_port'))
+            logging.info(f"Serving metrics on http://127.0.0.1:{config_dict.get('metrics_port')}/metrics")
+
+        run_pipeline()
+
+    logging.debug("Exiting main script block")
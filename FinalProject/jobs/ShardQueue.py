@@ -0,0 +1,176 @@
+from contextlib import closing
+import os
+import socket
+import sqlite3
+import time
+
+
+class ShardQueue:
+    """
+    File-based work queue for region shards, backed by a SQLite database.
+
+    Shards are published once, claimed by any number of worker processes (on one or more
+    machines sharing the project directory) and marked complete when their output exists.
+    A claim is a lease: if a worker crashes, its shard becomes claimable again once the
+    lease expires, so a restart only picks up the unfinished work.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, db_path, lease_seconds=1800, max_attempts=3):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            db_path (str): Path to the SQLite queue file.
+            lease_seconds (int): How long a claim is held before another worker may take it over.
+            max_attempts (int): Number of claims allowed before a shard is marked failed.
+        """
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        with closing(self._connect()) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS shards (
+                    shard_id TEXT PRIMARY KEY,
+                    xmin REAL, ymin REAL, xmax REAL, ymax REAL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    output TEXT,
+                    error TEXT
+                )
+                """
+            )
+
+    def _connect(self):
+        # isolation_level=None lets us issue BEGIN IMMEDIATE ourselves so claims are atomic
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def publish(self, shards):
+        """
+        Add shards to the queue. Shards that are already known keep their current status,
+        so publishing again after a crash does not reset completed work.
+
+        Args:
+            shards (list): (shard_id, xmin, ymin, xmax, ymax) tuples.
+
+        Returns:
+            int: The number of newly published shards.
+        """
+        with closing(self._connect()) as conn:
+            before = conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO shards (shard_id, xmin, ymin, xmax, ymax, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(*shard, self.PENDING) for shard in shards]
+            )
+            after = conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+        return after - before
+
+    def claim(self):
+        """
+        Claim the next pending shard, or a running shard whose lease has expired.
+
+        Returns:
+            sqlite3.Row: The claimed shard, or None if there is no work left to claim.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM shards WHERE (status = ? OR (status = ? AND lease_expires < ?)) "
+                "ORDER BY shard_id LIMIT 1",
+                (self.PENDING, self.RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            if row["attempts"] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE shards SET status = ?, error = ? WHERE shard_id = ?",
+                    (self.FAILED, "Lease expired too many times", row["shard_id"])
+                )
+                conn.execute("COMMIT")
+                return self.claim()
+
+            conn.execute(
+                "UPDATE shards SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE shard_id = ?",
+                (self.RUNNING, self.worker_id, now + self.lease_seconds, row["shard_id"])
+            )
+            conn.execute("COMMIT")
+            return row
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def complete(self, shard_id, output):
+        """
+        Record a shard as done.
+
+        Args:
+            shard_id (str): The shard that finished.
+            output (str): The name of the feature class the shard produced.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE shards SET status = ?, output = ?, lease_expires = NULL, error = NULL WHERE shard_id = ?",
+                (self.DONE, output, shard_id)
+            )
+
+    def fail(self, shard_id, error):
+        """
+        Release a shard after an error so it can be retried, or mark it failed once it is out of attempts.
+
+        Args:
+            shard_id (str): The shard that failed.
+            error (str): A short description of the error.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE shards SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "lease_expires = NULL, error = ? WHERE shard_id = ?",
+                (self.max_attempts, self.FAILED, self.PENDING, str(error), shard_id)
+            )
+
+    def status_counts(self):
+        """
+        Returns:
+            dict: Number of shards in each status.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM shards GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def is_finished(self):
+        """
+        Returns:
+            bool: True when every shard is done.
+        """
+        counts = self.status_counts()
+        return bool(counts) and counts.get(self.DONE, 0) == sum(counts.values())
+
+    def completed_outputs(self):
+        """
+        Returns:
+            list: The output feature class of every completed shard, in shard order.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT output FROM shards WHERE status = ? ORDER BY shard_id", (self.DONE,)
+            ).fetchall()
+        return [row[0] for row in rows]
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STREETS = ["Arapahoe", "Baseline", "Broadway", "Canyon", "Folsom", "Iris", "Mapleton", "Pearl",
+           "Spruce", "Table Mesa", "Valmont", "Walnut"]
+SUFFIXES = ["Ave", "Rd", "St", "Blvd", "Dr", "Ct"]
+
+
+class StandInServer:
+    """
+    A local HTTP server standing in for the published Google Sheet and the Census geocoder, for
+    load-testing GSheetsEtl without touching either service.
+
+    - GET /sheet.csv serves a synthetic form export of `rows` responses with an ETag, and answers
+      304 to a matching If-None-Match like the published sheet.
+    - GET /geocoder/locations/onelineaddress?address=... answers in the Census JSON format after a
+      log-normal latency with an occasional slow tail. A configurable fraction of requests fails with
+      503, requests over the rate limit get 429, and a fixed fraction of addresses never matches.
+
+    Matches and non-matches are derived from a hash of the address, so repeated requests for the same
+    address agree. Latency and errors are drawn from a seeded generator.
+    """
+
+    def __init__(self, rows=1000, latency_ms=5.0, latency_sigma=0.5, slow_rate=0.01, slow_ms=500.0,
+                 error_rate=0.01, unmatched_rate=0.02, rate_limit=0.0, seed=0):
+        """
+        Parameters:
+        - rows (int): Responses in the synthetic sheet.
+        - latency_ms (float): Median geocoder latency in milliseconds.
+        - latency_sigma (float): Spread of the log-normal latency; 0 for a constant latency.
+        - slow_rate (float): Fraction of requests that take slow_ms extra, e.g. a stalled backend.
+        - slow_ms (float): Extra latency of a slow request in milliseconds.
+        - error_rate (float): Fraction of requests answered with 503.
+        - unmatched_rate (float): Fraction of addresses the geocoder has no match for.
+        - rate_limit (float): Requests per second allowed before answering 429; 0 for no limit.
+        - seed (int): Seed of the latency and error draws.
+        """
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.unmatched_rate = unmatched_rate
+        self.rate_limit = rate_limit
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = float(rate_limit)
+        self._refilled = time.monotonic()
+        self._server = None
+        self.outcomes = Counter()
+        self.set_rows(rows)
+
+    @staticmethod
+    def address(i):
+        """The street address of synthetic response i."""
+        return f"{100 + i % 9900} {STREETS[i // 9900 % len(STREETS)]} {SUFFIXES[i // (9900 * len(STREETS)) % len(SUFFIXES)]}"
+
+    def set_rows(self, rows):
+        """
+        Regenerate the sheet with a number of responses. Timestamps keep every response unique.
+        """
+        lines = ["Timestamp,Street Address"]
+        for i in range(rows):
+            minutes, seconds = divmod(i, 60)
+            hours, minutes = divmod(minutes, 60)
+            days, hours = divmod(hours, 24)
+            lines.append(f"5/{1 + days % 28}/2025 {hours}:{minutes:02d}:{seconds:02d},{self.address(i)}")
+        body = ("\r\n".join(lines) + "\r\n").encode("utf-8")
+        with self._lock:
+            self.sheet = body
+            self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+
+    def _fraction(self, address, salt):
+        digest = hashlib.sha1(f"{salt}:{address}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def _limited(self):
+        """Token bucket allowing rate_limit requests per second with a one-second burst."""
+        if not self.rate_limit:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._refilled) * self.rate_limit)
+            self._refilled = now
+            if self._tokens < 1:
+                return True
+            self._tokens -= 1
+            return False
+
+    def geocode(self, address):
+        """
+        Returns:
+            tuple: (HTTP status, JSON body) for a onelineaddress request.
+        """
+        if self._limited():
+            return 429, {"errors": ["Too many requests"]}
+        with self._lock:
+            latency = self.latency_ms * math.exp(self.latency_sigma * self._random.gauss(0, 1))
+            if self._random.random() < self.slow_rate:
+                latency += self.slow_ms
+            failed = self._random.random() < self.error_rate
+        time.sleep(latency / 1000)
+        if failed:
+            return 503, {"errors": ["Service unavailable"]}
+
+        result = {"input": {"address": {"address": address}, "benchmark": {"benchmarkName": "Public_AR_Census2020"}},
+                  "addressMatches": []}
+        if self._fraction(address, "match") >= self.unmatched_rate:
+            result["addressMatches"].append({
+                "matchedAddress": address.upper(),
+                "coordinates": {"x": -105.32 + 0.1 * self._fraction(address, "x"),
+                                "y": 39.96 + 0.1 * self._fraction(address, "y")},
+            })
+        return 200, {"result": result}
+
+    def start(self, port=0, host="127.0.0.1"):
+        """
+        Serve from a background thread.
+
+        Parameters:
+        - port (int): The port to listen on; 0 picks a free one.
+        - host (str): The interface to bind.
+
+        Returns:
+            str: The base URL of the server.
+        """
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/sheet.csv":
+                    self.send_sheet()
+                elif url.path == "/geocoder/locations/onelineaddress":
+                    address = parse_qs(url.query).get("address", [""])[0]
+                    status, body = stand_in.geocode(address)
+                    stand_in.count({200: "unmatched" if not body.get("result", {}).get("addressMatches")
+                                    else "matched", 429: "limited", 503: "error"}[status])
+                    self.send_body(status, json.dumps(body).encode("utf-8"), "application/json")
+                else:
+                    self.send_error(404)
+
+            def send_sheet(self):
+                with stand_in._lock:
+                    body, etag = stand_in.sheet, stand_in.etag
+                stand_in.count("sheet")
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_body(200, body, "text/csv; charset=utf-8", {"ETag": etag})
+
+            def send_body(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def count(self, outcome):
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Requests served so far by outcome: sheet, matched, unmatched, error, limited.
+        """
+        with self._lock:
+            return dict(self.outcomes)
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
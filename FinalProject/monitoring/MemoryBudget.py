@@ -0,0 +1,139 @@
+import functools
+import logging
+import threading
+from contextlib import contextmanager
+
+import psutil
+
+from monitoring.MetricsRegistry import REGISTRY
+
+
+class MemoryBudget:
+    """
+    A process memory budget that pipeline stages size their work against.
+
+    Stages decorated with tracked() report their peak resident memory. Before loading a working set,
+    a stage asks chunk_size() how many items it may process at once: None when everything fits in the
+    headroom left under the budget, otherwise a chunk size, and the stage switches to chunked execution.
+
+    The working set is estimated from a per-item cost for each stage. The costs start at rough
+    defaults and are raised to what tracked stages actually use, so a long-lived process (the daemon)
+    sizes later runs on measured costs. Estimates only ever grow, which keeps chunking conservative.
+    """
+
+    # Starting estimates of resident bytes per item: form rows, points, joined addresses, overlay polygons
+    DEFAULT_ITEM_BYTES = {"transform": 2048, "load": 1024, "join": 4096, "intersect": 32768, "erase": 32768}
+    # Share of the headroom a chunk may fill, leaving room for the tool's own overhead
+    SAFETY = 0.8
+
+    def __init__(self, budget_mb=0, min_chunk=1000, interval=0.05):
+        """
+        Parameters:
+        - budget_mb (float): The budget in MiB; 0 for no budget.
+        - min_chunk (int): Smallest chunk handed out, so a process already over budget still makes progress.
+        - interval (float): Seconds between memory samples of a tracked stage.
+        """
+        self.budget = int(budget_mb * 2 ** 20)
+        self.min_chunk = min_chunk
+        self.interval = interval
+        self.item_bytes = dict(self.DEFAULT_ITEM_BYTES)
+        self._items = {}
+        self._lock = threading.Lock()
+        self._process = psutil.Process()
+        self._peak = REGISTRY.gauge("wnv_stage_peak_memory_bytes", "Peak resident memory during each pipeline stage.")
+        self._growth = REGISTRY.gauge("wnv_stage_memory_growth_bytes", "Resident memory added by each pipeline stage.")
+        self._chunks = REGISTRY.counter("wnv_stage_chunked_runs_total", "Stage runs switched to chunked execution.")
+
+    def configure(self, config_dict):
+        """
+        Parameters:
+        - config_dict (dict): Project configuration. Uses the optional 'memory_budget_mb' and 'memory_min_chunk' keys.
+        """
+        self.budget = int((config_dict.get('memory_budget_mb') or 0) * 2 ** 20)
+        self.min_chunk = config_dict.get('memory_min_chunk', self.min_chunk)
+
+    def rss(self):
+        """
+        Returns:
+            int: The resident memory of the process in bytes.
+        """
+        return self._process.memory_info().rss
+
+    def chunk_size(self, stage, items):
+        """
+        Decide whether a stage's working set fits in the budget.
+
+        Parameters:
+        - stage (str): The stage, one of DEFAULT_ITEM_BYTES.
+        - items (int): Items the stage would otherwise load at once.
+
+        Returns:
+            int: Items to process per chunk, or None to process everything at once.
+        """
+        with self._lock:
+            item_bytes = self.item_bytes.get(stage, max(self.DEFAULT_ITEM_BYTES.values()))
+        chunk = None
+        if self.budget and items:
+            headroom = self.SAFETY * (self.budget - self.rss())
+            if items * item_bytes > headroom:
+                chunk = max(self.min_chunk, int(headroom // item_bytes))
+                chunk = chunk if chunk < items else None
+        with self._lock:
+            self._items[stage] = chunk or items
+        if chunk:
+            self._chunks.inc(stage=stage)
+            logging.info(f"{stage}: {items} items need ~{items * item_bytes / 2 ** 20:.0f} MiB, "
+                         f"over the memory budget; running in chunks of {chunk}")
+        return chunk
+
+    @contextmanager
+    def track(self, stage):
+        """
+        Sample resident memory while the block runs and record the stage's peak and growth.
+        """
+        start = self.rss()
+        peak = [start]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(self.interval):
+                peak[0] = max(peak[0], self.rss())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            yield
+        finally:
+            done.set()
+            sampler.join()
+            peak[0] = max(peak[0], self.rss())
+            growth = peak[0] - start
+            self._peak.set(peak[0], stage=stage)
+            self._growth.set(growth, stage=stage)
+            with self._lock:
+                items = self._items.pop(stage, None)
+                if items and stage in self.item_bytes:
+                    self.item_bytes[stage] = max(self.item_bytes[stage], growth // items)
+            logging.info(f"{stage}: peak memory {peak[0] / 2 ** 20:.0f} MiB (+{growth / 2 ** 20:.0f} MiB)")
+            if self.budget and peak[0] > self.budget:
+                logging.warning(f"{stage}: peak memory {peak[0] / 2 ** 20:.0f} MiB exceeded the "
+                                f"{self.budget / 2 ** 20:.0f} MiB budget")
+
+    def tracked(self, stage):
+        """
+        Decorator recording a stage's peak memory, see track().
+
+        Parameters:
+        - stage (str): The stage label, e.g. "join".
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.track(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+# Shared by every stage in the process; configured from wnvoutbreak.yaml by setup()
+MEMORY = MemoryBudget()
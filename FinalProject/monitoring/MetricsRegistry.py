@@ -0,0 +1,245 @@
+import functools
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Metric:
+    """
+    Base class for a named metric with optional labels. Values are kept per label set.
+    """
+
+    metric_type = "untyped"
+
+    def __init__(self, name, help_text, lock):
+        self.name = name
+        self.help_text = help_text
+        self._lock = lock
+        self._values = {}
+
+    @staticmethod
+    def label_key(labels):
+        return tuple(sorted(labels.items()))
+
+    @staticmethod
+    def format_labels(key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def samples(self):
+        """Yield (suffix, label text, value) for every sample of this metric."""
+        for key, value in self._values.items():
+            yield "", self.format_labels(key), value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            for suffix, labels, value in self.samples():
+                lines.append(f"{self.name}{suffix}{labels} {value:g}")
+        return lines
+
+
+class Counter(Metric):
+    """A value that only goes up, e.g. rows geocoded."""
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        with self._lock:
+            key = self.label_key(labels)
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self.label_key(labels), 0)
+
+
+class Gauge(Metric):
+    """A value that can go up and down, e.g. the feature count of a layer."""
+
+    metric_type = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self.label_key(labels)] = value
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, e.g. geocode latency in seconds."""
+
+    metric_type = "histogram"
+
+    DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+    def __init__(self, name, help_text, lock, buckets=None):
+        super().__init__(name, help_text, lock)
+        self.buckets = tuple(sorted(buckets or self.DEFAULT_BUCKETS))
+
+    def observe(self, value, **labels):
+        with self._lock:
+            key = self.label_key(labels)
+            state = self._values.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def snapshot(self, **labels):
+        """
+        Returns:
+            list: The bucket counts followed by the total count, to pass to quantile() as `since`.
+        """
+        with self._lock:
+            state = self._values.get(self.label_key(labels))
+            return list(state["counts"]) + [state["count"]] if state else [0] * (len(self.buckets) + 1)
+
+    def quantile(self, q, since=None, **labels):
+        """
+        Estimate a quantile from the buckets, interpolating linearly within a bucket like PromQL's
+        histogram_quantile().
+
+        Parameters:
+        - q (float): The quantile, e.g. 0.95.
+        - since (list): An earlier snapshot(), to estimate over the observations made after it.
+
+        Returns:
+            float: The estimate, or NaN without observations. Values above the last bucket report its bound.
+        """
+        counts = self.snapshot(**labels)
+        if since is not None:
+            counts = [now - before for now, before in zip(counts, since)]
+        total = counts[-1]
+        if total == 0:
+            return float("nan")
+        rank = q * total
+        lower, below = 0.0, 0
+        for bound, count in zip(self.buckets, counts):
+            if count >= rank:
+                return lower + (bound - lower) * (rank - below) / max(count - below, 1)
+            lower, below = bound, count
+        return self.buckets[-1]
+
+    def samples(self):
+        for key, state in self._values.items():
+            for bound, count in zip(self.buckets, state["counts"]):
+                yield "_bucket", self.format_labels(key, [("le", f"{bound:g}")]), count
+            yield "_bucket", self.format_labels(key, [("le", "+Inf")]), state["count"]
+            yield "_sum", self.format_labels(key), state["sum"]
+            yield "_count", self.format_labels(key), state["count"]
+
+
+class MetricsRegistry:
+    """
+    Registry of the pipeline's counters, gauges and histograms.
+
+    The registry renders the Prometheus text exposition format, which can be written to a file
+    (for the node_exporter textfile collector) or served over a local HTTP endpoint.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._server = None
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text, self._lock, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help_text):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=None):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def timed(self, stage):
+        """
+        Decorator recording how long a pipeline stage takes in the wnv_stage_duration_seconds histogram.
+
+        Parameters:
+        - stage (str): The stage label, e.g. "buffer".
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.histogram("wnv_stage_duration_seconds", "Duration of each pipeline stage in seconds.") \
+                        .observe(time.perf_counter() - start, stage=stage)
+            return wrapper
+        return decorator
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """
+        Write the metrics to a file atomically, so a scraper never reads a half-written file.
+
+        Parameters:
+        - path (str): The .prom file to write.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """
+        Serve the metrics at http://host:port/metrics from a background thread.
+
+        Parameters:
+        - port (int): The port to listen on.
+        - host (str): The interface to bind. Defaults to localhost only.
+        """
+        if self._server is not None:
+            return
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Shared by the ETL and the analysis stages of a run
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,81 @@
+import time
+import logging
+from datetime import datetime
+import finalproject
+from etl.GSheetsEtl import GSheetsEtl
+from monitoring.MetricsRegistry import REGISTRY
+
+
+def poll_once(etl_instance):
+    """
+        Polls the form spreadsheet once and runs the pipeline if new responses appeared.
+
+        Args:
+            etl_instance (GSheetsEtl): The long-lived ETL instance that remembers the last extract.
+
+        Returns:
+            bool: True if the pipeline ran, False if nothing changed or the poll failed.
+        """
+    logging.debug("Entering poll_once()")
+    try:
+        if not etl_instance.poll():
+            logging.debug("No new form responses")
+            return False
+
+        logging.info("New form responses found, running the pipeline")
+        start = time.perf_counter()
+        finalproject.run_pipeline(etl_instance, subtitle=datetime.now().strftime("%Y-%m-%d %H:%M"))
+        REGISTRY.counter("wnv_daemon_runs_total", "Pipeline runs triggered by the daemon.").inc()
+        logging.info(f"Pipeline run finished in {time.perf_counter() - start:.1f}s")
+        return True
+    except Exception as e:
+        logging.error(f"Error in poll_once(): {e}")
+        return False
+    finally:
+        logging.debug("Exiting poll_once()")
+
+
+def run_daemon(config_dict):
+    """
+        Polls the form spreadsheet on a schedule and keeps the process warm between runs.
+
+        arcpy, the configuration, the geocode journal, the CRS transformer and the extent and tile
+        caches are loaded once and reused, so a run only pays for the new responses. Incremental
+        erase is turned on, so after the first full run only the changed avoid points are recomputed.
+
+        Args:
+            config_dict (dict): The project configuration.
+
+        Returns:
+            None
+        """
+    logging.debug("Entering run_daemon()")
+    interval = config_dict.get('daemon_poll_seconds', 60)
+    config_dict['incremental_erase'] = config_dict.get('daemon_incremental', True)
+    # Nobody is there to answer the intersect name prompt
+    config_dict['intersect_output'] = config_dict.get('intersect_output') or "intersect"
+    etl_instance = GSheetsEtl(config_dict)
+
+    logging.info(f"Daemon polling {config_dict.get('remote_url')} every {interval}s")
+    try:
+        while True:
+            started = time.monotonic()
+            poll_once(etl_instance)
+            REGISTRY.gauge("wnv_daemon_last_poll_timestamp_seconds", "Unix time of the daemon's last poll.") \
+                .set(time.time())
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        logging.info("Daemon stopped")
+    finally:
+        REGISTRY.stop()
+        logging.debug("Exiting run_daemon()")
+
+
+if __name__ == '__main__':
+    # Usage: python run_daemon.py
+    config_dict = finalproject.setup()
+    if config_dict:
+        finalproject.config_dict = config_dict
+        if config_dict.get('metrics_port'):
+            REGISTRY.serve(config_dict.get('metrics_port'))
+        run_daemon(config_dict)
@@ -0,0 +1,230 @@
+import sys
+import logging
+import arcpy
+import finalproject
+from jobs.ShardQueue import ShardQueue
+from catalog.WorkspaceCatalog import CATALOG
+
+BUFFER_DISTANCE = "1500 feet"
+
+
+def open_queue(config_dict):
+    """
+        Opens the shard work queue configured in the YAML file.
+
+        Args:
+            config_dict (dict): The project configuration.
+
+        Returns:
+            ShardQueue: The work queue stored in the project directory.
+        """
+    db_path = f"{config_dict.get('proj_dir')}{config_dict.get('job_queue', 'wnv_jobs.sqlite')}"
+    return ShardQueue(db_path, lease_seconds=config_dict.get('job_lease_seconds', 1800))
+
+
+def make_shards(extent, rows, cols):
+    """
+        Splits an extent into a grid of region shards.
+
+        Args:
+            extent (arcpy.Extent): The study area extent.
+            rows (int): Number of shard rows.
+            cols (int): Number of shard columns.
+
+        Returns:
+            list: (shard_id, xmin, ymin, xmax, ymax) tuples.
+        """
+    width = (extent.XMax - extent.XMin) / cols
+    height = (extent.YMax - extent.YMin) / rows
+    shards = []
+    for r in range(rows):
+        for c in range(cols):
+            xmin = extent.XMin + c * width
+            ymin = extent.YMin + r * height
+            shards.append((f"r{r}c{c}", xmin, ymin, xmin + width, ymin + height))
+    return shards
+
+
+def publish(config_dict, queue):
+    """
+        Runs the ETL once and publishes the region shards to the queue.
+
+        Publishing is idempotent, so re-running it after a crash keeps completed shards.
+
+        Args:
+            config_dict (dict): The project configuration.
+            queue (ShardQueue): The work queue.
+
+        Returns:
+            None
+        """
+    logging.debug("Entering publish()")
+    try:
+        if not queue.status_counts():
+            finalproject.etl()
+
+        rows, cols = config_dict.get('job_grid', [2, 2])
+        shards = make_shards(CATALOG.extent(config_dict.get('address_layer', 'Addresses')), rows, cols)
+        added = queue.publish(shards)
+        logging.info(f"Published {added} new shards. Queue status: {queue.status_counts()}")
+    except Exception as e:
+        logging.error(f"Error in publish(): {e}")
+    finally:
+        logging.debug("Exiting publish()")
+
+
+def run_shard(config_dict, shard, margin):
+    """
+        Runs buffer, intersect, erase and join for a single region shard.
+
+        Inputs are limited to the shard extent grown by the margin, so buffers of features
+        just outside the shard are still included. Only addresses inside the shard are joined.
+
+        Args:
+            config_dict (dict): The project configuration.
+            shard (sqlite3.Row): The claimed shard.
+            margin (float): Distance in map units to grow the processing extent by.
+
+        Returns:
+            str: The name of the shard's joined address layer.
+        """
+    sid = shard["shard_id"]
+    logging.debug(f"Entering run_shard() with shard={sid}")
+    addresses = config_dict.get('address_layer', 'Addresses')
+    buffer_layers = config_dict.get('buffer_layers', finalproject.DEFAULT_BUFFER_LAYERS)
+    intersect_layers = config_dict.get('intersect_layers', finalproject.DEFAULT_INTERSECT_LAYERS)
+    try:
+        arcpy.env.extent = arcpy.Extent(
+            shard["xmin"] - margin, shard["ymin"] - margin, shard["xmax"] + margin, shard["ymax"] + margin
+        )
+
+        for layer in buffer_layers + ["avoid_points"]:
+            finalproject.buffer(layer, BUFFER_DISTANCE, f"buf_{layer}_{sid}")
+
+        intersect_layer = finalproject.intersect(f"intersect_{sid}", [f"buf_{layer}_{sid}" for layer in intersect_layers])
+        if not intersect_layer:
+            raise RuntimeError(f"Intersect failed for shard {sid}")
+
+        erased_layer = finalproject.erase_analysis(intersect_layer, f"buf_avoid_points_{sid}", f"erased_{sid}")
+        if not erased_layer:
+            raise RuntimeError(f"Erase failed for shard {sid}")
+
+        shard_polygon = arcpy.Polygon(arcpy.Array([
+            arcpy.Point(shard["xmin"], shard["ymin"]), arcpy.Point(shard["xmin"], shard["ymax"]),
+            arcpy.Point(shard["xmax"], shard["ymax"]), arcpy.Point(shard["xmax"], shard["ymin"])
+        ]), CATALOG.spatial_reference(addresses))
+        address_layer = arcpy.management.MakeFeatureLayer(addresses, f"addresses_{sid}")
+        arcpy.management.SelectLayerByLocation(address_layer, "INTERSECT", shard_polygon)
+
+        output_layer = f"target_addresses_{sid}"
+        arcpy.analysis.SpatialJoin(
+            target_features=address_layer,
+            join_features=erased_layer,
+            out_feature_class=output_layer,
+            join_operation="JOIN_ONE_TO_ONE",
+            join_type="KEEP_ALL"
+        )
+        logging.info(f"Shard {sid} complete. Output: {output_layer}")
+        return output_layer
+    finally:
+        arcpy.env.extent = "MAXOF"
+        logging.debug("Exiting run_shard()")
+
+
+def work(config_dict, queue):
+    """
+        Claims and runs shards until the queue has no more claimable work.
+
+        Any number of workers can run this at once against the same queue.
+
+        Args:
+            config_dict (dict): The project configuration.
+            queue (ShardQueue): The work queue.
+
+        Returns:
+            None
+        """
+    logging.debug("Entering work()")
+    margin = finalproject.feet_to_map_units(config_dict.get('job_margin_feet', 1500),
+                                            config_dict.get('address_layer', 'Addresses'))
+    shard = queue.claim()
+    while shard is not None:
+        try:
+            output_layer = run_shard(config_dict, shard, margin)
+            queue.complete(shard["shard_id"], output_layer)
+        except Exception as e:
+            logging.error(f"Error in work() on shard {shard['shard_id']}: {e}")
+            queue.fail(shard["shard_id"], e)
+        shard = queue.claim()
+    logging.debug("Exiting work()")
+
+
+def merge(queue):
+    """
+        Merges the shard outputs into erased_intersect and target_addresses once every shard is done.
+
+        Args:
+            queue (ShardQueue): The work queue.
+
+        Returns:
+            str: The name of the merged target layer, or None if shards are unfinished or an error occurs.
+        """
+    logging.debug("Entering merge()")
+    try:
+        if not queue.is_finished():
+            logging.error(f"Shards are not finished, cannot merge. Queue status: {queue.status_counts()}")
+            return None
+
+        target_outputs = queue.completed_outputs()
+        erased_outputs = [name.replace("target_addresses_", "erased_", 1) for name in target_outputs]
+
+        # Erase results overlap inside the shard margins, so dissolve them back into one layer
+        arcpy.management.Merge(erased_outputs, "erased_shards")
+        arcpy.management.Dissolve("erased_shards", "erased_intersect", multi_part="SINGLE_PART")
+        arcpy.management.Delete("erased_shards")
+        CATALOG.invalidate("erased_shards", "erased_intersect")
+        finalproject.add_layer_to_map("erased_intersect")
+        finalproject.apply_simple_renderer("erased_intersect")
+
+        # Addresses on a shared shard edge are selected by both neighbours. Deduplicate on the source
+        # address id, not the shape: distinct addresses such as apartment units can share a point.
+        output_layer = "target_addresses"
+        arcpy.management.Merge(target_outputs, output_layer)
+        arcpy.management.DeleteIdentical(output_layer, ["TARGET_FID"])
+        CATALOG.invalidate(output_layer)
+
+        aprx = finalproject.open_project()
+        map_doc = aprx.listMaps()[0]
+        map_doc.addDataFromPath(f"{arcpy.env.workspace}\\{output_layer}")
+        for lyr in map_doc.listLayers():
+            if lyr.name == output_layer:
+                lyr.definitionQuery = "Join_Count = 1"
+                logging.info(f"Definition query applied to {output_layer}: Join_Count = 1")
+                break
+        aprx.save()
+
+        logging.info(f"Merged {len(target_outputs)} shards into {output_layer}")
+        return output_layer
+
+    except Exception as e:
+        logging.error(f"Error in merge(): {e}")
+        return None
+    finally:
+        logging.debug("Exiting merge()")
+
+
+if __name__ == '__main__':
+    # Usage: python run_jobs.py [publish|work|merge|run]
+    mode = sys.argv[1] if len(sys.argv) > 1 else "run"
+    config_dict = finalproject.setup()
+    if config_dict:
+        finalproject.config_dict = config_dict
+        job_queue = open_queue(config_dict)
+
+        if mode in ("publish", "run"):
+            publish(config_dict, job_queue)
+        if mode in ("work", "run"):
+            work(config_dict, job_queue)
+        if mode in ("merge", "run"):
+            if merge(job_queue):
+                finalproject.exportMap()
@@ -0,0 +1,195 @@
+import contextlib
+import json
+import logging
+import os
+import shutil
+import time
+import arcpy
+import finalproject
+from etl.GSheetsEtl import GSheetsEtl
+from etl.GeocodeBudget import GeocodeBudget
+from loadtest.StandInServer import StandInServer
+from monitoring.MetricsRegistry import REGISTRY
+
+# The stand-in answers in milliseconds, finer than the default buckets. Registered before any geocoder
+# asks for the histogram, so the geocoders observe into these buckets.
+LATENCY_BUCKETS = (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30)
+
+
+def loadtest_config(config_dict, base_url, run_dir):
+    """
+        Points a copy of the configuration at the stand-in server and a scratch project directory.
+
+        Args:
+            config_dict (dict): The project configuration.
+            base_url (str): The stand-in server's base URL.
+            run_dir (str): The scratch directory for the run's CSVs and journal.
+
+        Returns:
+            dict: The load-test configuration.
+        """
+    return {
+        **config_dict,
+        'remote_url': f"{base_url}/sheet.csv",
+        'geocoder_prefix_url': f"{base_url}/geocoder/locations/onelineaddress?address=",
+        'geocoder_suffix_url': '&benchmark=2020&format=json',
+        'proj_dir': f"{run_dir}{os.sep}",
+        # Only the stand-in is measured: no shared cache, local table or real fallback services
+        'geocode_cache': None,
+        'local_geocode_table': None,
+        'fallback_geocoders': [],
+    }
+
+
+def measure_pass(etl_instance, server, rows):
+    """
+        Runs GSheetsEtl.process() once and collects throughput, latency and failure counts.
+
+        Args:
+            etl_instance (GSheetsEtl): The ETL instance, reused across passes so its journal carries over.
+            server (StandInServer): The stand-in server.
+            rows (int): Rows in the sheet.
+
+        Returns:
+            dict: The measurements of the pass.
+        """
+    latency = REGISTRY.histogram("wnv_geocode_latency_seconds", "Geocode request latency in seconds.")
+    counters = {
+        "geocoded": REGISTRY.counter("wnv_rows_geocoded_total", "Rows geocoded with a match."),
+        "unmatched": REGISTRY.counter("wnv_rows_unmatched_total", "Rows the geocoder returned no match for."),
+        "errors": REGISTRY.counter("wnv_geocode_errors_total", "Geocode requests that failed."),
+    }
+    journal_hits = REGISTRY.counter("wnv_geocode_cache_hits_total", "Rows served from the geocode journal or the shared cache.")
+    hedges = REGISTRY.counter("wnv_geocode_hedges_total", "Duplicate geocode requests sent for slow responses.")
+
+    before = {name: counter.value() for name, counter in counters.items()}
+    hits_before = journal_hits.value(source="journal")
+    hedges_before = hedges.value(tier="primary")
+    latency_before = latency.snapshot(tier="primary")
+    server_before = server.stats()
+
+    start = time.perf_counter()
+    # Per-row progress prints would dominate at 100k rows
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        etl_instance.process()
+    seconds = time.perf_counter() - start
+
+    server_after = server.stats()
+    result = {name: counter.value() - before[name] for name, counter in counters.items()}
+    result.update({
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds, 1),
+        "journal_hits": journal_hits.value(source="journal") - hits_before,
+        "hedges": hedges.value(tier="primary") - hedges_before,
+        "requests": {outcome: server_after.get(outcome, 0) - server_before.get(outcome, 0)
+                     for outcome in ("matched", "unmatched", "error", "limited")},
+    })
+    for q in (0.5, 0.95, 0.99):
+        result[f"p{round(q * 100)}_ms"] = round(1000 * latency.quantile(q, since=latency_before, tier="primary"), 2)
+    return result
+
+
+def run_size(config_dict, server, base_url, rows):
+    """
+        Load-tests the ETL with one sheet size in a scratch project directory and file geodatabase.
+
+        Rows whose geocode failed are not journaled, so further passes retry only those rows, the
+        way the next scheduled run would. Passes stop once no row fails or 'loadtest_retries' is spent.
+
+        Args:
+            config_dict (dict): The project configuration.
+            server (StandInServer): The stand-in server.
+            base_url (str): The stand-in server's base URL.
+            rows (int): Rows in the synthetic sheet.
+
+        Returns:
+            dict: The sheet size and the measurements of each pass, or None if an error occurs.
+        """
+    logging.debug(f"Entering run_size() with rows={rows}")
+    workspace = arcpy.env.workspace
+    etl_instance = None
+    try:
+        run_dir = os.path.join(config_dict.get('proj_dir'), config_dict.get('loadtest_dir', 'loadtest'), f"rows_{rows}")
+        shutil.rmtree(run_dir, ignore_errors=True)
+        os.makedirs(run_dir)
+        # Loaded points go to a scratch geodatabase, never the project's avoid_points
+        arcpy.management.CreateFileGDB(run_dir, "loadtest.gdb")
+        arcpy.env.workspace = os.path.join(run_dir, "loadtest.gdb")
+
+        server.set_rows(rows)
+        etl_instance = GSheetsEtl(loadtest_config(config_dict, base_url, run_dir))
+        passes = []
+        for _ in range(1 + config_dict.get('loadtest_retries', 2)):
+            passes.append(measure_pass(etl_instance, server, rows))
+            logging.info(f"{rows} rows: {passes[-1]}")
+            if passes[-1]["errors"] == 0:
+                break
+        return {"rows": rows, "journaled": len(etl_instance.journal), "passes": passes}
+    except Exception as e:
+        logging.error(f"Error in run_size(): {e}")
+        return None
+    finally:
+        if etl_instance is not None and etl_instance.geocoder is not None:
+            etl_instance.geocoder.close()
+        arcpy.env.workspace = workspace
+        logging.debug("Exiting run_size()")
+
+
+def run_loadtest(config_dict):
+    """
+        Load-tests GSheetsEtl against a local stand-in for the form sheet and the Census geocoder.
+
+        The stand-in's latency, error rate and rate limit come from the 'loadtest_*' keys. Each size in
+        'loadtest_rows' runs in its own scratch directory, and the results are written to
+        <loadtest_dir>/loadtest_results.json.
+
+        Args:
+            config_dict (dict): The project configuration.
+
+        Returns:
+            list: The results of each sheet size.
+        """
+    logging.debug("Entering run_loadtest()")
+    REGISTRY.histogram("wnv_geocode_latency_seconds", "Geocode request latency in seconds.", buckets=LATENCY_BUCKETS)
+    server = StandInServer(
+        latency_ms=config_dict.get('loadtest_latency_ms', 5.0),
+        latency_sigma=config_dict.get('loadtest_latency_sigma', 0.5),
+        slow_rate=config_dict.get('loadtest_slow_rate', 0.01),
+        slow_ms=config_dict.get('loadtest_slow_ms', 500.0),
+        error_rate=config_dict.get('loadtest_error_rate', 0.01),
+        unmatched_rate=config_dict.get('loadtest_unmatched_rate', 0.02),
+        rate_limit=config_dict.get('loadtest_rate_limit', 0),
+    )
+    client_rate = config_dict.get('loadtest_client_rate')
+    if client_rate:
+        GSheetsEtl.geocode_budget = GeocodeBudget(client_rate, config_dict.get('geocode_max_in_flight', 4))
+
+    results = []
+    base_url = server.start(config_dict.get('loadtest_port', 0))
+    logging.info(f"Stand-in server listening on {base_url}")
+    try:
+        for rows in config_dict.get('loadtest_rows', [1000, 10000, 100000]):
+            result = run_size(config_dict, server, base_url, rows)
+            if result:
+                results.append(result)
+                first = result["passes"][0]
+                print(f"{rows:>7} rows: {first['rows_per_second']:>8} rows/s, p50 {first['p50_ms']} ms, "
+                      f"p95 {first['p95_ms']} ms, p99 {first['p99_ms']} ms, {first['errors']} failed, "
+                      f"{result['journaled']}/{rows} journaled after {len(result['passes'])} passes")
+    finally:
+        server.stop()
+
+    results_path = os.path.join(config_dict.get('proj_dir'), config_dict.get('loadtest_dir', 'loadtest'), "loadtest_results.json")
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "w") as f:
+        json.dump(results, f, indent=2)
+    logging.info(f"Load test results written to {results_path}")
+    logging.debug("Exiting run_loadtest()")
+    return results
+
+
+if __name__ == '__main__':
+    # Usage: python run_loadtest.py
+    config_dict = finalproject.setup()
+    if config_dict:
+        run_loadtest(config_dict)
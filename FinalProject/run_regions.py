@@ -0,0 +1,115 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import finalproject
+from etl.GSheetsEtl import GSheetsEtl
+from etl.GeocodeBudget import GeocodeBudget
+
+
+def region_configs(config_dict, workers):
+    """
+        Builds one configuration per region by laying each entry of `regions` over the shared settings.
+
+        Args:
+            config_dict (dict): The project configuration with its `regions` list.
+            workers (int): Number of regions that will run at once.
+
+        Returns:
+            list: The region configurations, or an empty list if the regions are invalid.
+        """
+    base = {key: value for key, value in config_dict.items() if key != 'regions'}
+
+    # Every region reads and writes the same geocode cache
+    cache_path = base.get('geocode_cache') or 'geocode_cache.sqlite'
+    base['geocode_cache'] = cache_path if os.path.isabs(cache_path) else f"{base.get('proj_dir')}{cache_path}"
+    # Workers run unattended, and only one process can own the metrics port
+    base['intersect_output'] = base.get('intersect_output') or "intersect"
+    base['metrics_port'] = None
+    # Split the cores between the workers instead of every worker asking arcpy for all of them
+    base.setdefault('parallel_processing_factor', f"{max(1, 100 // workers)}%")
+
+    regions = [{**base, **region} for region in config_dict.get('regions') or []]
+    for key in ('region_name', 'proj_dir', 'workspace'):
+        values = [region.get(key) for region in regions]
+        if None in values or len(set(values)) != len(values):
+            logging.error(f"Every region needs its own {key}: {values}")
+            return []
+    return regions
+
+
+def init_worker(budget):
+    """
+        Installs the shared geocode budget in a worker process.
+
+        Args:
+            budget (GeocodeBudget): The budget created by the parent process.
+        """
+    GSheetsEtl.geocode_budget = budget
+
+
+def run_region(region_config):
+    """
+        Runs the whole pipeline for one region in a worker process.
+
+        Args:
+            region_config (dict): The configuration of the region.
+
+        Returns:
+            tuple: (region name, True if the region ran).
+        """
+    name = region_config.get('region_name')
+    logging.basicConfig(
+        filename=f"{region_config.get('proj_dir')}wnv_{name}.log",
+        filemode="w",
+        level=logging.DEBUG,
+        force=True
+    )
+    logging.debug(f"Entering run_region() with region={name}")
+    try:
+        finalproject.config_dict = region_config
+        if not finalproject.configure_region(region_config):
+            return name, False
+        finalproject.run_pipeline(subtitle=name)
+        return name, True
+    except Exception as e:
+        logging.error(f"Error in run_region() for {name}: {e}")
+        return name, False
+    finally:
+        logging.debug("Exiting run_region()")
+
+
+def run_regions(config_dict):
+    """
+        Runs the configured regions concurrently, sharing one geocoder budget and geocode cache.
+
+        Args:
+            config_dict (dict): The project configuration.
+
+        Returns:
+            dict: Region name -> True if the region ran.
+        """
+    logging.debug("Entering run_regions()")
+    workers = config_dict.get('region_workers') or os.cpu_count()
+    regions = region_configs(config_dict, workers)
+    if not regions:
+        logging.error("No regions to run")
+        return {}
+
+    budget = GeocodeBudget(config_dict.get('geocode_rate_per_second', 5.0), config_dict.get('geocode_max_in_flight', 4))
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(regions)), initializer=init_worker, initargs=(budget,)) as executor:
+        futures = [executor.submit(run_region, region) for region in regions]
+        for future in as_completed(futures):
+            name, ok = future.result()
+            results[name] = ok
+            logging.info(f"Region {name} {'finished' if ok else 'failed'}")
+
+    logging.debug("Exiting run_regions()")
+    return results
+
+
+if __name__ == '__main__':
+    # Usage: python run_regions.py
+    config_dict = finalproject.setup()
+    if config_dict:
+        run_regions(config_dict)
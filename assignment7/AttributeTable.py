@@ -0,0 +1,198 @@
+import datetime
+import re
+
+import arcpy
+import numpy as np
+
+
+class AttributeTable:
+    """
+        A local, columnar copy of selected feature-table fields.
+        Fields are loaded once into typed NumPy arrays. Range predicates use a
+        sorted index per field and equality predicates on low-cardinality
+        fields use bitmap indexes, so repeated filter + aggregate queries do
+        not need another cursor scan.
+        Nulls are kept as a mask per field and treated as SQL does: a null
+        matches no predicate on its field and is left out of sum and mean.
+    """
+
+    # Fields with at most this many distinct values get a bitmap index
+    BITMAP_MAX_VALUES = 256
+
+    PREDICATE = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|<>|=|<|>)\s*(.+?)\s*$")
+
+    # Placeholder written to null cells by field type; the null mask says which cells are null
+    NULL_PLACEHOLDERS = {"SmallInteger": 0, "Integer": 0, "BigInteger": 0, "Single": 0.0, "Double": 0.0,
+                         "Date": datetime.datetime(1970, 1, 1)}
+
+    def __init__(self, columns, nulls=None):
+        """
+        Construct a new 'AttributeTable' object.
+
+        :param columns: Dictionary of field name -> 1-D array, all the same length
+        :param nulls: Optional dictionary of field name -> boolean mask of the rows where the field is null
+
+        :return: returns nothing
+        """
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self.num_rows = lengths.pop() if lengths else 0
+        nulls = nulls or {}
+        self.nulls = {name: np.asarray(nulls[name], dtype=bool) if name in nulls else np.zeros(self.num_rows, dtype=bool)
+                      for name in self.columns}
+        self._sorted = {}
+        self._bitmaps = {}
+
+    @classmethod
+    def from_feature_class(cls, in_table, fields):
+        """
+        Load fields from a feature class, table or layer. A layer's current selection is respected.
+
+        :param in_table: The feature class, table or layer to read
+        :param fields: List of field names to load
+
+        :return: returns a new AttributeTable
+        """
+        nullable = {f.name: f.type for f in arcpy.ListFields(in_table) if f.name in fields and f.isNullable}
+        null_value = {name: cls.NULL_PLACEHOLDERS.get(field_type, "") for name, field_type in nullable.items()}
+        array = arcpy.da.FeatureClassToNumPyArray(in_table, ["OID@"] + fields, null_value=null_value)
+        # The placeholder can also be a real value, so the null rows are read by object id
+        nulls = {}
+        for name in nullable:
+            where = f"{arcpy.AddFieldDelimiters(in_table, name)} IS NULL"
+            null_oids = arcpy.da.FeatureClassToNumPyArray(in_table, ["OID@"], where_clause=where)["OID@"]
+            nulls[name] = np.isin(array["OID@"], null_oids)
+        return cls({name: array[name] for name in fields}, nulls)
+
+    def _sorted_index(self, field):
+        """
+        Build (once) the sort order and sorted values of a field.
+
+        :param field: The field name
+
+        :return: returns (order, sorted values)
+        """
+        if field not in self._sorted:
+            order = np.argsort(self.columns[field], kind="stable")
+            self._sorted[field] = (order, self.columns[field][order])
+        return self._sorted[field]
+
+    def _bitmap(self, field, value):
+        """
+        Look up the bitmap of rows where field == value, building the field's bitmap index on first use.
+
+        :param field: The field name
+        :param value: The value to match
+
+        :return: returns a boolean mask, or None if the field has too many distinct values for a bitmap index
+        """
+        if field not in self._bitmaps:
+            values, inverse = np.unique(self.columns[field], return_inverse=True)
+            if len(values) > self.BITMAP_MAX_VALUES:
+                self._bitmaps[field] = None
+            else:
+                self._bitmaps[field] = {v: inverse == i for i, v in enumerate(values.tolist())}
+        bitmaps = self._bitmaps[field]
+        if bitmaps is None:
+            return None
+        mask = bitmaps.get(value)
+        return mask if mask is not None else np.zeros(self.num_rows, dtype=bool)
+
+    def _parse_value(self, field, text):
+        """
+        Convert a predicate's literal to the field's type.
+        """
+        text = text.strip()
+        if text[:1] in ("'", '"') and text[-1:] == text[:1]:
+            return text[1:-1]
+        if self.columns[field].dtype.kind in "iu":
+            return int(float(text)) if float(text).is_integer() else float(text)
+        if self.columns[field].dtype.kind == "f":
+            return float(text)
+        return text
+
+    def mask(self, field, op, value):
+        """
+        Evaluate one predicate through the field's indexes.
+
+        :param field: The field name
+        :param op: One of =, !=, <>, <, <=, >, >=
+        :param value: The value to compare with
+
+        :return: returns a boolean mask over the rows
+        """
+        if self.columns[field].dtype.kind in "iuf" and isinstance(value, str):
+            # NumPy would compare the string as unequal to every number and silently match nothing
+            raise ValueError(f"Unsupported predicate: {field} {op} {value!r} compares a numeric field with a string")
+        if op in ("=", "!=", "<>"):
+            mask = self._bitmap(field, value)
+            if mask is None:
+                order, values = self._sorted_index(field)
+                lo = np.searchsorted(values, value, side="left")
+                hi = np.searchsorted(values, value, side="right")
+                mask = np.zeros(self.num_rows, dtype=bool)
+                mask[order[lo:hi]] = True
+            return (mask if op == "=" else ~mask) & ~self.nulls[field]
+
+        order, values = self._sorted_index(field)
+        if op == ">":
+            rows = order[np.searchsorted(values, value, side="right"):]
+        elif op == ">=":
+            rows = order[np.searchsorted(values, value, side="left"):]
+        elif op == "<":
+            rows = order[:np.searchsorted(values, value, side="left")]
+        elif op == "<=":
+            rows = order[:np.searchsorted(values, value, side="right")]
+        else:
+            raise ValueError(f"Unsupported operator: {op}")
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[rows] = True
+        return mask & ~self.nulls[field]
+
+    def where(self, where_clause=None):
+        """
+        Evaluate a simple where clause of predicates joined by AND, e.g. "POP1990 > 20000 AND STATE = 'CO'".
+
+        :param where_clause: The where clause, or None for every row
+
+        :return: returns a boolean mask over the rows
+        """
+        result = np.ones(self.num_rows, dtype=bool)
+        if not where_clause:
+            return result
+        for predicate in re.split(r"\s+AND\s+", where_clause, flags=re.IGNORECASE):
+            match = self.PREDICATE.match(predicate)
+            if not match or match.group(1) not in self.columns:
+                raise ValueError(f"Unsupported predicate: {predicate}")
+            field, op, literal = match.groups()
+            result &= self.mask(field, op, self._parse_value(field, literal))
+        return result
+
+    def count(self, where_clause=None):
+        """
+        :param where_clause: Optional filter
+
+        :return: returns the number of matching rows
+        """
+        return int(np.count_nonzero(self.where(where_clause)))
+
+    def sum(self, field, where_clause=None):
+        """
+        :param field: The field to add up
+        :param where_clause: Optional filter
+
+        :return: returns the sum of the field over the matching rows where it is not null
+        """
+        return self.columns[field][self.where(where_clause) & ~self.nulls[field]].sum().item()
+
+    def mean(self, field, where_clause=None):
+        """
+        :param field: The field to average
+        :param where_clause: Optional filter
+
+        :return: returns the mean of the field over the matching rows where it is not null, or None if there are none
+        """
+        values = self.columns[field][self.where(where_clause) & ~self.nulls[field]]
+        return values.mean().item() if len(values) else None
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class BasicMap:
     """
         A simple map class.
@@ -51,6 +54,116 @@ class BasicMap:
         print(f"West: {west}")
 
 
+
+class BasicMapCollection:
+    """
+        A compact collection of many maps sharing the BasicMap model.
+        Centers, widths and heights are stored in NumPy arrays instead of
+        one object per map, so bounds and queries run over every map at once.
+    """
+
+    __slots__ = ("long", "lat", "width", "height", "_order", "_sorted_long", "_max_width")
+
+    def __init__(self, long, lat, width, height):
+        """
+        Construct a new 'BasicMapCollection' object.
+
+        :param long: Sequence of center longitudes
+        :param lat: Sequence of center latitudes
+        :param width: Sequence of map widths (distance from the center to the east/west edges)
+        :param height: Sequence of map heights (distance from the center to the north/south edges)
+
+        :return: returns nothing
+        """
+        self.long = np.asarray(long, dtype=float)
+        self.lat = np.asarray(lat, dtype=float)
+        self.width = np.asarray(width, dtype=float)
+        self.height = np.asarray(height, dtype=float)
+        if not (self.long.shape == self.lat.shape == self.width.shape == self.height.shape):
+            raise ValueError("long, lat, width and height must all have the same length")
+
+        # Index: maps sorted by center longitude. Any map touching a longitude x has its center
+        # within the widest map's width of x, so queries only test that slice.
+        self._order = np.argsort(self.long, kind="stable")
+        self._sorted_long = self.long[self._order]
+        self._max_width = float(self.width.max()) if len(self.width) else 0.0
+
+    @classmethod
+    def from_maps(cls, maps):
+        """
+        Build a collection from BasicMap objects.
+
+        :param maps: Iterable of BasicMap objects
+
+        :return: returns a new BasicMapCollection
+        """
+        maps = list(maps)
+        return cls([m.long for m in maps], [m.lat for m in maps],
+                   [m.width for m in maps], [m.height for m in maps])
+
+    def __len__(self):
+        return len(self.long)
+
+    def __getitem__(self, i):
+        return BasicMap(self.long[i], self.lat[i], self.width[i], self.height[i])
+
+    def get_bounds(self):
+        """
+        Calculate the boundaries of every map.
+
+        :return: returns an (n, 4) array of north, east, south, west bounds
+        """
+        return np.column_stack([
+            self.lat + self.height,
+            self.long + self.width,
+            self.lat - self.height,
+            self.long - self.width,
+        ])
+
+    def _candidates(self, west, east):
+        """
+        Find the maps whose center longitude is close enough to touch the range west..east.
+
+        :param west: West edge of the query range
+        :param east: East edge of the query range
+
+        :return: returns an array of map indexes
+        """
+        lo = np.searchsorted(self._sorted_long, west - self._max_width, side="left")
+        hi = np.searchsorted(self._sorted_long, east + self._max_width, side="right")
+        return self._order[lo:hi]
+
+    def contains_point(self, long, lat):
+        """
+        Find the maps that contain a point (edges included).
+
+        :param long: Longitude of the point
+        :param lat: Latitude of the point
+
+        :return: returns a sorted array of map indexes
+        """
+        idx = self._candidates(long, long)
+        hit = ((np.abs(self.long[idx] - long) <= self.width[idx]) &
+               (np.abs(self.lat[idx] - lat) <= self.height[idx]))
+        return np.sort(idx[hit])
+
+    def overlapping(self, north, east, south, west):
+        """
+        Find the maps that overlap an extent (touching edges count as overlap).
+
+        :param north: North bound of the extent
+        :param east: East bound of the extent
+        :param south: South bound of the extent
+        :param west: West bound of the extent
+
+        :return: returns a sorted array of map indexes
+        """
+        idx = self._candidates(west, east)
+        hit = ((self.long[idx] - self.width[idx] <= east) & (self.long[idx] + self.width[idx] >= west) &
+               (self.lat[idx] - self.height[idx] <= north) & (self.lat[idx] + self.height[idx] >= south))
+        return np.sort(idx[hit])
+
+
 if __name__ == "__main__":
     my_map = BasicMap("-105.2705", "40.015", "0.5", "0.25")
     my_map.describe()
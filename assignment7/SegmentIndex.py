@@ -0,0 +1,164 @@
+import math
+from collections import defaultdict
+
+import arcpy
+import numpy as np
+
+
+class SegmentIndex:
+    """
+        A uniform-grid index of polyline segments for fast within-distance tests.
+        Polylines are broken into straight segments no longer than one grid cell,
+        and each segment is filed under every cell its bounding box covers. A
+        point is only compared against the segments in the cells around it, with
+        vectorized point-to-segment distances and an early exit once a point has
+        been found within the distance.
+    """
+
+    # Segments tested against a cell's points per step; points found near a river drop out after each step
+    CHUNK_SIZE = 512
+
+    def __init__(self, segments, cell_size):
+        """
+        Construct a new 'SegmentIndex' object.
+
+        :param segments: (n, 4) array of x1, y1, x2, y2 segment end points
+        :param cell_size: Grid cell size in map units (the query distance is a good choice)
+
+        :return: returns nothing
+        """
+        self.cell_size = float(cell_size)
+        self.segments = self._split_long_segments(np.asarray(segments, dtype=float).reshape(-1, 4))
+        self.cells = defaultdict(list)
+
+        s = self.segments
+        c0 = np.floor(np.minimum(s[:, 0], s[:, 2]) / self.cell_size).astype(np.int64)
+        c1 = np.floor(np.maximum(s[:, 0], s[:, 2]) / self.cell_size).astype(np.int64)
+        r0 = np.floor(np.minimum(s[:, 1], s[:, 3]) / self.cell_size).astype(np.int64)
+        r1 = np.floor(np.maximum(s[:, 1], s[:, 3]) / self.cell_size).astype(np.int64)
+        for i in range(len(s)):
+            for c in range(c0[i], c1[i] + 1):
+                for r in range(r0[i], r1[i] + 1):
+                    self.cells[(c, r)].append(i)
+        self.cells = {key: np.array(ids, dtype=np.int64) for key, ids in self.cells.items()}
+
+    def _split_long_segments(self, segments):
+        """
+        Split segments longer than a cell so each one only covers a few cells.
+
+        :param segments: (n, 4) array of segments
+
+        :return: returns an (m, 4) array of segments, m >= n
+        """
+        lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        pieces = np.maximum(1, np.ceil(lengths / self.cell_size)).astype(np.int64)
+        seg = np.repeat(np.arange(len(segments)), pieces)
+        k = np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        t0 = k / pieces[seg]
+        t1 = (k + 1) / pieces[seg]
+        x1, y1, x2, y2 = segments[seg].T
+        return np.column_stack([x1 + (x2 - x1) * t0, y1 + (y2 - y1) * t0,
+                                x1 + (x2 - x1) * t1, y1 + (y2 - y1) * t1])
+
+    @classmethod
+    def from_feature_class(cls, in_features, cell_size, spatial_reference=None):
+        """
+        Build an index from a polyline feature class or layer.
+
+        :param in_features: The polyline features to index
+        :param cell_size: Grid cell size in map units
+        :param spatial_reference: Optional spatial reference to project the lines into
+
+        :return: returns a new SegmentIndex
+        """
+        segments = []
+        with arcpy.da.SearchCursor(in_features, ["SHAPE@"], spatial_reference=spatial_reference) as cursor:
+            for (shape,) in cursor:
+                if shape is None:
+                    continue
+                for part in shape:
+                    coords = np.array([(p.X, p.Y) for p in part if p is not None], dtype=float)
+                    if len(coords) >= 2:
+                        segments.append(np.hstack([coords[:-1], coords[1:]]))
+        return cls(np.vstack(segments) if segments else np.empty((0, 4)), cell_size)
+
+    @staticmethod
+    def point_segment_distance(points, segments):
+        """
+        Distance from every point to every segment.
+
+        :param points: (n, 2) array of points
+        :param segments: (m, 4) array of segments
+
+        :return: returns an (n, m) array of distances
+        """
+        px = points[:, 0:1]
+        py = points[:, 1:2]
+        x1, y1, x2, y2 = segments.T
+        dx = x2 - x1
+        dy = y2 - y1
+        length_sq = dx * dx + dy * dy
+        safe = np.where(length_sq == 0, 1.0, length_sq)
+        t = np.clip(((px - x1) * dx + (py - y1) * dy) / safe, 0.0, 1.0)
+        return np.hypot(px - (x1 + t * dx), py - (y1 + t * dy))
+
+    def within_distance(self, points, distance):
+        """
+        Test which points lie within a distance of any indexed segment.
+
+        :param points: (n, 2) array of point coordinates, in the same units as the index
+        :param distance: The search distance
+
+        :return: returns a boolean array, one value per point
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        result = np.zeros(len(points), dtype=bool)
+        if len(points) == 0 or len(self.segments) == 0:
+            return result
+
+        reach = int(math.ceil(distance / self.cell_size))
+        cols = np.floor(points[:, 0] / self.cell_size).astype(np.int64)
+        rows = np.floor(points[:, 1] / self.cell_size).astype(np.int64)
+
+        # Points in the same cell share the same candidate segments
+        keys = np.column_stack([cols, rows])
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for k, (c, r) in enumerate(unique_keys.tolist()):
+            nearby = [self.cells[(c + dc, r + dr)]
+                      for dc in range(-reach, reach + 1) for dr in range(-reach, reach + 1)
+                      if (c + dc, r + dr) in self.cells]
+            if not nearby:
+                continue
+            candidates = np.unique(np.concatenate(nearby))
+            pending = np.flatnonzero(inverse == k)
+            for start in range(0, len(candidates), self.CHUNK_SIZE):
+                chunk = self.segments[candidates[start:start + self.CHUNK_SIZE]]
+                near = (self.point_segment_distance(points[pending], chunk) <= distance).any(axis=1)
+                result[pending[near]] = True
+                pending = pending[~near]
+                if len(pending) == 0:
+                    break
+        return result
+
+    def select_within_distance(self, in_layer, distance, spatial_reference=None):
+        """
+        Narrow a point layer's current selection to features within a distance of the indexed lines,
+        like SelectLayerByLocation WITHIN_A_DISTANCE with SUBSET_SELECTION. Only the currently selected
+        features are tested.
+
+        :param in_layer: The point layer, typically already filtered by an attribute selection
+        :param distance: The search distance, in the units of the index
+        :param spatial_reference: The spatial reference the index was built in
+
+        :return: returns the number of selected features
+        """
+        array = arcpy.da.FeatureClassToNumPyArray(in_layer, ["OID@", "SHAPE@X", "SHAPE@Y"],
+                                                  spatial_reference=spatial_reference, skip_nulls=True)
+        near = self.within_distance(np.column_stack([array["SHAPE@X"], array["SHAPE@Y"]]), distance)
+        oids = array["OID@"][near].tolist()
+
+        oid_field = arcpy.AddFieldDelimiters(in_layer, arcpy.Describe(in_layer).OIDFieldName)
+        where = f"{oid_field} IN ({','.join(str(oid) for oid in oids)})" if oids else f"{oid_field} < 0"
+        arcpy.management.SelectLayerByAttribute(in_layer, "SUBSET_SELECTION", where)
+        return len(oids)
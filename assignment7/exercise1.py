@@ -1,4 +1,6 @@
 import arcpy
+from AttributeTable import AttributeTable
+from SegmentIndex import SegmentIndex
 arcpy.env.workspace = r"C:\Users\David Neufeld\Documents\ArcGIS\GIS305\Data\Admin\AdminData.gdb"
 arcpy.env.overwriteOutput = True
 arcpy.SelectLayerByAttribute_management("cities", "CLEAR_SELECTION")
@@ -12,19 +14,25 @@ arcpy.management.SelectLayerByAttribute(flayer, "NEW_SELECTION", qry)
 my_cnt = arcpy.management.GetCount(flayer)
 print(f"Selected cities is: {my_cnt}")
 
-arcpy.management.SelectLayerByLocation(flayer, "WITHIN_A_DISTANCE", "us_rivers", "10 miles", "SUBSET_SELECTION")
+# Same as SelectLayerByLocation WITHIN_A_DISTANCE "10 miles" with SUBSET_SELECTION, but only the
+# cities already selected are tested, against a grid index of river segments in USA Contiguous Albers (meters).
+# Albers is equal-area, not equidistant: its scale is off by up to about 1.3% over the lower 48, so the distance
+# is approximate and a city within about 0.2 miles of the 10 mile cutoff can land on either side of it
+albers = arcpy.SpatialReference(102003)
+ten_miles = 16093.44
+rivers = SegmentIndex.from_feature_class("us_rivers", ten_miles, albers)
+rivers.select_within_distance(flayer, ten_miles, albers)
 
 
 my_cnt = arcpy.management.GetCount(flayer)
 print(f"Selected cities is: {my_cnt}")
 
 field = 'POP1990'
-total = 0
-i = 1
-with arcpy.da.SearchCursor(flayer, field) as cursor:
-    for row in cursor:
-        print(i, str(row[0]))
-        total = total + row[0]
-        i = i + 1
-
-print(f"Total population is: {total:,}")
\ No newline at end of file
+
+# Load the selected rows once, then answer attribute queries from the in-memory table
+table = AttributeTable.from_feature_class(flayer, [field])
+total = table.sum(field)
+
+print(f"Total population is: {total:,}")
+print(f"Average population is: {table.mean(field) or 0:,.0f}")
+print(f"Selected cities over 100,000: {table.count('POP1990 > 100000')}")
\ No newline at end of file